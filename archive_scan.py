@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Archive Scan for SafetyMaster Pro
+Headless batch analysis of recorded video. Each file is split into time
+segments that are scanned in parallel worker processes with batched
+inference, and the sampled detections are merged into one violation
+timeline per file, exported as JSONL and/or CSV.
+
+Besides the dense scan, a coarse first pass can look only at keyframes or
+at one frame every few seconds, then rescan densely around any frame that
+shows people or violations.
+
+Example:
+    python archive_scan.py shift_bay3.mp4 --workers 4 --sample-fps 2 --format both
+    python archive_scan.py shift_bay3.mp4 --mode keyframes --refine-window 10
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from safety_detector import SafetyDetector
+
+# Scan modes
+SCAN_DENSE = 'dense'  # Analyze frames at the sample rate across the whole file
+SCAN_STRIDE = 'stride'  # Seek to one frame every stride seconds, then refine around hits
+SCAN_KEYFRAMES = 'keyframes'  # Decode only keyframes, then refine around hits
+
+SCAN_MODES = (SCAN_DENSE, SCAN_STRIDE, SCAN_KEYFRAMES)
+
+# Forward gaps up to this many frames are skipped with grab() instead of seeking
+SEEK_THRESHOLD_FRAMES = 30
+
+EVENT_FIELDS = [
+    'video', 'type', 'severity', 'start_time', 'end_time', 'duration',
+    'start_timecode', 'end_timecode', 'start_frame', 'end_frame',
+    'samples', 'max_count', 'max_people', 'start_wallclock', 'end_wallclock'
+]
+
+# Detector owned by each worker process, created once by the pool initializer
+_worker_detector = None
+
+
+def _init_worker(model_path: Optional[str], confidence: float, torch_threads: int):
+    """Load the detector once per worker process."""
+    global _worker_detector
+    import torch
+    # Split the cores between workers instead of every worker using all of them
+    torch.set_num_threads(max(1, torch_threads))
+    _worker_detector = SafetyDetector(model_path, confidence)
+
+
+def get_video_info(video_path: str) -> Dict:
+    """
+    Read frame rate, frame count and duration of a video file.
+
+    Args:
+        video_path: Path to the video file
+
+    Returns:
+        Dictionary with fps, frame_count and duration (seconds)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+
+    if fps <= 0:
+        print(f"⚠️  {video_path}: unknown frame rate, assuming 30 FPS")
+        fps = 30.0
+
+    return {
+        'fps': fps,
+        'frame_count': frame_count,
+        'duration': frame_count / fps if frame_count > 0 else 0.0
+    }
+
+
+def plan_segments(frame_count: int, fps: float, segment_seconds: float) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split a video into segments of roughly equal length.
+
+    Args:
+        frame_count: Total number of frames (0 if unknown)
+        fps: Frames per second
+        segment_seconds: Target segment length in seconds
+
+    Returns:
+        List of (start_frame, end_frame) pairs; end_frame is exclusive, None means end of file
+    """
+    if frame_count <= 0:
+        # Without a reliable length the file cannot be split
+        return [(0, None)]
+
+    segment_frames = max(1, int(segment_seconds * fps))
+    return [(start, min(start + segment_frames, frame_count))
+            for start in range(0, frame_count, segment_frames)]
+
+
+def _summarize_sample(position: int, fps: float, results: Dict) -> Dict:
+    """Reduce a detection result to what the timeline needs."""
+    violations = {}
+    for violation in results['violations']:
+        entry = violations.setdefault(violation['type'], {
+            'severity': violation.get('severity', 'high'),
+            'count': 0
+        })
+        entry['count'] += violation.get('count', 1)
+
+    return {
+        'frame': position,
+        'time': position / fps,
+        'people_count': results['people_count'],
+        'violations': violations
+    }
+
+
+def scan_segment(video_path: str, start_frame: int, end_frame: Optional[int],
+                 frame_step: int, batch_size: int) -> Dict:
+    """
+    Scan one segment of a video in a worker process. Frames that are not
+    sampled are skipped with grab(). With OpenCV's FFmpeg backend grab() still
+    decodes the frame (later frames depend on it); what is saved is the
+    colour conversion and copy that retrieve() would do, and the detector.
+
+    Args:
+        video_path: Path to the video file
+        start_frame: First frame of the segment
+        end_frame: Frame after the last one in the segment, None for end of file
+        frame_step: Analyze every Nth frame (aligned to the start of the file)
+        batch_size: Frames per inference batch
+
+    Returns:
+        Dictionary with the segment bounds, frames analyzed and per-sample results
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    samples = []
+    frames, positions = [], []
+
+    def flush():
+        for position, results in zip(positions, _worker_detector.detect_safety_violations_batch(frames)):
+            samples.append(_summarize_sample(position, fps, results))
+        frames.clear()
+        positions.clear()
+
+    position = start_frame
+    try:
+        while end_frame is None or position < end_frame:
+            if position % frame_step == 0:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(frame)
+                positions.append(position)
+                if len(frames) >= batch_size:
+                    flush()
+            elif not cap.grab():
+                break
+            position += 1
+
+        if frames:
+            flush()
+    finally:
+        cap.release()
+
+    return {
+        'video': video_path,
+        'start_frame': start_frame,
+        'end_frame': position,
+        'samples': samples
+    }
+
+
+def get_keyframe_times(video_path: str, ffprobe_path: str = 'ffprobe',
+                       timeout: float = 600.0) -> Optional[List[float]]:
+    """
+    List keyframe timestamps by reading packet flags with ffprobe.
+    Only the container is parsed, nothing is decoded.
+
+    Args:
+        video_path: Path to the video file
+        ffprobe_path: ffprobe executable
+        timeout: Seconds allowed for the probe
+
+    Returns:
+        Sorted keyframe times in seconds, or None if ffprobe is unavailable or failed
+    """
+    command = [ffprobe_path, '-v', 'error', '-select_streams', 'v:0',
+               '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"⚠️  Could not list keyframes of {video_path}: {e}")
+        return None
+    if result.returncode != 0:
+        print(f"⚠️  Could not list keyframes of {video_path}: {result.stderr.strip()}")
+        return None
+
+    times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags:
+            try:
+                times.append(float(pts_time))
+            except ValueError:
+                continue
+    return sorted(times)
+
+
+def plan_coarse_positions(info: Dict, mode: str, stride_seconds: float,
+                          keyframe_times: Optional[List[float]] = None) -> List[int]:
+    """
+    Pick the frames analyzed by the coarse pass.
+
+    Args:
+        info: Video information from get_video_info
+        mode: SCAN_STRIDE or SCAN_KEYFRAMES
+        stride_seconds: Seconds between frames in stride mode
+        keyframe_times: Keyframe timestamps for keyframe mode
+
+    Returns:
+        Sorted frame positions
+    """
+    fps = info['fps']
+    if mode == SCAN_KEYFRAMES and keyframe_times:
+        positions = {int(round(t * fps)) for t in keyframe_times}
+    else:
+        stride = max(1, int(round(stride_seconds * fps)))
+        positions = set(range(0, info['frame_count'], stride))
+
+    if info['frame_count'] > 0:
+        positions = {p for p in positions if 0 <= p < info['frame_count']}
+    return sorted(positions)
+
+
+def scan_positions(video_path: str, positions: List[int], batch_size: int) -> Dict:
+    """
+    Analyze specific frames of a video in a worker process. Far-apart frames
+    are reached by seeking; nearby frames by grabbing forward, which decodes
+    them but skips their colour conversion and copy.
+
+    Args:
+        video_path: Path to the video file
+        positions: Sorted frame positions to analyze
+        batch_size: Frames per inference batch
+
+    Returns:
+        Dictionary with the covered frame range, frames analyzed and per-sample results
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    samples = []
+    frames, frame_positions = [], []
+
+    def flush():
+        for position, results in zip(frame_positions,
+                                     _worker_detector.detect_safety_violations_batch(frames)):
+            samples.append(_summarize_sample(position, fps, results))
+        frames.clear()
+        frame_positions.clear()
+
+    current = 0
+    try:
+        for position in positions:
+            gap = position - current
+            if gap < 0 or gap > SEEK_THRESHOLD_FRAMES:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            else:
+                while gap > 0 and cap.grab():
+                    gap -= 1
+            ret, frame = cap.read()
+            if not ret:
+                break
+            current = position + 1
+            frames.append(frame)
+            frame_positions.append(position)
+            if len(frames) >= batch_size:
+                flush()
+
+        if frames:
+            flush()
+    finally:
+        cap.release()
+
+    return {
+        'video': video_path,
+        'start_frame': positions[0] if positions else 0,
+        'end_frame': current,
+        'samples': samples
+    }
+
+
+def plan_refinement(samples: List[Dict], fps: float, frame_count: int,
+                    window_seconds: float) -> List[Tuple[int, int]]:
+    """
+    Build the frame ranges to rescan densely: a window around every coarse
+    sample with people or violations, with overlapping windows merged.
+
+    Args:
+        samples: Coarse pass samples
+        fps: Frames per second
+        frame_count: Total number of frames (0 if unknown)
+        window_seconds: Seconds to rescan on each side of a hit
+
+    Returns:
+        List of (start_frame, end_frame) ranges, end exclusive
+    """
+    window = int(round(window_seconds * fps))
+    ranges = []
+    for sample in sorted(samples, key=lambda s: s['frame']):
+        if not sample['people_count'] and not sample['violations']:
+            continue
+        start = max(0, sample['frame'] - window)
+        end = sample['frame'] + window + 1
+        if frame_count > 0:
+            end = min(end, frame_count)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def format_timecode(seconds: float) -> str:
+    """Format an offset in seconds as HH:MM:SS.mmm."""
+    milliseconds = int(round(seconds * 1000))
+    hours, remainder = divmod(milliseconds, 3600 * 1000)
+    minutes, remainder = divmod(remainder, 60 * 1000)
+    secs, millis = divmod(remainder, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def merge_timeline(video_path: str, samples: List[Dict], sample_interval: float,
+                   merge_gap: float, recording_start: Optional[datetime] = None) -> List[Dict]:
+    """
+    Merge sampled detections into violation events. Consecutive samples with
+    the same violation type become one event while the gap between them
+    stays within merge_gap seconds.
+
+    Args:
+        video_path: Video the samples came from
+        samples: Per-sample results from all segments, in any order
+        sample_interval: Seconds between analyzed frames
+        merge_gap: Longest gap in seconds that still joins two detections
+        recording_start: Wall-clock time of the first frame, for absolute timestamps
+
+    Returns:
+        List of events ordered by start time
+    """
+    gap_limit = max(merge_gap, sample_interval * 1.5)
+    events = []
+    open_events = {}
+
+    for sample in sorted(samples, key=lambda s: s['frame']):
+        for violation_type, info in sample['violations'].items():
+            event = open_events.get(violation_type)
+            if event is not None and sample['time'] - event['end_time'] <= gap_limit:
+                event['end_time'] = sample['time']
+                event['end_frame'] = sample['frame']
+                event['samples'] += 1
+                event['max_count'] = max(event['max_count'], info['count'])
+                event['max_people'] = max(event['max_people'], sample['people_count'])
+                continue
+
+            if event is not None:
+                events.append(event)
+            open_events[violation_type] = {
+                'video': video_path,
+                'type': violation_type,
+                'severity': info['severity'],
+                'start_time': sample['time'],
+                'end_time': sample['time'],
+                'start_frame': sample['frame'],
+                'end_frame': sample['frame'],
+                'samples': 1,
+                'max_count': info['count'],
+                'max_people': sample['people_count']
+            }
+
+    events.extend(open_events.values())
+    events.sort(key=lambda e: (e['start_time'], e['type']))
+
+    for event in events:
+        event['duration'] = round(event['end_time'] - event['start_time'], 3)
+        event['start_timecode'] = format_timecode(event['start_time'])
+        event['end_timecode'] = format_timecode(event['end_time'])
+        event['start_time'] = round(event['start_time'], 3)
+        event['end_time'] = round(event['end_time'], 3)
+        if recording_start is not None:
+            event['start_wallclock'] = (recording_start + timedelta(seconds=event['start_time'])).isoformat()
+            event['end_wallclock'] = (recording_start + timedelta(seconds=event['end_time'])).isoformat()
+
+    return events
+
+
+def write_jsonl(events: List[Dict], path: str):
+    """Write one JSON object per event."""
+    with open(path, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+
+
+def write_csv(events: List[Dict], path: str):
+    """Write events as CSV with a fixed column order."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=EVENT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for event in events:
+            writer.writerow(event)
+
+
+def _run_jobs(executor: ProcessPoolExecutor, jobs: List[tuple], label: str) -> List[Dict]:
+    """Run (function, args...) jobs on the pool, printing progress as they finish."""
+    start_time = time.time()
+    futures = [executor.submit(func, *args) for func, *args in jobs]
+    results = []
+    frames_analyzed = 0
+
+    for done, future in enumerate(as_completed(futures), 1):
+        segment = future.result()
+        results.append(segment)
+        frames_analyzed += len(segment['samples'])
+        elapsed = max(time.time() - start_time, 1e-6)
+        print(f"   {label} [{done}/{len(jobs)}] {segment['video']} frames "
+              f"{segment['start_frame']}-{segment['end_frame']} "
+              f"({frames_analyzed / elapsed:.1f} analyzed frames/s)")
+    return results
+
+
+def scan_archive(video_paths: List[str], model_path: Optional[str] = None,
+                 confidence: float = 0.5, workers: int = 2, segment_seconds: float = 600.0,
+                 sample_fps: float = 1.0, batch_size: int = 8, merge_gap: float = 5.0,
+                 recording_start: Optional[datetime] = None, mode: str = SCAN_DENSE,
+                 stride_seconds: float = 10.0, refine_window: float = 5.0) -> Dict[str, List[Dict]]:
+    """
+    Scan video files for violations using a pool of worker processes.
+    Segments of all files share one pool, so short and long files balance out.
+
+    Args:
+        video_paths: Video files to scan
+        model_path: Custom YOLO model, None for the default PPE model
+        confidence: Detection confidence threshold
+        workers: Number of worker processes
+        segment_seconds: Length of the segments files are split into
+        sample_fps: Frames analyzed per second of video, 0 for every frame
+        batch_size: Frames per inference batch
+        merge_gap: Longest gap in seconds that still joins two detections
+        recording_start: Wall-clock time the recordings started, for absolute timestamps
+        mode: 'dense', or 'stride'/'keyframes' for a coarse pass refined around hits
+        stride_seconds: Seconds between coarse frames in stride mode
+        refine_window: Seconds rescanned densely on each side of a coarse hit
+
+    Returns:
+        Dictionary mapping each video path to its violation timeline
+    """
+    if mode not in SCAN_MODES:
+        raise ValueError(f"Unknown scan mode: {mode}")
+
+    dense_jobs = []
+    coarse_jobs = []
+    video_info = {}
+    for video_path in video_paths:
+        info = get_video_info(video_path)
+        frame_step = max(1, int(round(info['fps'] / sample_fps))) if sample_fps > 0 else 1
+        info['frame_step'] = frame_step
+        video_info[video_path] = info
+        print(f"📼 {video_path}: {format_timecode(info['duration'])} @ {info['fps']:.1f} FPS, "
+              f"analyzing every {frame_step} frame(s)")
+
+        if mode == SCAN_DENSE or info['frame_count'] <= 0:
+            # Unknown length: coarse positions cannot be planned, scan densely
+            for start_frame, end_frame in plan_segments(info['frame_count'], info['fps'], segment_seconds):
+                dense_jobs.append((scan_segment, video_path, start_frame, end_frame, frame_step, batch_size))
+            continue
+
+        keyframe_times = get_keyframe_times(video_path) if mode == SCAN_KEYFRAMES else None
+        if mode == SCAN_KEYFRAMES and not keyframe_times:
+            print(f"⚠️  {video_path}: no keyframe list, using a {stride_seconds:g}s stride instead")
+        positions = plan_coarse_positions(info, mode, stride_seconds, keyframe_times)
+        print(f"   Coarse pass: {len(positions)} frame(s)")
+
+        # Chunk coarse positions by segment so the pool spreads them over workers
+        segment_frames = max(1, int(segment_seconds * info['fps']))
+        chunks = {}
+        for position in positions:
+            chunks.setdefault(position // segment_frames, []).append(position)
+        for chunk in chunks.values():
+            coarse_jobs.append((scan_positions, video_path, chunk, batch_size))
+
+    samples = {video_path: [] for video_path in video_paths}
+    torch_threads = (os.cpu_count() or 2) // workers
+    # Spawned workers are safe with CUDA and behave the same on every platform
+    context = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(model_path, confidence, torch_threads)) as executor:
+        if coarse_jobs:
+            coarse_samples = {video_path: [] for video_path in video_paths}
+            for segment in _run_jobs(executor, coarse_jobs, 'coarse'):
+                coarse_samples[segment['video']].extend(segment['samples'])
+
+            for video_path, video_samples in coarse_samples.items():
+                samples[video_path].extend(video_samples)
+                info = video_info[video_path]
+                windows = plan_refinement(video_samples, info['fps'], info['frame_count'], refine_window)
+                if windows:
+                    print(f"   {video_path}: refining {len(windows)} window(s)")
+                for start_frame, end_frame in windows:
+                    dense_jobs.append((scan_segment, video_path, start_frame, end_frame,
+                                       info['frame_step'], batch_size))
+
+        for segment in _run_jobs(executor, dense_jobs, 'dense'):
+            samples[segment['video']].extend(segment['samples'])
+
+    timelines = {}
+    for video_path, info in video_info.items():
+        # Coarse and refined passes can both analyze a frame; keep one sample per frame
+        unique_samples = list({sample['frame']: sample for sample in samples[video_path]}.values())
+        sample_interval = info['frame_step'] / info['fps']
+        timelines[video_path] = merge_timeline(video_path, unique_samples, sample_interval,
+                                               merge_gap, recording_start)
+    return timelines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan recorded video for safety violations')
+    parser.add_argument('videos', nargs='+',
+                        help='Video files to scan')
+    parser.add_argument('--model', type=str, default=None,
+                        help='Path to custom YOLO model (optional)')
+    parser.add_argument('--confidence', type=float, default=0.5,
+                        help='Detection confidence threshold (0.1-1.0)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Number of worker processes')
+    parser.add_argument('--segment-minutes', type=float, default=10.0,
+                        help='Length of the segments each file is split into')
+    parser.add_argument('--sample-fps', type=float, default=1.0,
+                        help='Frames analyzed per second of video (0 = every frame)')
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help='Frames per inference batch')
+    parser.add_argument('--merge-gap', type=float, default=5.0,
+                        help='Seconds between detections that still count as one event')
+    parser.add_argument('--mode', choices=SCAN_MODES, default=SCAN_DENSE,
+                        help='dense scan, or a stride/keyframes pass refined around hits')
+    parser.add_argument('--stride', type=float, default=10.0,
+                        help='Seconds between frames of the coarse pass in stride mode')
+    parser.add_argument('--refine-window', type=float, default=5.0,
+                        help='Seconds rescanned densely on each side of a coarse hit')
+    parser.add_argument('--recording-start', type=str, default=None,
+                        help='ISO time the recordings started, adds wall-clock timestamps')
+    parser.add_argument('--output-dir', type=str, default='scan_results',
+                        help='Directory for the exported timelines')
+    parser.add_argument('--format', choices=['jsonl', 'csv', 'both'], default='jsonl',
+                        help='Export format')
+
+    args = parser.parse_args()
+
+    missing = [video for video in args.videos if not os.path.exists(video)]
+    if missing:
+        print(f"❌ Video file(s) not found: {', '.join(missing)}")
+        return 1
+
+    recording_start = datetime.fromisoformat(args.recording_start) if args.recording_start else None
+
+    print("🔍 SafetyMaster Archive Scan")
+    print(f"   Mode: {args.mode}, workers: {args.workers}, batch size: {args.batch_size}, "
+          f"segments: {args.segment_minutes:g} min")
+    print("-" * 50)
+
+    start_time = time.time()
+    timelines = scan_archive(args.videos, args.model, args.confidence, args.workers,
+                             args.segment_minutes * 60, args.sample_fps, args.batch_size,
+                             args.merge_gap, recording_start, args.mode, args.stride,
+                             args.refine_window)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for video_path, events in timelines.items():
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        if args.format in ('jsonl', 'both'):
+            write_jsonl(events, os.path.join(args.output_dir, f"{stem}_violations.jsonl"))
+        if args.format in ('csv', 'both'):
+            write_csv(events, os.path.join(args.output_dir, f"{stem}_violations.csv"))
+        print(f"✅ {video_path}: {len(events)} violation event(s)")
+
+    print(f"\n📁 Results saved to {args.output_dir} in {time.time() - start_time:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Batch Inference for SafetyMaster Pro
+Dynamic batching in front of SafetyDetector: requests from all cameras are
+collected for a few milliseconds and analyzed with one batched model call
+"""
+
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+
+import numpy as np
+
+
+class InferenceRequest:
+    """One frame waiting for inference."""
+
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class DynamicBatcher:
+    """
+    Collects inference requests until max_batch frames are waiting or the
+    oldest has waited max_wait_ms, then runs them as one batch and routes
+    each result back to its caller's future. Exposes the detector's
+    detect_safety_violations API, so it can stand in for the detector.
+    """
+
+    def __init__(self, detector, max_batch: int = 8, max_wait_ms: float = 8.0,
+                 result_timeout: float = 30.0):
+        """
+        Initialize the batcher and start its worker thread.
+
+        Args:
+            detector: SafetyDetector (needs detect_safety_violations_batch)
+            max_batch: Largest number of frames per model call
+            max_wait_ms: Longest time the first request of a batch waits for more
+            result_timeout: Longest time detect_safety_violations waits for a result
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.result_timeout = result_timeout
+        self._queue = queue.Queue()
+        # Held while queueing so no request can slip in after stop() drained the queue
+        self._submit_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.errors = 0
+        self.batch_sizes = collections.Counter()
+        self.total_inference_time = 0.0
+        self._queue_delays = collections.deque(maxlen=1000)
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name='dynamic-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray) -> Future:
+        """
+        Queue a frame for inference.
+
+        Returns:
+            Future resolving to the detection results for the frame
+        """
+        request = InferenceRequest(frame)
+        with self._submit_lock:
+            if not self.is_running:
+                raise RuntimeError("DynamicBatcher has been stopped")
+            self._queue.put(request)
+        return request.future
+
+    def detect_safety_violations(self, frame: np.ndarray) -> Dict:
+        """Analyze one frame, batched with concurrent requests from other callers."""
+        return self.submit(frame).result(timeout=self.result_timeout)
+
+    def detect_safety_violations_batch(self, frames: List[np.ndarray]) -> List[Dict]:
+        """Analyze several frames; they may share batches with other callers."""
+        futures = [self.submit(frame) for frame in frames]
+        return [future.result(timeout=self.result_timeout) for future in futures]
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the worker; requests still queued fail with RuntimeError."""
+        with self._submit_lock:
+            self.is_running = False
+        self._thread.join(timeout=timeout)
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("DynamicBatcher has been stopped"))
+
+    def _collect(self) -> List[InferenceRequest]:
+        """Wait for a first request, then gather more until the batch is full or its deadline passes."""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        # The deadline counts from when the first request arrived, so time it
+        # spent queued behind the previous batch is not waited again
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, run it, deliver the results."""
+        while self.is_running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            start_time = time.monotonic()
+            try:
+                frames = [request.frame for request in batch]
+                if len(frames) == 1:
+                    results = [self.detector.detect_safety_violations(frames[0])]
+                else:
+                    results = self.detector.detect_safety_violations_batch(frames)
+            except Exception as e:
+                print(f"Error in batched inference: {e}")
+                with self._lock:
+                    self.errors += 1
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            elapsed = time.monotonic() - start_time
+
+            with self._lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.total_inference_time += elapsed
+                for request in batch:
+                    self._queue_delays.append(start_time - request.enqueued_at)
+
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    def get_stats(self) -> dict:
+        """Get batch-size distribution, queueing delay and inference time."""
+        with self._lock:
+            delays = sorted(self._queue_delays)
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self.batches,
+                'frames': self.frames,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+                'avg_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+                'avg_queue_delay_ms': round(sum(delays) / len(delays) * 1000, 2) if delays else 0.0,
+                'p95_queue_delay_ms': round(delays[int(len(delays) * 0.95)] * 1000, 2) if delays else 0.0,
+                'avg_batch_ms': round(self.total_inference_time / self.batches * 1000, 2) if self.batches else 0.0
+            }
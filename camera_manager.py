@@ -2,26 +2,296 @@ import cv2
 import threading
 import queue
 import time
-from typing import Optional, Callable, Union
+from typing import Optional, Callable, Tuple, Union
 import numpy as np
 
+from ffmpeg_capture import FFmpegCapture
+from frame_bus import InProcessBus
+
+class LatestFrameBuffer:
+    """
+    Single-slot buffer holding the newest frame with its timestamp and sequence number.
+    The capture thread overwrites the slot; readers take the newest frame without
+    draining a queue and can block on a condition variable for the next one.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._sequence = 0
+    
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the newest frame (0 before the first frame)."""
+        return self._sequence
+    
+    def put(self, frame: np.ndarray, timestamp: float, sequence: Optional[int] = None) -> int:
+        """
+        Replace the frame in the slot and wake waiting readers.
+        
+        Args:
+            frame: New frame
+            timestamp: Capture time of the frame
+            sequence: Sequence number to use instead of the next one
+        
+        Returns:
+            Sequence number assigned to the frame
+        """
+        with self._condition:
+            self._frame = frame
+            self._timestamp = timestamp
+            self._sequence = self._sequence + 1 if sequence is None else sequence
+            self._condition.notify_all()
+            return self._sequence
+    
+    def get(self, after_sequence: int = 0) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Get the newest frame if it is newer than the given sequence number.
+        
+        Returns:
+            Tuple of (frame, timestamp, sequence) or None if no newer frame
+        """
+        with self._condition:
+            if self._sequence <= after_sequence or self._frame is None:
+                return None
+            return self._frame, self._timestamp, self._sequence
+    
+    def wait_for(self, after_sequence: int = 0,
+                 timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Block until a frame newer than the given sequence number is available.
+        
+        Returns:
+            Tuple of (frame, timestamp, sequence) or None on timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._sequence > after_sequence and self._frame is not None, timeout):
+                return None
+            return self._frame, self._timestamp, self._sequence
+    
+    def clear(self):
+        """Drop the held frame; sequence numbers keep increasing."""
+        with self._condition:
+            self._frame = None
+            self._condition.notify_all()
+
+
+# Capture modes
+CAPTURE_COPY = 'copy'  # cap.read() allocates a new array for every frame
+CAPTURE_RING = 'ring'  # cap.read(image=buf) fills preallocated ring slots
+CAPTURE_DEMAND = 'demand'  # cap.grab() keeps the stream current, cap.retrieve() decodes on request
+
+CAPTURE_MODES = (CAPTURE_COPY, CAPTURE_RING, CAPTURE_DEMAND)
+
+# Connection states
+STATE_DISCONNECTED = 'disconnected'
+STATE_CONNECTING = 'connecting'
+STATE_CONNECTED = 'connected'
+STATE_RECONNECTING = 'reconnecting'
+STATE_ENDED = 'ended'  # Video file played to the end
+STATE_STOPPED = 'stopped'
+
+# Decode backends
+BACKEND_OPENCV = 'opencv'  # cv2.VideoCapture
+BACKEND_FFMPEG = 'ffmpeg'  # ffmpeg subprocess streaming raw frames over a pipe
+
+class FrameLease:
+    """
+    Zero-copy reference to a captured frame. While a lease is held the ring
+    slot behind it is not overwritten; release it (or use it as a context
+    manager) once the frame is no longer needed.
+    """
+    
+    def __init__(self, ring, slot: int, frame: np.ndarray, timestamp: float, sequence: int):
+        self._ring = ring
+        self._slot = slot
+        self.frame = frame
+        self.timestamp = timestamp
+        self.sequence = sequence
+        self._released = False
+    
+    def release(self):
+        """Return the slot to the ring. Safe to call more than once."""
+        if not self._released:
+            self._released = True
+            if self._ring is not None:
+                self._ring.release(self._slot)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+    
+    def __del__(self):
+        # Leases dropped without release (e.g. discarded from a queue) free their slot
+        self.release()
+
+
+class FrameRingBuffer:
+    """
+    Ring of preallocated frame buffers shared between the capture thread and
+    consumers. Slots are reference counted: the writer only reuses a slot that
+    is neither leased nor holding the latest frame.
+    """
+    
+    def __init__(self, num_slots: int, shape: tuple, dtype=np.uint8):
+        """
+        Initialize the ring.
+        
+        Args:
+            num_slots: Number of preallocated buffers
+            shape: Frame shape (height, width, channels)
+            dtype: Frame data type
+        """
+        self.num_slots = max(2, num_slots)
+        self.shape = shape
+        self.buffers = [np.empty(shape, dtype) for _ in range(self.num_slots)]
+        self._refcounts = [0] * self.num_slots
+        self._lock = threading.Lock()
+        self._next_slot = 0
+        self._latest = None  # (slot, timestamp, sequence)
+        self.overruns = 0
+    
+    def acquire_write_slot(self) -> Optional[int]:
+        """
+        Reserve a free slot for the writer.
+        
+        Returns:
+            Slot index, or None if every slot is leased (an overrun)
+        """
+        with self._lock:
+            latest_slot = self._latest[0] if self._latest else -1
+            for offset in range(self.num_slots):
+                slot = (self._next_slot + offset) % self.num_slots
+                if self._refcounts[slot] == 0 and slot != latest_slot:
+                    self._refcounts[slot] = 1
+                    self._next_slot = (slot + 1) % self.num_slots
+                    return slot
+            self.overruns += 1
+            return None
+    
+    def commit(self, slot: int, timestamp: float, sequence: int):
+        """Publish a written slot as the latest frame and drop the writer's reference."""
+        with self._lock:
+            self._refcounts[slot] -= 1
+            self._latest = (slot, timestamp, sequence)
+    
+    def abandon(self, slot: int):
+        """Drop the writer's reference to a slot that was not filled."""
+        self.release(slot)
+    
+    def release(self, slot: int):
+        """Drop one reference to a slot."""
+        with self._lock:
+            self._refcounts[slot] = max(0, self._refcounts[slot] - 1)
+    
+    def lease_latest(self, after_sequence: int = 0) -> Optional[FrameLease]:
+        """
+        Lease the latest frame if it is newer than the given sequence number.
+        
+        Returns:
+            FrameLease or None if no newer frame is available
+        """
+        with self._lock:
+            if self._latest is None or self._latest[2] <= after_sequence:
+                return None
+            slot, timestamp, sequence = self._latest
+            self._refcounts[slot] += 1
+        return FrameLease(self, slot, self.buffers[slot], timestamp, sequence)
+    
+    def get_stats(self) -> dict:
+        """Get slot usage statistics."""
+        with self._lock:
+            return {
+                'slots': self.num_slots,
+                'leased': sum(1 for count in self._refcounts if count > 0),
+                'overruns': self.overruns
+            }
+
+
 class CameraManager:
     """
     Manages video capture from various sources including webcams, IP cameras, and video files.
     Provides threaded video capture for real-time processing.
     """
     
-    def __init__(self, source: Union[int, str] = 0, buffer_size: int = 10):
+    LOG_INTERVAL = 10.0  # Seconds between repeats of the same capture message
+    RECONNECT_INITIAL_BACKOFF = 1.0  # First reconnect delay in seconds
+    BACKOFF_RESET_AFTER = 60.0  # Seconds of steady frames before the reconnect delay starts over
+    
+    def __init__(self, source: Union[int, str] = 0, buffer_size: int = 10,
+                 queue_frames: bool = False, capture_mode: str = CAPTURE_COPY,
+                 ring_size: int = 8, open_timeout: float = 10.0, read_timeout: float = 5.0,
+                 stall_timeout: float = 5.0, reconnect_max_backoff: float = 30.0,
+                 sequential: bool = False, backend: str = BACKEND_OPENCV,
+                 ffmpeg_options: Optional[dict] = None, bus=None,
+                 bus_topic: Optional[str] = None):
         """
         Initialize camera manager.
         
         Args:
             source: Camera source (0 for default webcam, URL for IP camera, path for video file)
-            buffer_size: Size of frame buffer for threading
+            buffer_size: Size of frame queue used when queue_frames is enabled
+            queue_frames: Also keep a queue of recent frames for consumers of get_frame()
+                          that need every frame; latest-frame consumers never need it
+            capture_mode: 'copy' to allocate each frame, 'ring' to decode into
+                          preallocated buffers that consumers lease without copying,
+                          'demand' to only grab frames and decode when a consumer asks
+            ring_size: Number of preallocated buffers in ring mode
+            open_timeout: Seconds to wait when opening a network stream
+            read_timeout: Seconds a network stream read may block
+            stall_timeout: Seconds without a new frame before a live source is reopened
+            reconnect_max_backoff: Upper bound in seconds for the reconnect delay
+            sequential: For video files, queue every frame in order and block the
+                        reader while the queue is full instead of dropping frames
+            backend: 'opencv' or 'ffmpeg' (decode in an ffmpeg subprocess; files and URLs only)
+            ffmpeg_options: FFmpegCapture options such as width/height (scale while
+                            decoding), rtsp_transport, threads and hwaccel
+            bus: Optional frame bus (see frame_bus.py) every captured frame is published to
+            bus_topic: Topic frames are published on, e.g. 'frames/dock'
         """
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
+        if capture_mode == CAPTURE_DEMAND and queue_frames:
+            raise ValueError("queue_frames needs every frame decoded and cannot be used in demand mode")
+        if sequential and capture_mode != CAPTURE_COPY:
+            raise ValueError("Sequential mode keeps every frame and only supports the 'copy' capture mode")
+        if backend not in (BACKEND_OPENCV, BACKEND_FFMPEG):
+            raise ValueError(f"Unknown capture backend: {backend}")
+        if backend == BACKEND_FFMPEG and not isinstance(source, str):
+            raise ValueError("The ffmpeg backend needs a video file path or stream URL")
+        if bus is not None and (not bus_topic or capture_mode == CAPTURE_DEMAND):
+            raise ValueError("Publishing to a bus needs a bus_topic and every frame decoded (not demand mode)")
+        if bus is not None and not isinstance(bus, InProcessBus):
+            raise TypeError("Frames can only be published on an InProcessBus or SocketBusServer")
+        
         self.source = source
         self.buffer_size = buffer_size
+        self.queue_frames = queue_frames or sequential
+        self.sequential = sequential
+        self.backend = backend
+        self.ffmpeg_options = ffmpeg_options or {}
+        self.capture_mode = capture_mode
+        self.bus = bus
+        self.bus_topic = bus_topic
+        self.ring_size = ring_size
+        self.ring = None
         self.cap = None
+        self.latest_frame = LatestFrameBuffer()
+        self._last_read_sequence = 0
+        self._read_lock = threading.Lock()
+        # Demand mode: the capture thread only grabs; consumers decode the newest grab
+        self._cap_lock = threading.Lock()
+        self._grab_condition = threading.Condition()
+        self._grab_sequence = 0
+        self._grab_timestamp = 0.0
+        self._media_origin = None  # Wall time at which a paced video file's media time 0 plays
+        self._failed_grab_sequence = 0  # Newest grab that could not be decoded
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
         self.frame_queue = queue.Queue(maxsize=buffer_size)
         self.capture_thread = None
         self.is_running = False
@@ -29,6 +299,73 @@ class CameraManager:
         self.frame_width = 640
         self.frame_height = 480
         
+        # Connection supervision
+        self.open_timeout = open_timeout
+        self.read_timeout = read_timeout
+        self.stall_timeout = stall_timeout
+        self.reconnect_max_backoff = reconnect_max_backoff
+        self.state = STATE_DISCONNECTED
+        self.reconnects = 0
+        self.dropped_frames = 0
+        self.connected_at = None
+        self.last_frame_time = None
+        self._last_position = 0.0
+        # Kept across reconnects so a stream that keeps dropping backs off further each time
+        self._reconnect_backoff = self.RECONNECT_INITIAL_BACKOFF
+        self._stop_event = threading.Event()
+        self._log_times = {}
+        self._suppressed_logs = {}
+    
+    @property
+    def is_file_source(self) -> bool:
+        """True for video files, which end instead of being reconnected."""
+        return isinstance(self.source, str) and not self.source.isdigit() and '://' not in self.source
+    
+    def _open_capture(self) -> Union[cv2.VideoCapture, FFmpegCapture]:
+        """Open the source with the configured backend, applying open/read timeouts to network streams."""
+        if self.backend == BACKEND_FFMPEG:
+            return FFmpegCapture(self.source, open_timeout=self.open_timeout,
+                                 read_timeout=self.read_timeout, **self.ffmpeg_options)
+        
+        params = []
+        if isinstance(self.source, str) and '://' in self.source:
+            # Timeout properties only exist in newer OpenCV builds
+            open_prop = getattr(cv2, 'CAP_PROP_OPEN_TIMEOUT_MSEC', None)
+            read_prop = getattr(cv2, 'CAP_PROP_READ_TIMEOUT_MSEC', None)
+            if open_prop is not None:
+                params += [open_prop, int(self.open_timeout * 1000)]
+            if read_prop is not None:
+                params += [read_prop, int(self.read_timeout * 1000)]
+        
+        if params:
+            return cv2.VideoCapture(self.source, cv2.CAP_ANY, params)
+        return cv2.VideoCapture(self.source)
+    
+    def _log(self, key: str, message: str):
+        """Print a message at most once per LOG_INTERVAL for each key, counting suppressed repeats."""
+        now = time.time()
+        if now - self._log_times.get(key, 0.0) < self.LOG_INTERVAL:
+            self._suppressed_logs[key] = self._suppressed_logs.get(key, 0) + 1
+            return
+        
+        suppressed = self._suppressed_logs.pop(key, 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages suppressed)"
+        self._log_times[key] = now
+        print(message)
+        
+    @property
+    def frame_sequence(self) -> int:
+        """Sequence number of the newest captured (in demand mode: grabbed) frame."""
+        if self.capture_mode == CAPTURE_DEMAND:
+            return self._grab_sequence
+        return self.latest_frame.sequence
+    
+    @property
+    def end_of_stream(self) -> bool:
+        """True once a sequential video file has been read to the end and fully consumed."""
+        return self.state == STATE_ENDED and self.frame_queue.empty()
+    
     def connect(self) -> bool:
         """
         Connect to the video source.
@@ -36,11 +373,18 @@ class CameraManager:
         Returns:
             True if connection successful, False otherwise
         """
+        if self.sequential and not self.is_file_source:
+            print(f"Error: Sequential mode needs a video file, got: {self.source}")
+            return False
+        
+        self.state = STATE_CONNECTING
         try:
-            self.cap = cv2.VideoCapture(self.source)
+            self.cap = self._open_capture()
             
             if not self.cap.isOpened():
                 print(f"Error: Could not open video source: {self.source}")
+                self.cap = None
+                self.state = STATE_DISCONNECTED
                 return False
             
             # Set camera properties for higher performance
@@ -58,11 +402,18 @@ class CameraManager:
             self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             self.fps = int(self.cap.get(cv2.CAP_PROP_FPS))
             
+            self.connected_at = time.time()
+            self.last_frame_time = None
+            self._last_position = 0.0
+            self._media_origin = None
+            self.state = STATE_CONNECTED
+            
             print(f"Connected to camera: {self.frame_width}x{self.frame_height} @ {self.fps}fps")
             return True
             
         except Exception as e:
             print(f"Error connecting to camera: {e}")
+            self.state = STATE_DISCONNECTED
             return False
     
     def start_capture(self) -> bool:
@@ -81,6 +432,7 @@ class CameraManager:
             return True
         
         self.is_running = True
+        self._stop_event.clear()
         self.capture_thread = threading.Thread(target=self._capture_frames, daemon=True)
         self.capture_thread.start()
         
@@ -90,15 +442,19 @@ class CameraManager:
     def stop_capture(self):
         """Stop video capture and clean up resources."""
         self.is_running = False
+        self._stop_event.set()
+        with self._grab_condition:
+            self._grab_condition.notify_all()
         
         if self.capture_thread and self.capture_thread.is_alive():
             self.capture_thread.join(timeout=2.0)
         
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        self._close_capture()
+        self.state = STATE_STOPPED
         
-        # Clear the frame queue
+        # Clear the latest frame and the frame queue
+        self.latest_frame.clear()
+        self.ring = None
         while not self.frame_queue.empty():
             try:
                 self.frame_queue.get_nowait()
@@ -108,68 +464,420 @@ class CameraManager:
         print("Video capture stopped")
     
     def _capture_frames(self):
-        """Internal method to capture frames in a separate thread."""
-        while self.is_running and self.cap and self.cap.isOpened():
+        """
+        Internal method to capture frames in a separate thread. Supervises the
+        connection: a live source that fails or stops delivering new frames for
+        stall_timeout seconds is reopened with exponential backoff, while a
+        video file ends capture when it runs out of frames.
+        """
+        while self.is_running:
+            if self.cap is None or not self.cap.isOpened():
+                if self.is_file_source or not self._reconnect():
+                    break
+                continue
+            
             try:
-                ret, frame = self.cap.read()
+                ret, frame, slot = self._read_frame()
+                new_frame = ret and self._is_new_frame()
+                
+                if new_frame:
+                    self.last_frame_time = time.time()
+                    if self.last_frame_time - (self.connected_at or self.last_frame_time) >= self.BACKOFF_RESET_AFTER:
+                        self._reconnect_backoff = self.RECONNECT_INITIAL_BACKOFF
+                
+                if not ret and self.is_file_source:
+                    print("Reached end of video file")
+                    self.state = STATE_ENDED
+                    break
                 
                 if not ret:
-                    print("Failed to capture frame")
-                    if isinstance(self.source, str) and not self.source.isdigit():
-                        # For video files, we might have reached the end
-                        print("Reached end of video file")
-                        break
+                    self.dropped_frames += 1
+                    self._log('read', f"Failed to capture frame from {self.source}")
+                
+                # Reads that succeed but repeat the last frame count as a stall too
+                if (not self.is_file_source and
+                        time.time() - (self.last_frame_time or self.connected_at or 0.0) >= self.stall_timeout):
+                    self._log('stall', f"No new frames from {self.source} for "
+                                       f"{self.stall_timeout:g}s, reconnecting")
+                    if slot is not None:
+                        self.ring.abandon(slot)
+                    self._close_capture()
+                    continue
+                
+                if not ret:
+                    self._stop_event.wait(0.05)  # Don't spin on a failing stream
+                    continue
+                
+                if frame is None:
+                    continue  # Nothing to publish (deferred decode or ring overrun)
+                
+                if not new_frame:
+                    # The source handed back the frame we already have
+                    if slot is not None:
+                        self.ring.abandon(slot)
                     continue
                 
                 # Add timestamp to frame
                 timestamp = time.time()
                 
-                # If queue is full, remove oldest frame
-                if self.frame_queue.full():
-                    try:
-                        self.frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
+                if self.bus is not None:
+                    # Ring slots are reused, so in-process subscribers get a copy
+                    self.bus.publish(self.bus_topic, frame if slot is None else frame.copy(),
+                                     {'source': str(self.source), 'fps': self.fps}, timestamp)
                 
-                # Add new frame to queue
-                self.frame_queue.put((frame, timestamp), block=False)
+                if self.sequential:
+                    self._enqueue_sequential(frame, timestamp)
+                    continue
+                
+                if slot is not None:
+                    # Commit before notifying so woken readers lease this frame
+                    self.ring.commit(slot, timestamp, self.latest_frame.sequence + 1)
+                
+                # Publish to the single-slot buffer for latest-frame consumers
+                self.latest_frame.put(frame, timestamp)
+                
+                if self.queue_frames:
+                    # Ring slots are reused, so queued frames must be copies
+                    self._enqueue_frame(frame if slot is None else frame.copy(), timestamp)
                 
             except Exception as e:
-                print(f"Error in frame capture: {e}")
-                time.sleep(0.1)
+                self._log('error', f"Error in frame capture: {e}")
+                self._stop_event.wait(0.1)
         
         self.is_running = False
     
+    def _is_new_frame(self) -> bool:
+        """
+        Check that the last read moved the stream position forward. Sources
+        that report no position (most webcams) always count as new.
+        """
+        with self._cap_lock:
+            position = self.cap.get(cv2.CAP_PROP_POS_MSEC) if self.cap is not None else 0.0
+        if position <= 0:
+            return True
+        is_new = position != self._last_position
+        self._last_position = position
+        return is_new
+    
+    def _close_capture(self):
+        """Release the capture device."""
+        with self._cap_lock:
+            if self.cap:
+                self.cap.release()
+                self.cap = None
+        self.connected_at = None
+    
+    def _reconnect(self) -> bool:
+        """
+        Reopen a live source, doubling the delay after each attempt. The delay
+        is kept between calls, so a stream that reconnects and drops again
+        waits longer each time; it starts over once the stream has delivered
+        frames for BACKOFF_RESET_AFTER seconds.
+        
+        Returns:
+            True once reconnected, False if capture was stopped first
+        """
+        self._close_capture()
+        self.state = STATE_RECONNECTING
+        
+        while self.is_running:
+            backoff = self._reconnect_backoff
+            if self._stop_event.wait(backoff):
+                break
+            self._reconnect_backoff = min(backoff * 2, self.reconnect_max_backoff)
+            if self.connect():
+                self.reconnects += 1
+                print(f"Reconnected to video source: {self.source} (after {backoff:g}s)")
+                return True
+            
+            self.state = STATE_RECONNECTING
+            self._log('reconnect', f"Reconnect to {self.source} failed, "
+                                   f"retrying in {self._reconnect_backoff:g}s")
+        
+        return False
+    
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray], Optional[int]]:
+        """
+        Read one frame according to the capture mode.
+        
+        Returns:
+            Tuple of (success, frame, ring slot). A successful read with no frame
+            means there is nothing to publish: in demand mode the frame was only
+            grabbed, in ring mode it was skipped because no slot was free.
+        """
+        self._pace_file()
+        
+        if self.capture_mode == CAPTURE_DEMAND:
+            return self._grab_frame(), None, None
+        
+        if self.capture_mode != CAPTURE_RING:
+            ret, frame = self.cap.read()
+            return ret, frame, None
+        
+        if self.ring is None:
+            # Size the ring from the first frame
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None, None
+            self.ring = FrameRingBuffer(self.ring_size, frame.shape, frame.dtype)
+            slot = self.ring.acquire_write_slot()
+            np.copyto(self.ring.buffers[slot], frame)
+            return True, self.ring.buffers[slot], slot
+        
+        slot = self.ring.acquire_write_slot()
+        if slot is None:
+            # Consumers hold every slot: keep the stream current without decoding
+            self.cap.grab()
+            return True, None, None
+        
+        buffer = self.ring.buffers[slot]
+        ret, frame = self.cap.read(image=buffer)
+        if not ret:
+            self.ring.abandon(slot)
+            return False, None, None
+        
+        if frame is not buffer:
+            # Resolution changed; reallocate the ring (outstanding leases keep their arrays)
+            self.ring.abandon(slot)
+            self.ring = FrameRingBuffer(self.ring_size, frame.shape, frame.dtype)
+            slot = self.ring.acquire_write_slot()
+            np.copyto(self.ring.buffers[slot], frame)
+            return True, self.ring.buffers[slot], slot
+        
+        return True, buffer, slot
+    
+    def _pace_file(self):
+        """
+        Hold a non-sequential video file to its media time, like a live camera;
+        otherwise capture races through the file and consumers see few of its frames.
+        """
+        if not self.is_file_source or self.sequential or self.fps <= 0:
+            return
+        with self._cap_lock:
+            frames_read = self.cap.get(cv2.CAP_PROP_POS_FRAMES)
+            last_time = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        # Media time of the frame about to be read
+        media_time = last_time + 1.0 / self.fps if frames_read > 0 else 0.0
+        now = time.time()
+        if self._media_origin is None or now - (self._media_origin + media_time) > 1.0:
+            # First frame, or far behind (slow decoding): restart the clock rather than burst
+            self._media_origin = now - media_time
+        delay = self._media_origin + media_time - now
+        if delay > 0:
+            self._stop_event.wait(delay)
+    
+    def _grab_frame(self) -> bool:
+        """Grab the next frame without decoding it and wake waiting consumers."""
+        with self._cap_lock:
+            ret = self.cap.grab()
+        if ret:
+            with self._grab_condition:
+                self._grab_sequence += 1
+                self._grab_timestamp = time.time()
+                self.frames_grabbed += 1
+                self._grab_condition.notify_all()
+        return ret
+    
+    def _wait_for_grab(self, after_sequence: int, timeout: Optional[float]) -> bool:
+        """Block until a frame newer than the given sequence number has been grabbed."""
+        with self._grab_condition:
+            return self._grab_condition.wait_for(
+                lambda: self._grab_sequence > after_sequence or not self.is_running, timeout
+            ) and self._grab_sequence > after_sequence
+    
+    def _retrieve_latest(self) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Decode the most recently grabbed frame. Each grab is decoded at most
+        once; concurrent consumers asking for the same grab share the result.
+        
+        Returns:
+            Tuple of (frame, timestamp, sequence) or None if decoding failed; the
+            failed grab then counts as consumed (see _failed_grab_sequence) and
+            is not retried
+        """
+        with self._cap_lock:
+            # Holding the cap lock keeps the grab thread from advancing the stream
+            sequence = self._grab_sequence
+            timestamp = self._grab_timestamp
+            decoded = self.latest_frame.get(sequence - 1)
+            if decoded is not None:
+                return decoded
+            if self.cap is None or sequence == self._failed_grab_sequence:
+                self._failed_grab_sequence = sequence
+                return None
+            
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                self._failed_grab_sequence = sequence
+                return None
+            self.frames_decoded += 1
+            self.latest_frame.put(frame, timestamp, sequence)
+            return frame, timestamp, sequence
+    
+    def _enqueue_sequential(self, frame: np.ndarray, timestamp: float):
+        """
+        Queue a file frame with its position and media timestamp, waiting for
+        room so no frame is lost.
+        """
+        # After a read, POS_FRAMES is the index of the next frame and POS_MSEC the time of this one
+        position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        media_timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if media_timestamp <= 0 and position > 0 and self.fps > 0:
+            media_timestamp = position / self.fps
+        
+        self.latest_frame.put(frame, timestamp)
+        while self.is_running:
+            try:
+                self.frame_queue.put((frame, media_timestamp, position), timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def get_next_frame(self, timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Get the next frame of a sequential video file, waiting until it is decoded.
+        
+        Args:
+            timeout: Maximum seconds to wait, None to wait until a frame or the end of the file
+            
+        Returns:
+            Tuple of (frame, media timestamp in seconds, frame position), or None
+            on timeout or once end_of_stream is reached
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            try:
+                return self.frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.end_of_stream or (not self.is_running and self.frame_queue.empty()):
+                    return None
+                if deadline is not None and time.time() >= deadline:
+                    return None
+    
+    def _enqueue_frame(self, frame: np.ndarray, timestamp: float):
+        """Add a frame to the frame queue, discarding the oldest frame if it is full."""
+        while True:
+            try:
+                self.frame_queue.put_nowait((frame, timestamp))
+                return
+            except queue.Full:
+                try:
+                    self.frame_queue.get_nowait()
+                except queue.Empty:
+                    pass
+    
     def get_frame(self) -> Optional[tuple]:
         """
-        Get the latest frame from the capture queue.
+        Get the next frame from the capture queue, or the latest frame when
+        the queue is disabled.
         
         Returns:
             Tuple of (frame, timestamp) or None if no frame available
         """
+        if not self.queue_frames:
+            return self.get_latest_frame()
+        
         try:
-            return self.frame_queue.get_nowait()
+            frame_data = self.frame_queue.get_nowait()
         except queue.Empty:
             return None
+        return frame_data[:2]
     
     def get_latest_frame(self) -> Optional[tuple]:
         """
-        Get the most recent frame, discarding any older frames in the queue.
+        Get the most recent frame if it has not been returned before.
         
         Returns:
-            Tuple of (frame, timestamp) or None if no frame available
+            Tuple of (frame, timestamp) or None if no new frame available
         """
-        latest_frame = None
+        with self._read_lock:
+            if self.capture_mode == CAPTURE_DEMAND:
+                if self._grab_sequence <= self._last_read_sequence:
+                    return None
+                frame_data = self._retrieve_latest()
+                if frame_data is None:
+                    # Don't retry a grab that failed to decode until a new one arrives
+                    self._last_read_sequence = max(self._last_read_sequence, self._failed_grab_sequence)
+                    return None
+                frame, timestamp, self._last_read_sequence = frame_data
+                return frame, timestamp
+            
+            if self.ring is not None:
+                # Ring slots get reused, so hand out a private copy
+                lease = self.ring.lease_latest(self._last_read_sequence)
+                if lease is None:
+                    return None
+                self._last_read_sequence = lease.sequence
+                with lease:
+                    return lease.frame.copy(), lease.timestamp
+            
+            frame_data = self.latest_frame.get(self._last_read_sequence)
+            if frame_data is None:
+                return None
+            frame, timestamp, self._last_read_sequence = frame_data
+        return frame, timestamp
+    
+    def wait_for_frame(self, after_sequence: int = 0,
+                       timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, float, int]]:
+        """
+        Block until a frame newer than the given sequence number has been captured.
+        Unlike get_latest_frame, each caller tracks its own sequence number, so
+        several consumers can follow the same camera independently.
         
-        # Get all frames and keep only the latest
-        while True:
-            try:
-                frame_data = self.frame_queue.get_nowait()
-                latest_frame = frame_data
-            except queue.Empty:
-                break
+        Args:
+            after_sequence: Sequence number of the last frame the caller has seen
+            timeout: Maximum seconds to wait, None to wait forever
+            
+        Returns:
+            Tuple of (frame, timestamp, sequence) or None on timeout
+        """
+        if self.capture_mode == CAPTURE_DEMAND:
+            deadline = None if timeout is None else time.time() + timeout
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.time())
+                if not self._wait_for_grab(after_sequence, remaining):
+                    return None
+                frame_data = self._retrieve_latest()
+                if frame_data is not None:
+                    return frame_data
+                # That grab could not be decoded; wait for the next one instead of retrying it
+                after_sequence = max(after_sequence, self._failed_grab_sequence)
+        
+        if self.ring is None:
+            return self.latest_frame.wait_for(after_sequence, timeout)
         
-        return latest_frame
+        lease = self.acquire_latest_frame(after_sequence, timeout)
+        if lease is None:
+            return None
+        with lease:
+            return lease.frame.copy(), lease.timestamp, lease.sequence
+    
+    def acquire_latest_frame(self, after_sequence: int = 0,
+                             timeout: Optional[float] = None) -> Optional[FrameLease]:
+        """
+        Block until a frame newer than the given sequence number is available and lease it.
+        In ring mode the lease references the ring slot directly (no copy) and
+        keeps it from being overwritten until released.
+        
+        Args:
+            after_sequence: Sequence number of the last frame the caller has seen
+            timeout: Maximum seconds to wait, None to wait forever
+            
+        Returns:
+            FrameLease or None on timeout
+        """
+        if self.capture_mode == CAPTURE_DEMAND:
+            frame_data = self.wait_for_frame(after_sequence, timeout)
+        else:
+            frame_data = self.latest_frame.wait_for(after_sequence, timeout)
+        if frame_data is None:
+            return None
+        
+        ring = self.ring
+        if ring is None:
+            frame, timestamp, sequence = frame_data
+            return FrameLease(None, -1, frame, timestamp, sequence)
+        return ring.lease_latest(after_sequence)
     
     def is_connected(self) -> bool:
         """
@@ -188,7 +896,11 @@ class CameraManager:
             Dictionary of camera properties
         """
         if not self.cap:
-            return {}
+            return {
+                'source': self.source,
+                'is_running': self.is_running,
+                'connection': self.get_connection_stats()
+            }
         
         return {
             'width': self.frame_width,
@@ -196,7 +908,36 @@ class CameraManager:
             'fps': self.fps,
             'source': self.source,
             'is_running': self.is_running,
-            'buffer_size': self.buffer_size
+            'buffer_size': self.buffer_size,
+            'queue_frames': self.queue_frames,
+            'sequential': self.sequential,
+            'backend': self.backend,
+            'capture_mode': self.capture_mode,
+            'frames_captured': (self._grab_sequence if self.capture_mode == CAPTURE_DEMAND
+                                else self.latest_frame.sequence),
+            'frames_grabbed': self.frames_grabbed,
+            'frames_decoded': self.frames_decoded,
+            'ring': self.ring.get_stats() if self.ring else None,
+            'bus_topic': self.bus_topic,
+            'connection': self.get_connection_stats()
+        }
+    
+    def get_connection_stats(self) -> dict:
+        """
+        Get connection state and reliability counters.
+        
+        Returns:
+            Dictionary with state, reconnects, dropped frames, uptime and frame age
+        """
+        now = time.time()
+        connected = self.state == STATE_CONNECTED and self.connected_at is not None
+        return {
+            'state': self.state,
+            'reconnects': self.reconnects,
+            'dropped_frames': self.dropped_frames,
+            'uptime': round(now - self.connected_at, 1) if connected else 0.0,
+            'last_frame_age': round(now - self.last_frame_time, 2) if self.last_frame_time else None,
+            'reconnect_backoff': self._reconnect_backoff
         }
     
     def set_resolution(self, width: int, height: int) -> bool:
@@ -251,20 +992,24 @@ class MultiCameraManager:
         self.is_running = False
     
     def add_camera(self, camera_id: str, source: Union[int, str], 
-                   buffer_size: int = 10) -> bool:
+                   buffer_size: int = 10, queue_frames: bool = False,
+                   capture_mode: str = CAPTURE_COPY) -> bool:
         """
         Add a camera to the manager.
         
         Args:
             camera_id: Unique identifier for the camera
             source: Camera source
-            buffer_size: Frame buffer size
+            buffer_size: Frame queue size (when queue_frames is enabled)
+            queue_frames: Keep a queue of frames for consumers that need every frame
+            capture_mode: 'copy', 'ring' (preallocated, zero-copy leases) or
+                          'demand' (decode only frames that are requested)
             
         Returns:
             True if camera added successfully, False otherwise
         """
         try:
-            camera = CameraManager(source, buffer_size)
+            camera = CameraManager(source, buffer_size, queue_frames, capture_mode)
             if camera.connect():
                 self.cameras[camera_id] = camera
                 print(f"Camera '{camera_id}' added successfully")
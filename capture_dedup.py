@@ -0,0 +1,142 @@
+"""
+Capture Deduplication for SafetyMaster Pro
+Recognizes near-identical violation captures (a worker standing in one spot
+produces hundreds) with a 64-bit difference hash of a downscaled frame. Each
+camera keeps a small index of its recent captures; a capture within the
+Hamming threshold of one of them is stored as a reference to it instead of a
+new image.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Compute the difference hash of an image: the sign of the horizontal
+    gradient on a (hash_size + 1) x hash_size grayscale thumbnail.
+
+    Args:
+        frame: BGR or grayscale image
+        hash_size: Hash grid size; the hash has hash_size² bits
+
+    Returns:
+        The hash as an integer
+    """
+    # Subsample first so the area resize only touches a fraction of the pixels
+    step = max(1, min(frame.shape[0] // (hash_size * 8), frame.shape[1] // (hash_size * 8)))
+    small = frame[::step, ::step]
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    thumbnail = cv2.resize(small, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+class CaptureEntry:
+    """A stored capture in a camera's recent index."""
+
+    __slots__ = ('hash', 'filepath', 'timestamp', 'duplicates')
+
+    def __init__(self, hash_value: int, filepath: str, timestamp: float):
+        self.hash = hash_value
+        self.filepath = filepath
+        self.timestamp = timestamp
+        self.duplicates = 0
+
+
+class CaptureDeduplicator:
+    """
+    Per-camera index of recent capture hashes. Captures match only stored
+    captures of the same camera that are younger than the window, so a
+    violation that persists still gets a fresh image every window.
+    """
+
+    def __init__(self, threshold: int = 6, window_seconds: float = 60.0, index_size: int = 32):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            threshold: Largest Hamming distance (out of 64 bits) treated as a duplicate
+            window_seconds: How long a stored capture absorbs duplicates
+            index_size: Recent captures remembered per camera
+        """
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.index_size = index_size
+        self._index: Dict[str, Deque[CaptureEntry]] = {}
+        self._lock = threading.Lock()
+
+        self.checked = 0
+        self.duplicates = 0
+
+    def find(self, camera_id: str, frame: np.ndarray) -> Tuple[Optional[str], int]:
+        """
+        Look up a capture before it is written.
+
+        Args:
+            camera_id: Camera the capture comes from
+            frame: Captured image
+
+        Returns:
+            Tuple of (path of the stored capture it duplicates or None, hash of
+            the frame); pass the hash to add() once a new capture is written
+        """
+        hash_value = dhash(frame)
+        now = time.time()
+        with self._lock:
+            self.checked += 1
+            entries = self._index.get(camera_id, ())
+            best = None
+            for entry in entries:
+                if now - entry.timestamp > self.window_seconds:
+                    continue
+                distance = hamming_distance(hash_value, entry.hash)
+                if distance <= self.threshold and (best is None or distance < best[0]):
+                    best = (distance, entry)
+            if best is None:
+                return None, hash_value
+            best[1].duplicates += 1
+            self.duplicates += 1
+            return best[1].filepath, hash_value
+
+    def add(self, camera_id: str, hash_value: int, filepath: str):
+        """Index a capture that has been written to disk."""
+        with self._lock:
+            entries = self._index.setdefault(camera_id, deque(maxlen=self.index_size))
+            now = time.time()
+            while entries and now - entries[0].timestamp > self.window_seconds:
+                entries.popleft()
+            entries.append(CaptureEntry(hash_value, filepath, now))
+
+    def forget(self, filepath: str):
+        """Remove a capture that is being deleted (e.g. by retention) from the index."""
+        filepath = os.path.abspath(filepath)
+        with self._lock:
+            for entries in self._index.values():
+                for entry in list(entries):
+                    if os.path.abspath(entry.filepath) == filepath:
+                        entries.remove(entry)
+
+    def get_stats(self) -> dict:
+        """Get duplicate counters and index sizes."""
+        with self._lock:
+            return {
+                'threshold': self.threshold,
+                'window_seconds': self.window_seconds,
+                'checked': self.checked,
+                'duplicates': self.duplicates,
+                'duplicate_rate': round(self.duplicates / self.checked, 3) if self.checked else 0.0,
+                'indexed': {camera_id: len(entries) for camera_id, entries in self._index.items()}
+            }
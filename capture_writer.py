@@ -0,0 +1,316 @@
+"""
+Capture Writer for SafetyMaster Pro
+Saves violation images and their metadata on a background thread, so a slow
+disk or network share never stalls detection. Images are JPEG-encoded and
+written off the hot path; metadata lines are appended to one JSONL file in
+batches.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from capture_dedup import CaptureDeduplicator
+from pipeline import DROP_NEWEST, DROP_OLDEST, DROP_POLICIES
+
+
+class CaptureRequest:
+    """One image waiting to be written."""
+
+    def __init__(self, frame: np.ndarray, filepath: str, metadata: Optional[Dict],
+                 on_saved: Optional[Callable[[str, bool], None]],
+                 camera_id: Optional[str] = None, image_hash: Optional[int] = None):
+        self.frame = frame
+        self.filepath = filepath
+        self.metadata = metadata
+        self.on_saved = on_saved
+        self.camera_id = camera_id
+        self.image_hash = image_hash
+        self.enqueued_at = time.monotonic()
+
+
+class CaptureWriter:
+    """
+    Background writer for violation captures. The queue is bounded; when the
+    disk falls behind, the drop policy decides whether the oldest queued
+    capture is discarded, the new one is rejected, or the caller waits.
+    """
+
+    def __init__(self, metadata_path: str, max_queue: int = 32,
+                 drop_policy: str = DROP_OLDEST, jpeg_quality: int = 95,
+                 block_timeout: float = 1.0, metadata_batch: int = 20,
+                 metadata_flush_interval: float = 1.0,
+                 on_written: Optional[Callable[[str, int, Optional[Dict]], None]] = None,
+                 deduplicator: Optional[CaptureDeduplicator] = None):
+        """
+        Initialize the writer and start its thread.
+
+        Args:
+            metadata_path: JSONL file that capture metadata is appended to
+            max_queue: Captures held in memory while waiting to be written
+            drop_policy: 'drop_oldest', 'drop_newest' or 'block' when the queue is full
+            jpeg_quality: JPEG quality (1-100)
+            block_timeout: Longest wait for room with the 'block' policy before dropping
+            metadata_batch: Metadata lines buffered before they are written together
+            metadata_flush_interval: Longest time in seconds a metadata line stays buffered
+            on_written: Called with (filepath, size in bytes, metadata) after every
+                        successful write, e.g. to track the file for retention
+            deduplicator: Stores near-duplicates of recent captures as references
+                          to them instead of writing the image again
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+
+        self.metadata_path = metadata_path
+        self.max_queue = max(1, max_queue)
+        self.drop_policy = drop_policy
+        self.jpeg_quality = jpeg_quality
+        self.block_timeout = block_timeout
+        self.metadata_batch = max(1, metadata_batch)
+        self.metadata_flush_interval = metadata_flush_interval
+        self.on_written = on_written
+        self.deduplicator = deduplicator
+
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._pending_metadata = []
+        self._last_metadata_flush = time.monotonic()
+        self._busy = False
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.metadata_writes = 0
+        self.max_queue_depth = 0
+        self._write_latencies = collections.deque(maxlen=500)
+        self._queue_delays = collections.deque(maxlen=500)
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name='capture-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray, filepath: str, metadata: Optional[Dict] = None,
+               on_saved: Optional[Callable[[str, bool], None]] = None,
+               copy: bool = True, camera_id: Optional[str] = None) -> Optional[str]:
+        """
+        Queue an image (and optional metadata) for writing.
+
+        Args:
+            frame: BGR image to save as JPEG
+            filepath: Destination path of the image
+            metadata: JSON-serializable details appended to the metadata file
+            on_saved: Callback receiving (filepath, success) once the write finished
+            copy: Copy the frame first; pass False only for frames nobody modifies later
+            camera_id: Camera the capture comes from, used for deduplication
+                       (defaults to metadata['camera_id'])
+
+        Returns:
+            Path the image is stored at, which is an earlier capture's path if this
+            one is a near-duplicate of it, or None if the capture was dropped
+            because the queue was full
+        """
+        if not self.is_running:
+            raise RuntimeError("CaptureWriter has been closed")
+
+        image_hash = None
+        if self.deduplicator is not None:
+            if camera_id is None:
+                camera_id = (metadata or {}).get('camera_id', 'default')
+            original, image_hash = self.deduplicator.find(camera_id, frame)
+            if original is not None:
+                return self._add_reference(original, filepath, metadata, on_saved)
+
+        request = CaptureRequest(frame.copy() if copy else frame, filepath, metadata, on_saved,
+                                 camera_id, image_hash)
+        dropped = None
+        with self._condition:
+            if not self.is_running:
+                raise RuntimeError("CaptureWriter has been closed")
+            self.submitted += 1
+            if len(self._queue) >= self.max_queue:
+                if self.drop_policy == DROP_OLDEST:
+                    dropped = self._queue.popleft()
+                elif self.drop_policy == DROP_NEWEST:
+                    dropped = request
+                elif not self._condition.wait_for(lambda: len(self._queue) < self.max_queue,
+                                                   self.block_timeout):
+                    dropped = request
+
+            if dropped is not None:
+                self.dropped += 1
+                dropped_count = self.dropped
+            if dropped is not request:
+                self._queue.append(request)
+                self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify_all()
+
+        if dropped is not None:
+            if dropped_count == 1 or dropped_count % 100 == 0:
+                print(f"Capture queue full, dropped {dropped.filepath} ({dropped_count} dropped so far)")
+            if dropped.on_saved:
+                dropped.on_saved(dropped.filepath, False)
+        return filepath if dropped is not request else None
+
+    def _add_reference(self, original: str, filepath: str, metadata: Optional[Dict],
+                       on_saved: Optional[Callable[[str, bool], None]]) -> str:
+        """Record a near-duplicate as metadata pointing at the stored capture."""
+        with self._condition:
+            self.submitted += 1
+            self.duplicates += 1
+            if metadata is not None:
+                self._pending_metadata.append(dict(metadata, image_path=original,
+                                                   duplicate_of=original,
+                                                   duplicate_filename=os.path.basename(filepath)))
+                # Wake the writer so the line is flushed on schedule
+                self._condition.notify_all()
+        if on_saved:
+            on_saved(original, True)
+        return original
+
+    def _run(self):
+        """Writer loop: write queued images and flush metadata in batches."""
+        while True:
+            with self._condition:
+                if not self._queue and self.is_running:
+                    # Woken by captures, duplicate references, or when buffered metadata is due
+                    self._condition.wait(self._metadata_wait())
+                if not self._queue and not self.is_running:
+                    break
+                request = self._queue.popleft() if self._queue else None
+                self._busy = request is not None
+                # Wake submitters blocked on a full queue
+                self._condition.notify_all()
+
+            if request is not None:
+                self._write(request)
+            self._flush_metadata()
+
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+        self._flush_metadata(force=True)
+
+    def _metadata_wait(self) -> Optional[float]:
+        """Time until buffered metadata is due, or None to wait for the next capture."""
+        if not self._pending_metadata:
+            return None
+        return max(0.0, self._last_metadata_flush + self.metadata_flush_interval - time.monotonic())
+
+    def _write(self, request: CaptureRequest):
+        """Encode and write one image."""
+        start_time = time.monotonic()
+        success = False
+        try:
+            ok, buffer = cv2.imencode('.jpg', request.frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            directory = os.path.dirname(request.filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write to a temporary name so readers never see a partial image
+            temp_path = request.filepath + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(buffer)
+            os.replace(temp_path, request.filepath)
+            success = True
+        except (OSError, ValueError, cv2.error) as e:
+            print(f"Error writing capture {request.filepath}: {e}")
+            with self._condition:
+                self.errors += 1
+
+        elapsed = time.monotonic() - start_time
+        with self._condition:
+            self._queue_delays.append(start_time - request.enqueued_at)
+            if success:
+                self.written += 1
+                self.bytes_written += len(buffer)
+                self._write_latencies.append(elapsed)
+                if request.metadata is not None:
+                    self._pending_metadata.append(dict(request.metadata, image_path=request.filepath))
+
+        if success and request.image_hash is not None:
+            # Only images on disk are offered as originals, so a dropped or failed
+            # capture is never referenced
+            self.deduplicator.add(request.camera_id, request.image_hash, request.filepath)
+        if success and self.on_written:
+            self.on_written(request.filepath, len(buffer), request.metadata)
+        if request.on_saved:
+            request.on_saved(request.filepath, success)
+
+    def _flush_metadata(self, force: bool = False):
+        """Append buffered metadata lines in one write once the batch is full or due."""
+        with self._condition:
+            if not self._pending_metadata:
+                return
+            due = time.monotonic() - self._last_metadata_flush >= self.metadata_flush_interval
+            if not (force or due or len(self._pending_metadata) >= self.metadata_batch):
+                return
+            lines, self._pending_metadata = self._pending_metadata, []
+            self._last_metadata_flush = time.monotonic()
+
+        try:
+            directory = os.path.dirname(self.metadata_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.metadata_path, 'a') as f:
+                f.write(''.join(json.dumps(line, default=str) + '\n' for line in lines))
+            with self._condition:
+                self.metadata_writes += 1
+        except OSError as e:
+            print(f"Error writing capture metadata: {e}")
+            with self._condition:
+                self.errors += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued capture is written and metadata is on disk."""
+        with self._condition:
+            done = self._condition.wait_for(lambda: not self._queue and not self._busy, timeout)
+        self._flush_metadata(force=True)
+        return done
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued, then stop the writer thread."""
+        with self._condition:
+            self.is_running = False
+            self._condition.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        """Get queue depth, drop counters and write latency."""
+        with self._condition:
+            latencies = sorted(self._write_latencies)
+            delays = list(self._queue_delays)
+            return {
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'max_queue_depth': self.max_queue_depth,
+                'drop_policy': self.drop_policy,
+                'submitted': self.submitted,
+                'written': self.written,
+                'dropped': self.dropped,
+                'duplicates': self.duplicates,
+                'errors': self.errors,
+                'bytes_written': self.bytes_written,
+                'metadata_writes': self.metadata_writes,
+                'avg_write_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+                'p95_write_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else 0.0,
+                'avg_queue_delay_ms': round(sum(delays) / len(delays) * 1000, 2) if delays else 0.0,
+                'dedup': self.deduplicator.get_stats() if self.deduplicator else None
+            }
+
+
+def capture_filename(prefix: str, camera_id: Optional[str] = None) -> str:
+    """Timestamped JPEG file name, unique to the millisecond."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    return f"{prefix}_{camera_id}_{timestamp}.jpg" if camera_id else f"{prefix}_{timestamp}.jpg"
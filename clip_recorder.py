@@ -0,0 +1,370 @@
+"""
+Clip Recorder for SafetyMaster Pro
+Keeps the last few seconds of each camera's encoded stream in memory and,
+when a violation is confirmed, writes a clip covering the seconds before and
+after the event. Frames are the JPEGs produced for streaming: while buffering,
+the recorder is a 'full' quality viewer of the StreamHub. That makes the hub
+encode full quality on every frame, so a camera is only buffered while it is
+armed (people were seen within the last arm_seconds, so a violation may
+follow) or a clip is being collected.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from stream_hub import StreamFrame, StreamHub, Viewer
+
+
+class ClipJob:
+    """A clip being collected: buffered pre-event frames plus frames until end_time."""
+
+    def __init__(self, camera_id: str, event_time: float, start_time: float,
+                 end_time: float, frames: List[StreamFrame], event: Optional[Dict], part: int = 1):
+        self.camera_id = camera_id
+        self.event_time = event_time
+        self.start_time = start_time
+        self.end_time = end_time
+        self.frames = frames
+        self.events = [event] if event else []
+        self.bytes = sum(len(frame.jpeg) for frame in frames)
+        self.part = part  # Clips larger than the memory limit are written in parts
+
+
+class CameraClipBuffer:
+    """Ring of one camera's recent encoded frames, bounded by age and bytes."""
+
+    def __init__(self, camera_id: str, max_seconds: float, max_bytes: int):
+        self.camera_id = camera_id
+        self.viewer: Optional[Viewer] = None  # Subscribed to the hub only while buffering
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.frames: Deque[StreamFrame] = deque()
+        self.bytes = 0
+        self.job: Optional[ClipJob] = None
+        self.armed_until = 0.0
+        self.evicted = 0
+        self.thread = None
+        self.buffering_since = None
+        self.buffering_seconds = 0.0
+
+    def append(self, frame: StreamFrame):
+        """Add a frame, evicting the oldest frames beyond the age or byte limit."""
+        self.frames.append(frame)
+        self.bytes += len(frame.jpeg)
+        while self.frames and (self.bytes > self.max_bytes or
+                               frame.timestamp - self.frames[0].timestamp > self.max_seconds):
+            self.bytes -= len(self.frames.popleft().jpeg)
+            self.evicted += 1
+
+    def frames_since(self, start_time: float) -> List[StreamFrame]:
+        return [frame for frame in self.frames if frame.timestamp >= start_time]
+
+    def clear(self):
+        self.frames.clear()
+        self.bytes = 0
+
+
+class ClipRecorder:
+    """
+    Records pre/post-event clips for every registered camera. Clips are
+    written as MJPEG (.mjpg, the JPEGs back to back) with a JSON sidecar,
+    and optionally remuxed without re-encoding by ffmpeg.
+    """
+
+    def __init__(self, stream_hub: StreamHub, output_dir: str = 'violation_clips',
+                 pre_seconds: float = 5.0, post_seconds: float = 5.0,
+                 max_buffer_bytes: int = 64 * 1024 * 1024, max_clip_seconds: float = 60.0,
+                 quality: Optional[str] = None, remux_format: Optional[str] = None,
+                 ffmpeg_path: str = 'ffmpeg', arm_seconds: float = 30.0,
+                 on_written: Optional[Callable[[str, int, Dict], None]] = None):
+        """
+        Initialize the recorder.
+
+        Args:
+            stream_hub: Hub whose encoded frames are buffered
+            output_dir: Directory clips are written to
+            pre_seconds: Seconds before the event included in a clip
+            post_seconds: Seconds after the (last) event included in a clip
+            max_buffer_bytes: Memory limit of each camera's ring buffer, and of a
+                              clip being collected (larger clips are written in parts)
+            max_clip_seconds: Longest clip; later events start a new clip
+            quality: Ladder variant to record, defaults to the best ('full')
+            remux_format: Container to copy clips into with ffmpeg (e.g. 'mkv' or
+                          'avi'), None to keep the .mjpg
+            ffmpeg_path: ffmpeg executable used for remuxing
+            arm_seconds: How long after arm() a camera keeps being buffered
+            on_written: Called with (clip path, size in bytes, clip info) after every clip
+        """
+        self.stream_hub = stream_hub
+        self.output_dir = output_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_clip_seconds = max_clip_seconds
+        self.quality = quality or stream_hub.get_quality_names()[0]
+        self.remux_format = remux_format
+        self.ffmpeg_path = ffmpeg_path
+        self.arm_seconds = arm_seconds
+        self.on_written = on_written
+
+        self._cameras: Dict[str, CameraClipBuffer] = {}
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='clip-writer')
+        self._pending_writes = 0
+        self.clips_written = 0
+        self.write_errors = 0
+        self.recent_clips: Deque[Dict] = deque(maxlen=50)
+
+    def add_camera(self, camera_id: str):
+        """Register a camera; it is buffered once armed or triggered."""
+        with self._lock:
+            if camera_id not in self._cameras:
+                self._cameras[camera_id] = CameraClipBuffer(camera_id, self.pre_seconds,
+                                                            self.max_buffer_bytes)
+
+    def remove_camera(self, camera_id: str):
+        """Stop buffering a camera, writing any clip still being collected."""
+        with self._lock:
+            buffer = self._cameras.pop(camera_id, None)
+            if buffer is None:
+                return
+            viewer, thread = self._detach(buffer)
+        if viewer is not None:
+            self.stream_hub.unsubscribe(viewer)
+            thread.join(timeout=2.0)
+        with self._lock:
+            job, buffer.job = buffer.job, None
+        if job:
+            self._submit(job)
+
+    def arm(self, camera_id: str):
+        """
+        Keep buffering a camera for the next arm_seconds, so a clip of a
+        violation there includes the seconds before it. Call whenever the
+        camera shows people.
+        """
+        with self._lock:
+            buffer = self._cameras.get(camera_id)
+            if buffer is None:
+                return
+            buffer.armed_until = max(buffer.armed_until, time.time() + self.arm_seconds)
+            if buffer.viewer is None:
+                self._attach(buffer)
+
+    def is_buffering(self, camera_id: str) -> bool:
+        """Whether the recorder is currently subscribed to a camera's stream."""
+        with self._lock:
+            buffer = self._cameras.get(camera_id)
+            return buffer is not None and buffer.viewer is not None
+
+    def _attach(self, buffer: CameraClipBuffer):
+        """Subscribe to a camera's stream; must be called with the lock held."""
+        buffer.viewer = self.stream_hub.subscribe(buffer.camera_id, self.quality)
+        buffer.buffering_since = time.time()
+        buffer.thread = threading.Thread(target=self._buffer_frames, args=(buffer, buffer.viewer),
+                                         name=f'clip-buffer-{buffer.camera_id}', daemon=True)
+        buffer.thread.start()
+
+    def _detach(self, buffer: CameraClipBuffer):
+        """Stop buffering; must be called with the lock held. Returns the viewer and thread to clean up."""
+        viewer, buffer.viewer = buffer.viewer, None
+        if buffer.buffering_since is not None:
+            buffer.buffering_seconds += time.time() - buffer.buffering_since
+            buffer.buffering_since = None
+        buffer.clear()
+        return viewer, buffer.thread
+
+    def trigger(self, camera_id: str, event: Optional[Dict] = None,
+                event_time: Optional[float] = None) -> bool:
+        """
+        Record a clip around an event. An event during a clip that is still
+        collecting extends it instead of starting another one.
+
+        Args:
+            camera_id: Camera the event happened on
+            event: JSON-serializable event details saved with the clip
+            event_time: Epoch seconds of the event, defaults to now
+
+        Returns:
+            False if the camera is not being buffered
+        """
+        event_time = time.time() if event_time is None else event_time
+        with self._lock:
+            buffer = self._cameras.get(camera_id)
+            if buffer is None:
+                return False
+            if buffer.viewer is None:
+                # Not armed: the clip starts at the event, without pre-event frames
+                self._attach(buffer)
+
+            job = buffer.job
+            if job and event_time - job.start_time < self.max_clip_seconds:
+                job.end_time = min(max(job.end_time, event_time + self.post_seconds),
+                                   job.start_time + self.max_clip_seconds)
+                if event:
+                    job.events.append(event)
+                return True
+
+            if job:
+                # Clip is at its length limit: finish it and start a new one
+                buffer.job = None
+                self._submit(job)
+            start_time = event_time - self.pre_seconds
+            buffer.job = ClipJob(camera_id, event_time, start_time,
+                                 event_time + self.post_seconds,
+                                 buffer.frames_since(start_time), event)
+            return True
+
+    def _buffer_frames(self, buffer: CameraClipBuffer, viewer: Viewer):
+        """
+        Per-camera loop while subscribed: append encoded frames, finish clips
+        whose end has passed, and unsubscribe once disarmed with no clip open.
+        """
+        while not viewer.mailbox.closed:
+            frame = viewer.mailbox.get(timeout=0.5)
+            finished = None
+            idle = False
+            with self._lock:
+                if buffer.viewer is not viewer:
+                    break  # Removed or detached meanwhile
+                if frame is not None:
+                    buffer.append(frame)
+                    job = buffer.job
+                    if job and job.start_time <= frame.timestamp <= job.end_time:
+                        job.frames.append(frame)
+                        job.bytes += len(frame.jpeg)
+                        if job.bytes >= self.max_buffer_bytes and frame.timestamp < job.end_time:
+                            # Write what is collected so far and continue in a new part
+                            finished = job
+                            buffer.job = ClipJob(job.camera_id, job.event_time, frame.timestamp,
+                                                 job.end_time, [], None, job.part + 1)
+
+                # Finish once the post-event window has passed, even if the camera went quiet
+                job = buffer.job
+                if job and time.time() > job.end_time + 0.5:
+                    finished, buffer.job = job, None
+                elif job is None and time.time() > buffer.armed_until:
+                    self._detach(buffer)
+                    idle = True
+            if finished:
+                self._submit(finished)
+            if idle:
+                self.stream_hub.unsubscribe(viewer)
+                return
+
+    def _submit(self, job: ClipJob):
+        if not job.frames:
+            return
+        with self._lock:
+            self._pending_writes += 1
+        self._writer.submit(self._write_clip, job)
+
+    def _write_clip(self, job: ClipJob):
+        """Write a clip and its sidecar, then remux it if configured."""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.fromtimestamp(job.event_time).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            base_path = os.path.join(self.output_dir, f"clip_{job.camera_id}_{stamp}")
+            if job.part > 1:
+                base_path += f"_part{job.part}"
+            clip_path = base_path + '.mjpg'
+
+            with open(clip_path + '.tmp', 'wb') as f:
+                for frame in job.frames:
+                    f.write(frame.jpeg)
+            os.replace(clip_path + '.tmp', clip_path)
+
+            duration = job.frames[-1].timestamp - job.frames[0].timestamp
+            fps = (len(job.frames) - 1) / duration if duration > 0 else 1.0
+            if self.remux_format:
+                clip_path = self._remux(clip_path, f"{base_path}.{self.remux_format}", fps)
+
+            info = {
+                'camera_id': job.camera_id,
+                'path': clip_path,
+                'event_time': datetime.fromtimestamp(job.event_time).isoformat(),
+                'start_time': datetime.fromtimestamp(job.frames[0].timestamp).isoformat(),
+                'end_time': datetime.fromtimestamp(job.frames[-1].timestamp).isoformat(),
+                'duration': round(duration, 3),
+                'part': job.part,
+                'frames': len(job.frames),
+                'fps': round(fps, 2),
+                'bytes': job.bytes,
+                'events': job.events,
+                'frame_timestamps': [frame.timestamp for frame in job.frames]
+            }
+            with open(base_path + '.json', 'w') as f:
+                json.dump(info, f, default=str)
+
+            info.pop('frame_timestamps')
+            with self._lock:
+                self.clips_written += 1
+                self.recent_clips.append(info)
+            print(f"Saved {duration:.1f}s violation clip: {clip_path}")
+            if self.on_written:
+                self.on_written(clip_path, os.path.getsize(clip_path), info)
+        except OSError as e:
+            print(f"Error writing violation clip for {job.camera_id}: {e}")
+            with self._lock:
+                self.write_errors += 1
+        finally:
+            with self._lock:
+                self._pending_writes -= 1
+
+    def _remux(self, mjpeg_path: str, output_path: str, fps: float) -> str:
+        """Copy the JPEGs into a seekable container; keeps the .mjpg if ffmpeg fails."""
+        command = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+                   '-f', 'mjpeg', '-framerate', f'{fps:.3f}', '-i', mjpeg_path,
+                   '-c', 'copy', output_path]
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=60)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Could not remux clip with ffmpeg, keeping {mjpeg_path}: {e}")
+            return mjpeg_path
+        os.remove(mjpeg_path)
+        return output_path
+
+    def close(self):
+        """Stop buffering every camera and wait for clips to be written."""
+        with self._lock:
+            camera_ids = list(self._cameras)
+        for camera_id in camera_ids:
+            self.remove_camera(camera_id)
+        self._writer.shutdown(wait=True)
+
+    def get_stats(self) -> dict:
+        """Get per-camera buffer usage and clip counters."""
+        with self._lock:
+            cameras = {
+                camera_id: {
+                    'buffered_frames': len(buffer.frames),
+                    'buffered_seconds': round(buffer.frames[-1].timestamp - buffer.frames[0].timestamp, 2)
+                    if len(buffer.frames) > 1 else 0.0,
+                    'buffered_bytes': buffer.bytes,
+                    'max_bytes': buffer.max_bytes,
+                    'evicted': buffer.evicted,
+                    'buffering': buffer.viewer is not None,
+                    # Time subscribed at full quality, i.e. making the hub encode for clips
+                    'buffering_seconds': round(buffer.buffering_seconds + (time.time() - buffer.buffering_since
+                                               if buffer.buffering_since is not None else 0.0), 1),
+                    'recording': buffer.job is not None
+                }
+                for camera_id, buffer in self._cameras.items()
+            }
+            return {
+                'pre_seconds': self.pre_seconds,
+                'arm_seconds': self.arm_seconds,
+                'post_seconds': self.post_seconds,
+                'clips_written': self.clips_written,
+                'pending_writes': self._pending_writes,
+                'write_errors': self.write_errors,
+                'cameras': cameras,
+                'recent_clips': list(self.recent_clips)[-10:]
+            }
@@ -60,12 +60,58 @@ class SafetyConfig:
     CAMERA_RESOLUTION_HEIGHT = 480
     CAMERA_FPS = 30
     CAMERA_BUFFER_SIZE = 10
+    CAMERA_CAPTURE_MODE = 'copy'  # 'copy', 'ring' (decode into preallocated buffers, zero-copy hand-off)
+                                  # or 'demand' (grab continuously, decode only frames that are used)
+    CAMERA_RING_SIZE = 8  # Preallocated frame buffers per camera in ring mode
+    CAMERA_OPEN_TIMEOUT = 10.0  # Seconds to wait when opening a network stream
+    CAMERA_READ_TIMEOUT = 5.0  # Seconds a network stream read may block
+    CAMERA_STALL_TIMEOUT = 5.0  # Seconds without frames before a live camera is reconnected
+    CAMERA_RECONNECT_MAX_BACKOFF = 30.0  # Longest delay between reconnect attempts
+    CAMERA_BACKEND = 'opencv'  # 'opencv' or 'ffmpeg' (decode in an ffmpeg subprocess, files/URLs only)
+    CAMERA_FFMPEG_OPTIONS = {
+        'width': 0,  # Scale while decoding, e.g. 640 to match the inference size (0 keeps the source size)
+        'height': 0,  # 0 keeps the aspect ratio when only the width is set
+        'rtsp_transport': 'tcp',  # 'tcp' avoids smeared frames from UDP packet loss
+        'threads': 0  # Decoder threads, 0 lets ffmpeg decide
+    }
     
     # Image Capture Settings
     VIOLATION_CAPTURE_ENABLED = True
     VIOLATION_IMAGES_DIR = "violation_captures"
+    MANUAL_CAPTURES_DIR = "captures"  # Captures taken from the dashboard
     VIOLATION_IMAGE_QUALITY = 95  # JPEG quality (1-100)
     MAX_VIOLATION_IMAGES = 1000  # Maximum number of violation images to keep
+    MAX_VIOLATION_IMAGES_BYTES = 2 * 1024 * 1024 * 1024  # Most disk space used by violation images
+    MAX_VIOLATION_IMAGE_AGE_DAYS = 30  # Delete older images, None keeps them until another limit is hit
+    RETENTION_POLICY = 'oldest'  # Eviction order: 'oldest' or 'severity' (lowest severity first)
+    RETENTION_INTERVAL = 5.0  # Seconds between background retention passes
+    CAPTURE_QUEUE_SIZE = 32  # Captures held in memory while the disk catches up
+    CAPTURE_DROP_POLICY = 'drop_oldest'  # When the queue is full: 'drop_oldest', 'drop_newest' or 'block'
+    CAPTURE_METADATA_BATCH = 20  # Metadata lines appended to captures.jsonl per write
+    CAPTURE_METADATA_FLUSH_INTERVAL = 1.0  # Seconds before buffered metadata is written anyway
+    CAPTURE_DEDUP_ENABLED = True  # Store near-identical captures as references to an earlier image
+    CAPTURE_DEDUP_THRESHOLD = 6  # Largest difference-hash distance (of 64 bits) counted as a duplicate
+    CAPTURE_DEDUP_WINDOW = 60.0  # Seconds a capture absorbs duplicates; persisting violations get a new image after this
+    CAPTURE_DEDUP_INDEX_SIZE = 32  # Recent captures compared per camera
+    
+    # Violation Clip Settings (built from the already-encoded stream frames)
+    CLIP_RECORDING_ENABLED = True
+    CLIP_DIR = "violation_clips"
+    CLIP_PRE_SECONDS = 5.0  # Seconds before the violation included in a clip
+    CLIP_POST_SECONDS = 5.0  # Seconds after the last violation included in a clip
+    CLIP_MAX_SECONDS = 60.0  # Longest clip; ongoing violations beyond this start a new clip
+    CLIP_BUFFER_MAX_BYTES = 64 * 1024 * 1024  # Memory limit of each camera's frame ring buffer and open clip
+    # Buffering makes the stream hub encode full quality on every frame, so a camera is only
+    # buffered for this many seconds after people were last seen (or while a clip is open)
+    CLIP_ARM_SECONDS = 30.0
+    CLIP_MAX_TOTAL_BYTES = 5 * 1024 * 1024 * 1024  # Most disk space used by clips
+    CLIP_MAX_AGE_DAYS = 30  # Delete older clips, None keeps them until the size limit is hit
+    CLIP_REMUX_FORMAT = None  # e.g. 'mkv' to copy clips into a container with ffmpeg, None keeps .mjpg
+    
+    # Violation History Settings
+    VIOLATION_DB_PATH = 'violations.db'  # SQLite database (WAL mode) with the violation history
+    VIOLATION_DB_BATCH_SIZE = 100  # Most violations written per transaction
+    VIOLATION_DB_FLUSH_INTERVAL = 0.5  # Seconds a violation may wait before it is written
     
     # Web Interface Settings
     WEB_HOST = '0.0.0.0'
@@ -73,6 +119,20 @@ class SafetyConfig:
     WEB_DEBUG = False
     SECRET_KEY = 'safety_monitor_secret_key_change_in_production'
     
+    # Streaming Settings
+    # Quality ladder as [name, scale, JPEG quality], best first. Each variant is
+    # encoded at most once per frame and only while a viewer is subscribed to it.
+    STREAM_QUALITY_LADDER = [
+        ['full', 1.0, 75],
+        ['half', 0.5, 65],
+        ['quarter', 0.25, 50]
+    ]
+    STREAM_ACK_TIMEOUT = 2.0  # Seconds a viewer may take to acknowledge a frame
+    STREAM_DOWNGRADE_LATENCY = 0.5  # Delivery latency (seconds) that moves a viewer down the ladder
+    STREAM_UPGRADE_LATENCY = 0.15  # Delivery latency (seconds) that lets a viewer move back up
+    ENCODER_THREADS = 0  # JPEG encoder threads shared by all cameras (0 = based on CPU count)
+    ENCODER_USE_TURBOJPEG = True  # Use TurboJPEG when installed (pip install PyTurboJPEG)
+    
     # Alert Settings
     VIOLATION_ALERT_ENABLED = True
     VIOLATION_ALERT_COOLDOWN = 5.0  # Seconds between alerts for same person
@@ -89,6 +149,30 @@ class SafetyConfig:
     MAX_PROCESSING_FPS = 30  # Limit processing FPS to reduce CPU usage
     FRAME_SKIP_THRESHOLD = 5  # Skip frames if processing falls behind
     MULTI_THREADING_ENABLED = True
+    INFERENCE_INTERVAL = 3  # Run AI detection on every Nth frame, reusing results in between
+    # Per-stage overrides for the processing pipeline, e.g.
+    # {'encode': {'concurrency': 4}, 'postprocess': {'drop_policy': 'drop_oldest'}}
+    # Stages: capture, preprocess, infer, postprocess, render, encode, publish
+    PIPELINE_STAGE_SETTINGS = {}
+    # Cameras share one detector; frames from different cameras are batched
+    # into one model call when they arrive within INFERENCE_MAX_WAIT_MS
+    INFERENCE_MAX_BATCH = 8
+    INFERENCE_MAX_WAIT_MS = 8.0
+    # Global inference budget shared by all cameras (inferences per second).
+    # Each camera offers every INFERENCE_INTERVAL-th frame; under load the
+    # scheduler picks which offers are analyzed and the rest reuse the last
+    # results. None analyzes every offered frame.
+    INFERENCE_BUDGET_FPS = 30.0
+    INFERENCE_SCHEDULING_POLICY = 'weighted'  # 'weighted' or 'round_robin'
+    INFERENCE_CAMERA_WEIGHTS = {}  # Camera ID -> priority weight, e.g. {'dock': 2.0}; default 1
+    INFERENCE_PEOPLE_BOOST = 2.0  # Weight multiplier while a camera sees people
+    INFERENCE_VIOLATION_BOOST = 3.0  # Weight multiplier while a camera shows violations
+    INFERENCE_BOOST_HOLD = 5.0  # Seconds a boost lasts after the last triggering frame
+    # Publish camera frames ('frames/<id>') and detection results ('results/<id>')
+    # for other processes, e.g. 'tcp://0.0.0.0:7700' or 'unix:///tmp/safetymaster.sock'.
+    # Cameras started with a 'bus+<address>/<camera_id>' source subscribe to one.
+    FRAME_BUS_LISTEN = None
+    FRAME_BUS_ENCODING = 'jpeg'  # 'jpeg' for network links, 'raw' for Unix sockets
     
     # Notification Settings (for future extensions)
     EMAIL_NOTIFICATIONS = False
@@ -0,0 +1,264 @@
+"""
+FFmpeg Capture for SafetyMaster Pro
+Decodes video in an ffmpeg subprocess and streams raw BGR frames over a pipe,
+giving control over decoder threads, RTSP transport and in-decoder scaling
+"""
+
+import collections
+import json
+import os
+import select
+import subprocess
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FFmpegCapture:
+    """
+    Drop-in replacement for the parts of cv2.VideoCapture that CameraManager
+    uses (isOpened, read, grab, retrieve, get, set, release). Frames are
+    scaled inside ffmpeg and read from the pipe straight into NumPy buffers.
+    """
+
+    def __init__(self, source: str, width: int = 0, height: int = 0,
+                 rtsp_transport: str = 'tcp', threads: int = 0,
+                 hwaccel: Optional[str] = None, open_timeout: float = 10.0,
+                 read_timeout: float = 5.0, ffmpeg_path: str = 'ffmpeg',
+                 ffprobe_path: str = 'ffprobe'):
+        """
+        Probe the source and start the decoder process.
+
+        Args:
+            source: Video file path or stream URL
+            width: Output width, 0 to keep the source width (or follow height's aspect ratio)
+            height: Output height, 0 to keep the source height (or follow width's aspect ratio)
+            rtsp_transport: 'tcp' or 'udp' for rtsp:// sources
+            threads: Decoder threads, 0 lets ffmpeg decide
+            hwaccel: Optional ffmpeg hardware acceleration method (e.g. 'cuda', 'vaapi')
+            open_timeout: Seconds allowed for probing the source
+            read_timeout: Seconds a frame read may block before it fails
+            ffmpeg_path: ffmpeg executable
+            ffprobe_path: ffprobe executable
+        """
+        self.source = source
+        self.rtsp_transport = rtsp_transport
+        self.threads = threads
+        self.hwaccel = hwaccel
+        self.open_timeout = open_timeout
+        self.read_timeout = read_timeout
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path
+
+        self.process = None
+        self.frames_read = 0
+        self.source_width = 0
+        self.source_height = 0
+        self.fps = 0.0
+        self.frame_count = 0
+        self.width = 0
+        self.height = 0
+        self._frame = None
+        self._grabbed = False
+        self._ended = False
+        self._stderr_lines = collections.deque(maxlen=20)
+
+        if not self._probe():
+            return
+
+        self.width, self.height = self._output_size(width, height)
+        self._frame_bytes = self.width * self.height * 3
+        self._frame = np.empty((self.height, self.width, 3), np.uint8)
+        self._start()
+
+    def _is_rtsp(self) -> bool:
+        return self.source.lower().startswith('rtsp://')
+
+    def _probe(self) -> bool:
+        """Read the source resolution, frame rate and length with ffprobe."""
+        command = [self.ffprobe_path, '-v', 'error', '-select_streams', 'v:0',
+                   '-show_entries', 'stream=width,height,avg_frame_rate,r_frame_rate,nb_frames',
+                   '-of', 'json']
+        if self._is_rtsp():
+            command += ['-rtsp_transport', self.rtsp_transport]
+        command.append(self.source)
+
+        try:
+            result = subprocess.run(command, capture_output=True, text=True,
+                                    timeout=self.open_timeout)
+            stream = json.loads(result.stdout)['streams'][0]
+        except (OSError, subprocess.TimeoutExpired, ValueError, KeyError, IndexError) as e:
+            print(f"Error probing video source with ffprobe: {self.source} ({e})")
+            return False
+
+        self.source_width = int(stream.get('width', 0))
+        self.source_height = int(stream.get('height', 0))
+        self.fps = self._parse_rate(stream.get('avg_frame_rate')) or self._parse_rate(stream.get('r_frame_rate'))
+        try:
+            self.frame_count = int(stream.get('nb_frames', 0))
+        except ValueError:
+            self.frame_count = 0
+        return self.source_width > 0 and self.source_height > 0
+
+    @staticmethod
+    def _parse_rate(rate: Optional[str]) -> float:
+        """Parse an ffprobe rate such as '30000/1001'."""
+        try:
+            numerator, _, denominator = (rate or '0/0').partition('/')
+            return float(numerator) / float(denominator or 1)
+        except (ValueError, ZeroDivisionError):
+            return 0.0
+
+    def _output_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Work out the output size, keeping the aspect ratio when only one side is given."""
+        if width and not height:
+            height = round(width * self.source_height / self.source_width)
+        elif height and not width:
+            width = round(height * self.source_width / self.source_height)
+        elif not width and not height:
+            width, height = self.source_width, self.source_height
+        # Most pixel formats and scalers want even dimensions
+        return width - width % 2, height - height % 2
+
+    def _start(self):
+        """Start ffmpeg writing rawvideo BGR frames to its stdout."""
+        command = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if self._is_rtsp():
+            command += ['-rtsp_transport', self.rtsp_transport]
+        if self.hwaccel:
+            command += ['-hwaccel', self.hwaccel]
+        if self.threads:
+            command += ['-threads', str(self.threads)]
+        command += ['-i', self.source, '-an', '-sn', '-dn']
+        if (self.width, self.height) != (self.source_width, self.source_height):
+            # Scale while decoding so no resize is needed later in the pipeline
+            command += ['-vf', f'scale={self.width}:{self.height}:flags=area']
+        command += ['-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+
+        try:
+            # Unbuffered stdout so readinto() fills frame buffers directly
+            self.process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE, bufsize=0)
+        except OSError as e:
+            print(f"Error starting ffmpeg: {e}")
+            self.process = None
+            return
+
+        threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+
+    def _drain_stderr(self, process: subprocess.Popen):
+        """Keep the last ffmpeg error lines and stop stderr from filling up."""
+        for line in process.stderr:
+            self._stderr_lines.append(line.decode(errors='replace').rstrip())
+
+    @property
+    def last_error(self) -> str:
+        """Most recent ffmpeg error output."""
+        return '\n'.join(self._stderr_lines)
+
+    def isOpened(self) -> bool:
+        # Stays open after ffmpeg exits until the frames left in the pipe are read
+        return self.process is not None and not self._ended
+
+    def _read_into(self, image: np.ndarray) -> bool:
+        """Fill an array with exactly one frame from the pipe."""
+        view = memoryview(image).cast('B')
+        stdout = self.process.stdout
+        filled = 0
+        while filled < self._frame_bytes:
+            if os.name != 'nt' and self.read_timeout:
+                ready, _, _ = select.select([stdout], [], [], self.read_timeout)
+                if not ready:
+                    print(f"ffmpeg read timed out after {self.read_timeout}s: {self.source}")
+                    if filled:
+                        # The pipe is now mid-frame and every later read would be torn;
+                        # report the capture closed so it is restarted
+                        self._ended = True
+                    return False
+            count = stdout.readinto(view[filled:])
+            if not count:
+                self._ended = True  # End of stream or ffmpeg exited
+                return False
+            filled += count
+        return True
+
+    def _usable_buffer(self, image: Optional[np.ndarray]) -> bool:
+        return (image is not None and image.shape == self._frame.shape
+                and image.dtype == np.uint8 and image.flags['C_CONTIGUOUS'])
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Read the next frame.
+
+        Args:
+            image: Optional preallocated buffer to fill; used when shape and dtype match
+
+        Returns:
+            Tuple of (success, frame)
+        """
+        if not self.isOpened():
+            return False, None
+
+        if not self._usable_buffer(image):
+            image = np.empty_like(self._frame)
+        if not self._read_into(image):
+            return False, None
+
+        self.frames_read += 1
+        self._grabbed = False
+        return True, image
+
+    def grab(self) -> bool:
+        """Read the next frame into the internal buffer."""
+        if not self.isOpened() or not self._read_into(self._frame):
+            self._grabbed = False
+            return False
+        self.frames_read += 1
+        self._grabbed = True
+        return True
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Return the frame read by the last grab(), copied into image if given."""
+        if not self._grabbed:
+            return False, None
+        if self._usable_buffer(image):
+            np.copyto(image, self._frame)
+            return True, image
+        return True, self._frame.copy()
+
+    def get(self, prop_id: int) -> float:
+        """Report capture properties in the units cv2.VideoCapture uses."""
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_read)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            # Time of the last frame read, as after cv2.VideoCapture.read()
+            return (self.frames_read - 1) * 1000.0 / self.fps if self.fps and self.frames_read else 0.0
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        """Properties are fixed when ffmpeg starts; like OpenCV, unsupported sets return False."""
+        return False
+
+    def release(self):
+        """Stop the ffmpeg process."""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process.stdout.close()
+        self.process = None
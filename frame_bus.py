@@ -0,0 +1,838 @@
+#!/usr/bin/env python3
+"""
+Frame Bus for SafetyMaster Pro
+Carries frames and detection results between components, in one process or
+between processes and machines, without an external broker.
+
+Every message has a topic (e.g. 'frames/dock' or 'results/dock'), a
+per-topic sequence number, a timestamp, a JSON metadata dict and an optional
+image. Subscribers hold a small queue that drops the oldest message when it
+is full, so a slow consumer never stalls the publisher and always sees the
+newest frame; sequence gaps show how much it missed.
+
+Transports:
+    InProcessBus     - frames are passed by reference within one process
+    SocketBusServer  - publishes to local subscribers and to remote clients
+                       over TCP ('tcp://host:port') or Unix sockets ('unix:///path')
+    SocketBusClient  - subscribes to a SocketBusServer (cannot publish)
+
+Wire format: each message is a 4-byte header length and a 4-byte payload
+length (network byte order), a UTF-8 JSON header, then the image bytes
+(raw pixels or JPEG).
+
+Run as a capture node that publishes cameras for other machines:
+    python frame_bus.py --listen tcp://0.0.0.0:7700 --camera dock=rtsp://10.0.0.5/stream
+"""
+
+import argparse
+import collections
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Image encodings on socket transports
+ENCODING_RAW = 'raw'    # Pixels as-is: no CPU cost, for Unix sockets and fast local links
+ENCODING_JPEG = 'jpeg'  # Compressed: for frames crossing a network
+
+ENCODINGS = (ENCODING_RAW, ENCODING_JPEG)
+
+# Topic prefixes used by cameras and pipelines
+FRAMES_TOPIC = 'frames/'
+RESULTS_TOPIC = 'results/'
+
+_LENGTHS = struct.Struct('!II')
+MAX_HEADER_BYTES = 1 << 20
+MAX_PAYLOAD_BYTES = 1 << 28
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """
+    Parse a bus address.
+
+    Args:
+        address: 'tcp://host:port' or 'unix:///path/to/socket'
+
+    Returns:
+        Tuple of (socket family, socket address)
+    """
+    if address.startswith('unix://'):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("Unix sockets are not available on this platform")
+        return socket.AF_UNIX, address[len('unix://'):]
+    if address.startswith('tcp://'):
+        host, _, port = address[len('tcp://'):].rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError(f"Bus address needs a host and port: {address}")
+        return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Unknown bus address (use tcp://host:port or unix:///path): {address}")
+
+
+class BusMessage:
+    """One frame or result travelling over the bus."""
+
+    def __init__(self, topic: str, sequence: int, timestamp: float,
+                 metadata: Optional[dict] = None, frame: Optional[np.ndarray] = None):
+        self.topic = topic
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.metadata = metadata or {}
+        self.frame = frame
+
+    def encode(self, encoding: str = ENCODING_RAW, jpeg_quality: int = 90) -> bytes:
+        """Serialize to the length-prefixed wire format."""
+        header = {
+            'topic': self.topic,
+            'sequence': self.sequence,
+            'timestamp': self.timestamp,
+            'metadata': self.metadata
+        }
+        payload = b''
+        if self.frame is not None:
+            header['encoding'] = encoding
+            if encoding == ENCODING_JPEG:
+                ok, buffer = cv2.imencode('.jpg', self.frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+                if not ok:
+                    raise ValueError("JPEG encoding failed")
+                payload = buffer.tobytes()
+            else:
+                frame = np.ascontiguousarray(self.frame)
+                header['shape'] = list(frame.shape)
+                header['dtype'] = frame.dtype.str
+                payload = frame.tobytes()
+
+        header_bytes = json.dumps(header, default=str).encode('utf-8')
+        return _LENGTHS.pack(len(header_bytes), len(payload)) + header_bytes + payload
+
+    @classmethod
+    def decode(cls, header: dict, payload: bytes) -> 'BusMessage':
+        """Rebuild a message from its JSON header and payload."""
+        frame = None
+        if payload:
+            if header.get('encoding') == ENCODING_JPEG:
+                frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+            else:
+                # bytearray keeps the decoded frame writable like a captured one
+                frame = np.frombuffer(bytearray(payload), np.dtype(header['dtype'])).reshape(header['shape'])
+        return cls(header['topic'], header['sequence'], header['timestamp'],
+                   header.get('metadata'), frame)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytearray]:
+    """Read exactly size bytes, or return None if the connection closed first."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    filled = 0
+    while filled < size:
+        count = sock.recv_into(view[filled:])
+        if not count:
+            return None
+        filled += count
+    return buffer
+
+
+def _recv_message(sock: socket.socket) -> Optional[Tuple[dict, bytes]]:
+    """Read one length-prefixed message as (header, payload)."""
+    lengths = _recv_exact(sock, _LENGTHS.size)
+    if lengths is None:
+        return None
+    header_size, payload_size = _LENGTHS.unpack(lengths)
+    if header_size > MAX_HEADER_BYTES or payload_size > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"Bus message too large ({header_size} + {payload_size} bytes)")
+    header = _recv_exact(sock, header_size)
+    payload = _recv_exact(sock, payload_size) if payload_size else b''
+    if header is None or payload is None:
+        return None
+    return json.loads(header.decode('utf-8')), bytes(payload)
+
+
+class Subscription:
+    """
+    Bounded queue of messages for one subscriber. When full, the oldest
+    message is dropped to make room for the newest.
+    """
+
+    def __init__(self, topic: str, max_queue: int = 2):
+        """
+        Args:
+            topic: Topic, or topic prefix such as 'frames/', to receive
+            max_queue: Messages kept before the oldest is dropped
+        """
+        self.topic = topic
+        self._queue = collections.deque(maxlen=max(1, max_queue))
+        self._condition = threading.Condition()
+        self._last_sequences = {}
+        self.closed = False
+
+        self.received = 0
+        self.dropped = 0  # Dropped here because the subscriber fell behind
+        self.missed = 0   # Never arrived (sequence gaps), e.g. dropped by a network sender
+
+    def matches(self, topic: str) -> bool:
+        return topic == self.topic or (self.topic.endswith('/') and topic.startswith(self.topic))
+
+    def deliver(self, message: BusMessage):
+        """Queue a message, dropping the oldest if the queue is full."""
+        with self._condition:
+            last = self._last_sequences.get(message.topic)
+            if last is not None and message.sequence > last + 1:
+                self.missed += message.sequence - last - 1
+            self._last_sequences[message.topic] = message.sequence
+
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(message)
+            self.received += 1
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[BusMessage]:
+        """Take the oldest queued message, waiting up to timeout seconds."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            return self._queue.popleft() if self._queue else None
+
+    def get_latest(self, timeout: Optional[float] = None) -> Optional[BusMessage]:
+        """Take the newest message, discarding older ones, waiting up to timeout seconds."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            if not self._queue:
+                return None
+            message = self._queue.pop()
+            self.dropped += len(self._queue)
+            self._queue.clear()
+            return message
+
+    def peek_latest(self) -> Optional[BusMessage]:
+        """Look at the newest queued message without taking it."""
+        with self._condition:
+            return self._queue[-1] if self._queue else None
+
+    def close(self):
+        """Wake any waiting reader; further messages are ignored by the bus."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            return {
+                'topic': self.topic,
+                'queued': len(self._queue),
+                'received': self.received,
+                'dropped': self.dropped,
+                'missed': self.missed
+            }
+
+
+class BusSubscriptions:
+    """
+    Local subscriptions of a bus. Every transport can be subscribed to; only
+    InProcessBus and SocketBusServer can be published to.
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, max_queue: int = 2) -> Subscription:
+        """Receive messages on a topic, or on every topic under a prefix ending in '/'."""
+        subscription = Subscription(topic, max_queue)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop delivering to a subscription."""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription.close()
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def close(self):
+        """Close every subscription."""
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.close()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        return {'subscriptions': [s.get_stats() for s in subscriptions]}
+
+
+class InProcessBus(BusSubscriptions):
+    """
+    Delivers messages to subscribers in the same process. Frames are passed
+    by reference, so subscribers must treat them as read-only.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._sequences: Dict[str, int] = {}
+        self.published = 0
+
+    def publish(self, topic: str, frame: Optional[np.ndarray] = None,
+                metadata: Optional[dict] = None, timestamp: Optional[float] = None) -> int:
+        """
+        Publish a frame and/or metadata.
+
+        Args:
+            topic: Message topic, e.g. 'frames/dock'
+            frame: Optional image (not copied)
+            metadata: JSON-serializable metadata
+            timestamp: Capture time, defaults to now
+
+        Returns:
+            The message's sequence number on its topic
+        """
+        with self._lock:
+            sequence = self._sequences.get(topic, 0) + 1
+            self._sequences[topic] = sequence
+            self.published += 1
+            subscriptions = [s for s in self._subscriptions if s.matches(topic)]
+
+        message = BusMessage(topic, sequence, time.time() if timestamp is None else timestamp,
+                             metadata, frame)
+        for subscription in subscriptions:
+            subscription.deliver(message)
+        self._dispatch(message)
+        return sequence
+
+    def _dispatch(self, message: BusMessage):
+        """Hook for transports that also send messages elsewhere."""
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats['published'] = self.published
+        return stats
+
+
+class _RemoteSubscriber:
+    """A client connected to a SocketBusServer, with its own drop-oldest send queue."""
+
+    def __init__(self, sock: socket.socket, address, max_queue: int):
+        self.sock = sock
+        self.address = address
+        self.topics: List[str] = []
+        self._queue = collections.deque(maxlen=max(1, max_queue))
+        self._condition = threading.Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def matches(self, topic: str) -> bool:
+        return any(topic == t or (t.endswith('/') and topic.startswith(t)) for t in self.topics)
+
+    def enqueue(self, data: bytes):
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(data)
+            self._condition.notify()
+
+    def send_loop(self):
+        """Send queued messages until the connection closes."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self.closed)
+                if self.closed:
+                    return
+                data = self._queue.popleft()
+            try:
+                self.sock.sendall(data)
+                self.sent += 1
+            except OSError:
+                self.close()
+                return
+
+    def close(self):
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self._condition.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class SocketBusServer(InProcessBus):
+    """
+    In-process bus that also sends published messages to remote
+    SocketBusClients. Messages are serialized (and JPEG-encoded) once on a
+    sender thread, never on the publisher's (usually a camera's capture
+    thread), and queued per client. When serialization falls behind, a
+    topic's waiting message is replaced by its newest one; a slow client
+    loses its oldest messages. Neither delays the publisher.
+    """
+
+    def __init__(self, address: str, encoding: str = ENCODING_JPEG,
+                 jpeg_quality: int = 90, max_queue: int = 4):
+        """
+        Start listening.
+
+        Args:
+            address: 'tcp://host:port' or 'unix:///path/to/socket'
+            encoding: 'raw' or 'jpeg' image encoding for remote clients
+            jpeg_quality: JPEG quality when encoding is 'jpeg'
+            max_queue: Messages queued per remote client before the oldest is dropped
+        """
+        super().__init__()
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown bus encoding: {encoding}")
+
+        self.address = address
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self.max_queue = max_queue
+        self._remotes: List[_RemoteSubscriber] = []
+        self._remote_lock = threading.Lock()
+        # Messages waiting for the sender thread, at most one per topic
+        self._outgoing: 'collections.OrderedDict[str, BusMessage]' = collections.OrderedDict()
+        self._outgoing_condition = threading.Condition()
+        self.encode_errors = 0
+        self.encode_dropped = 0
+
+        family, bind_address = parse_address(address)
+        if family != socket.AF_INET and os.path.exists(bind_address):
+            os.unlink(bind_address)  # Stale socket from a previous run
+        self._server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(bind_address)
+        self._server.listen()
+        self._family = family
+        self._bind_address = bind_address
+
+        self.is_running = True
+        threading.Thread(target=self._accept_loop, name='bus-accept', daemon=True).start()
+        threading.Thread(target=self._send_loop, name='bus-sender', daemon=True).start()
+        print(f"Frame bus listening on {address} ({encoding})")
+
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                break
+            if self._family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            remote = _RemoteSubscriber(sock, address, self.max_queue)
+            with self._remote_lock:
+                self._remotes.append(remote)
+            threading.Thread(target=remote.send_loop, daemon=True).start()
+            threading.Thread(target=self._receive_loop, args=(remote,), daemon=True).start()
+
+    def _receive_loop(self, remote: _RemoteSubscriber):
+        """Read a client's subscribe requests until it disconnects."""
+        try:
+            while True:
+                message = _recv_message(remote.sock)
+                if message is None:
+                    break
+                header, _ = message
+                remote.topics = list(header.get('subscribe', []))
+        except (OSError, ValueError):
+            pass
+        remote.close()
+        with self._remote_lock:
+            if remote in self._remotes:
+                self._remotes.remove(remote)
+
+    def _dispatch(self, message: BusMessage):
+        """Hand a message to the sender thread if any client wants its topic."""
+        with self._remote_lock:
+            if not any(not r.closed and r.matches(message.topic) for r in self._remotes):
+                return
+        with self._outgoing_condition:
+            if self._outgoing.pop(message.topic, None) is not None:
+                self.encode_dropped += 1
+            self._outgoing[message.topic] = message
+            self._outgoing_condition.notify()
+
+    def _send_loop(self):
+        """Sender thread: serialize waiting messages, oldest topic first."""
+        while True:
+            with self._outgoing_condition:
+                self._outgoing_condition.wait_for(lambda: self._outgoing or not self.is_running)
+                if not self.is_running:
+                    return
+                _, message = self._outgoing.popitem(last=False)
+            self._send(message)
+
+    def _send(self, message: BusMessage):
+        """Serialize a message once and queue it for every client subscribed to its topic."""
+        with self._remote_lock:
+            remotes = [r for r in self._remotes if not r.closed and r.matches(message.topic)]
+        if not remotes:
+            return
+        try:
+            data = message.encode(self.encoding, self.jpeg_quality)
+        except (ValueError, TypeError) as e:
+            self.encode_errors += 1
+            print(f"Error encoding bus message on {message.topic}: {e}")
+            return
+        for remote in remotes:
+            remote.enqueue(data)
+
+    def close(self):
+        """Stop listening and disconnect every client."""
+        with self._outgoing_condition:
+            self.is_running = False
+            self._outgoing_condition.notify_all()
+        self._server.close()
+        with self._remote_lock:
+            remotes, self._remotes = self._remotes, []
+        for remote in remotes:
+            remote.close()
+        if self._family != socket.AF_INET and os.path.exists(self._bind_address):
+            os.unlink(self._bind_address)
+        super().close()
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        with self._remote_lock:
+            stats['remote_clients'] = [{
+                'address': str(r.address),
+                'topics': r.topics,
+                'sent': r.sent,
+                'dropped': r.dropped
+            } for r in self._remotes]
+        stats['address'] = self.address
+        stats['encoding'] = self.encoding
+        stats['encode_errors'] = self.encode_errors
+        stats['encode_dropped'] = self.encode_dropped
+        return stats
+
+
+class SocketBusClient(BusSubscriptions):
+    """
+    Receives messages from a SocketBusServer and delivers them to local
+    subscriptions. Reconnects with exponential backoff if the link drops.
+    Subscribe-only: publish on the SocketBusServer.
+    """
+
+    def __init__(self, address: str, reconnect_max_backoff: float = 30.0):
+        """
+        Args:
+            address: Server address, 'tcp://host:port' or 'unix:///path/to/socket'
+            reconnect_max_backoff: Upper bound in seconds for the reconnect delay
+        """
+        super().__init__()
+        self.address = address
+        self.reconnect_max_backoff = reconnect_max_backoff
+        self._family, self._connect_address = parse_address(address)
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.reconnects = 0
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name='bus-client', daemon=True)
+        self._thread.start()
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def subscribe(self, topic: str, max_queue: int = 2) -> Subscription:
+        subscription = super().subscribe(topic, max_queue)
+        self._send_subscriptions()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        super().unsubscribe(subscription)
+        self._send_subscriptions()
+
+    def _send_subscriptions(self):
+        """Tell the server which topics to forward."""
+        with self._lock:
+            topics = sorted({s.topic for s in self._subscriptions})
+        header = json.dumps({'subscribe': topics}).encode('utf-8')
+        data = _LENGTHS.pack(len(header), 0) + header
+        with self._send_lock:
+            if self._sock is None:
+                return  # Sent again on connect
+            try:
+                self._sock.sendall(data)
+            except OSError:
+                pass  # The receive loop notices and reconnects
+
+    def _connect(self) -> bool:
+        try:
+            sock = socket.socket(self._family, socket.SOCK_STREAM)
+            sock.connect(self._connect_address)
+        except OSError:
+            return False
+        if self._family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._send_lock:
+            self._sock = sock
+        self._send_subscriptions()
+        return True
+
+    def _run(self):
+        backoff = 1.0
+        while self.is_running:
+            if not self._connect():
+                if self._stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, self.reconnect_max_backoff)
+                continue
+
+            print(f"Connected to frame bus: {self.address}")
+            backoff = 1.0
+            try:
+                while self.is_running:
+                    message = _recv_message(self._sock)
+                    if message is None:
+                        break
+                    self._deliver(BusMessage.decode(*message))
+            except (OSError, ValueError) as e:
+                if self.is_running:
+                    print(f"Frame bus connection error: {e}")
+
+            with self._send_lock:
+                sock, self._sock = self._sock, None
+            if sock:
+                sock.close()
+            if self.is_running:
+                self.reconnects += 1
+                print(f"Disconnected from frame bus {self.address}, reconnecting")
+
+    def _deliver(self, message: BusMessage):
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.matches(message.topic)]
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def close(self):
+        """Disconnect and stop reconnecting."""
+        self.is_running = False
+        self._stop_event.set()
+        with self._send_lock:
+            sock = self._sock
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(timeout=2.0)
+        super().close()
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats['address'] = self.address
+        stats['connected'] = self.connected
+        stats['reconnects'] = self.reconnects
+        return stats
+
+
+def create_bus(address: Optional[str] = None, **options) -> InProcessBus:
+    """
+    Create a publishing bus: in-process when address is None, otherwise a
+    SocketBusServer listening on address.
+    """
+    if address is None:
+        return InProcessBus()
+    return SocketBusServer(address, **options)
+
+
+class BusFrame:
+    """Frame taken from the bus, shaped like a camera FrameLease."""
+
+    def __init__(self, message: BusMessage, sequence: int):
+        self.frame = message.frame
+        self.timestamp = message.timestamp
+        self.sequence = sequence
+
+    def release(self):
+        """Nothing to return: bus frames are not pooled."""
+
+
+class BusCamera:
+    """
+    Camera whose frames arrive over the bus from a CameraManager in another
+    process. Provides the parts of the CameraManager API that VideoPipeline
+    and the web interface use, so a remote camera can be monitored like a local one.
+    """
+
+    sequential = False
+    end_of_stream = False
+
+    def __init__(self, bus: BusSubscriptions, camera_id: str, stall_timeout: float = 5.0,
+                 close_bus: bool = False):
+        """
+        Args:
+            bus: Bus carrying the camera's frames (usually a SocketBusClient)
+            camera_id: Camera published on the 'frames/<camera_id>' topic
+            stall_timeout: Seconds without frames before the camera counts as disconnected
+            close_bus: Close the bus when capture stops (the bus belongs to this camera)
+        """
+        self.bus = bus
+        self.camera_id = camera_id
+        self.topic = FRAMES_TOPIC + camera_id
+        self.source = f"{getattr(bus, 'address', 'bus')}/{camera_id}"
+        self.stall_timeout = stall_timeout
+        self.close_bus = close_bus
+        self.subscription = None
+        self.is_running = False
+        self.fps = 0
+        self.frame_width = 0
+        self.frame_height = 0
+        self.started_at = None
+        self._latest = None
+        # Local frame count: bus sequences restart when the publisher does
+        self._frames_taken = 0
+
+    def start_capture(self) -> bool:
+        self.subscription = self.bus.subscribe(self.topic, max_queue=1)
+        self.is_running = True
+        self.started_at = time.time()
+        return True
+
+    def stop_capture(self):
+        self.is_running = False
+        if self.subscription:
+            self.bus.unsubscribe(self.subscription)
+        if self.close_bus:
+            self.bus.close()
+
+    @property
+    def state(self) -> str:
+        if not self.is_running:
+            return 'stopped'
+        return 'connected' if self.is_connected() else 'reconnecting'
+
+    @property
+    def frame_sequence(self) -> int:
+        """Sequence of the newest frame, counting one that is waiting to be taken."""
+        pending = self.subscription is not None and self.subscription.peek_latest() is not None
+        return self._frames_taken + (1 if pending else 0)
+
+    def is_connected(self) -> bool:
+        if not self.is_running or not self.bus.connected:
+            return False
+        # Until the first frame arrives, give the publisher stall_timeout to start
+        last = self._latest.timestamp if self._latest else self.started_at
+        message = self.subscription.peek_latest()
+        if message:
+            last = max(last, message.timestamp)
+        return time.time() - last < self.stall_timeout
+
+    def acquire_latest_frame(self, after_sequence: int = 0,
+                             timeout: Optional[float] = None) -> Optional[BusFrame]:
+        """
+        Take the newest frame, waiting up to timeout seconds. Every frame is
+        taken at most once, so any frame returned is newer than after_sequence.
+        """
+        message = self.subscription.get_latest(timeout) if self.subscription else None
+        if message is None or message.frame is None:
+            return None
+        self._latest = message
+        self._frames_taken += 1
+        self.fps = message.metadata.get('fps', self.fps)
+        self.frame_height, self.frame_width = message.frame.shape[:2]
+        return BusFrame(message, self._frames_taken)
+
+    def wait_for_frame(self, after_sequence: int = 0, timeout: Optional[float] = None):
+        """Get (frame, timestamp, sequence) for a frame newer than after_sequence."""
+        frame = self.acquire_latest_frame(after_sequence, timeout)
+        return (frame.frame, frame.timestamp, frame.sequence) if frame else None
+
+    def get_latest_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+        """Get a copy of the newest frame and its timestamp."""
+        message = (self.subscription.peek_latest() if self.subscription else None) or self._latest
+        if message is None or message.frame is None:
+            return None
+        return message.frame.copy(), message.timestamp
+
+    def get_properties(self) -> dict:
+        return {
+            'width': self.frame_width,
+            'height': self.frame_height,
+            'fps': self.fps,
+            'source': self.source,
+            'is_running': self.is_running,
+            'backend': 'bus',
+            'frames_received': self.subscription.received if self.subscription else 0,
+            'bus': self.subscription.get_stats() if self.subscription else None,
+            'connection': {'state': self.state, 'bus_connected': self.bus.connected}
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish cameras on the frame bus')
+    parser.add_argument('--listen', type=str, required=True,
+                        help='Bus address, tcp://host:port or unix:///path/to/socket')
+    parser.add_argument('--camera', dest='cameras', action='append', default=[], metavar='ID=SOURCE',
+                        help='Camera to publish (repeatable); webcam index, file or URL')
+    parser.add_argument('--encoding', choices=ENCODINGS, default=ENCODING_JPEG,
+                        help='Image encoding sent to subscribers')
+    parser.add_argument('--jpeg-quality', type=int, default=90,
+                        help='JPEG quality when --encoding is jpeg')
+
+    args = parser.parse_args()
+
+    from camera_manager import CameraManager
+    from config import SafetyConfig
+
+    cameras = []
+    for spec in args.cameras:
+        camera_id, separator, source = spec.partition('=')
+        if not separator or not camera_id or not source:
+            print(f"❌ Camera must be given as id=source: {spec}")
+            return 1
+        cameras.append((camera_id, int(source) if source.isdigit() else source))
+
+    bus = SocketBusServer(args.listen, args.encoding, args.jpeg_quality)
+    managers = []
+    for camera_id, source in cameras:
+        backend = SafetyConfig.CAMERA_BACKEND if isinstance(source, str) else 'opencv'
+        camera = CameraManager(source=source,
+                               open_timeout=SafetyConfig.CAMERA_OPEN_TIMEOUT,
+                               read_timeout=SafetyConfig.CAMERA_READ_TIMEOUT,
+                               stall_timeout=SafetyConfig.CAMERA_STALL_TIMEOUT,
+                               reconnect_max_backoff=SafetyConfig.CAMERA_RECONNECT_MAX_BACKOFF,
+                               backend=backend,
+                               ffmpeg_options=SafetyConfig.CAMERA_FFMPEG_OPTIONS,
+                               bus=bus, bus_topic=FRAMES_TOPIC + camera_id)
+        if camera.start_capture():
+            print(f"📡 Publishing {camera_id} ({source}) on {FRAMES_TOPIC + camera_id}")
+            managers.append(camera)
+        else:
+            print(f"❌ Failed to start camera {camera_id} ({source})")
+
+    if not managers:
+        bus.close()
+        return 1
+
+    try:
+        while any(camera.is_running for camera in managers):
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping capture node...")
+    for camera in managers:
+        camera.stop_capture()
+    bus.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Frame Encoder for SafetyMaster Pro
+Shared thread pool for JPEG encoding so encoding overlaps with inference
+and scales across cores for every camera on the machine
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# TurboJPEG is optional; OpenCV's encoder is used when it is not installed
+try:
+    from turbojpeg import TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
+
+class JpegEncoderPool:
+    """
+    Encodes frames to JPEG on a small thread pool. Both cv2.imencode and
+    TurboJPEG release the GIL, so encodes run in parallel with inference.
+    """
+
+    def __init__(self, workers: Optional[int] = None, use_turbojpeg: bool = True):
+        """
+        Initialize the encoder pool.
+
+        Args:
+            workers: Number of encoder threads, None to size from the CPU count
+            use_turbojpeg: Use TurboJPEG when it is installed
+        """
+        self.workers = workers or min(4, max(1, (os.cpu_count() or 2) // 2))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='jpeg-encoder')
+        self._turbo = None
+        if use_turbojpeg and TurboJPEG is not None:
+            try:
+                self._turbo = TurboJPEG()
+            except Exception as e:
+                print(f"TurboJPEG unavailable, using OpenCV encoder: {e}")
+
+        self._lock = threading.Lock()
+        self.frames_encoded = 0
+        self.encode_errors = 0
+        self.total_encode_time = 0.0
+
+    @property
+    def backend(self) -> str:
+        return 'turbojpeg' if self._turbo is not None else 'opencv'
+
+    def encode(self, frame: np.ndarray, quality: int, scale: float = 1.0) -> Optional[bytes]:
+        """
+        Resize and JPEG-encode a frame on the calling thread.
+
+        Args:
+            frame: BGR frame
+            quality: JPEG quality (1-100)
+            scale: Output scale relative to the input frame
+
+        Returns:
+            JPEG bytes, or None if encoding failed
+        """
+        start_time = time.time()
+        try:
+            if scale != 1.0:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale,
+                                   interpolation=cv2.INTER_AREA)
+            if self._turbo is not None:
+                jpeg = self._turbo.encode(frame, quality=quality)
+            else:
+                ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                jpeg = buffer.tobytes() if ok else None
+        except Exception as e:
+            print(f"Error encoding frame: {e}")
+            jpeg = None
+
+        with self._lock:
+            if jpeg is None:
+                self.encode_errors += 1
+            else:
+                self.frames_encoded += 1
+                self.total_encode_time += time.time() - start_time
+        return jpeg
+
+    def submit(self, frame: np.ndarray, quality: int, scale: float = 1.0) -> Future:
+        """
+        Encode a frame on the pool. The frame must not be modified until the future completes.
+
+        Returns:
+            Future resolving to JPEG bytes, or None if encoding failed
+        """
+        return self._executor.submit(self.encode, frame, quality, scale)
+
+    def shutdown(self):
+        """Stop the encoder threads after pending encodes finish."""
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> dict:
+        """Get encoder throughput statistics."""
+        with self._lock:
+            average = self.total_encode_time / self.frames_encoded if self.frames_encoded else 0.0
+            return {
+                'backend': self.backend,
+                'workers': self.workers,
+                'frames_encoded': self.frames_encoded,
+                'encode_errors': self.encode_errors,
+                'avg_encode_ms': round(average * 1000, 2)
+            }
+
+
+_shared_encoder = None
+_shared_encoder_lock = threading.Lock()
+
+
+def get_shared_encoder(workers: Optional[int] = None, use_turbojpeg: bool = True) -> JpegEncoderPool:
+    """
+    Get the process-wide encoder pool, creating it on first use.
+    All cameras share this pool so encoding load spreads over the same threads.
+
+    Args:
+        workers: Number of encoder threads used if the pool is created now
+        use_turbojpeg: Use TurboJPEG if the pool is created now
+
+    Returns:
+        The shared JpegEncoderPool
+    """
+    global _shared_encoder
+    with _shared_encoder_lock:
+        if _shared_encoder is None:
+            _shared_encoder = JpegEncoderPool(workers, use_turbojpeg)
+        return _shared_encoder
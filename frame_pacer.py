@@ -0,0 +1,94 @@
+"""
+Frame Pacer for SafetyMaster Pro
+Deadline-based pacing for processing loops with achieved-rate reporting
+"""
+
+import time
+from typing import Optional
+
+
+class FramePacer:
+    """
+    Paces a loop to a target output rate by sleeping only for the time left
+    until the next deadline. When an iteration overruns, the missed slots are
+    skipped instead of being made up later, so lag never accumulates.
+    """
+
+    def __init__(self, target_fps: float, window: float = 1.0):
+        """
+        Initialize the pacer.
+
+        Args:
+            target_fps: Desired output frames per second
+            window: Seconds over which the achieved rate is measured
+        """
+        if target_fps <= 0:
+            raise ValueError("target_fps must be positive")
+
+        self.target_fps = target_fps
+        self.interval = 1.0 / target_fps
+        self.window = window
+        self._deadline: Optional[float] = None
+
+        self.frames = 0
+        self.skipped_slots = 0
+        self.late_frames = 0
+        self.achieved_fps = 0.0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+
+    def wait(self) -> int:
+        """
+        Mark the current frame as produced and sleep until the next deadline.
+
+        Returns:
+            Number of output slots skipped because the loop fell behind
+        """
+        now = time.monotonic()
+        self._record_frame(now)
+
+        if self._deadline is None:
+            self._deadline = now
+
+        next_deadline = self._deadline + self.interval
+        skipped = 0
+
+        if now < next_deadline:
+            time.sleep(next_deadline - now)
+        else:
+            # Behind schedule: drop the slots already in the past and start
+            # the next frame immediately instead of bursting to catch up
+            self.late_frames += 1
+            skipped = int((now - next_deadline) / self.interval)
+            next_deadline += skipped * self.interval
+            self.skipped_slots += skipped
+
+        self._deadline = next_deadline
+        return skipped
+
+    def reset(self):
+        """Restart the schedule, e.g. after the loop was idle."""
+        self._deadline = None
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self.achieved_fps = 0.0
+
+    def _record_frame(self, now: float):
+        """Update the achieved output rate."""
+        self.frames += 1
+        self._window_frames += 1
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self.achieved_fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+
+    def get_stats(self) -> dict:
+        """Get target versus achieved output rate."""
+        return {
+            'target_fps': self.target_fps,
+            'achieved_fps': round(self.achieved_fps, 1),
+            'frames': self.frames,
+            'late_frames': self.late_frames,
+            'skipped_slots': self.skipped_slots
+        }
@@ -0,0 +1,284 @@
+"""
+Inference Scheduler for SafetyMaster Pro
+Shares one detector between many cameras under a global inference budget,
+choosing which camera's latest frame is analyzed next
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import numpy as np
+
+# Scheduling policies
+POLICY_ROUND_ROBIN = 'round_robin'  # Equal turns for every camera
+POLICY_WEIGHTED = 'weighted'        # Turns in proportion to weight, boosted while people or violations are seen
+
+POLICIES = (POLICY_ROUND_ROBIN, POLICY_WEIGHTED)
+
+TARGET_REFRESH_SECONDS = 0.25  # How often the cameras' shares of the budget are recomputed
+MAX_CREDIT = 2.0  # Most turns a camera banks between two of its frames
+
+
+class RateMeter:
+    """Events per second over a sliding window."""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self._times: Deque[float] = deque()
+
+    def tick(self, now: float):
+        self._times.append(now)
+        self._trim(now)
+
+    def rate(self, now: float) -> float:
+        self._trim(now)
+        return len(self._times) / self.window
+
+    def _trim(self, now: float):
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+
+class CameraSchedule:
+    """Scheduling state and inference statistics for one camera."""
+
+    def __init__(self, camera_id: str, weight: float = 1.0):
+        self.camera_id = camera_id
+        self.weight = weight
+        self.target = 0.0  # Share of the budget in inferences per second
+        self.credit = 0.0  # Turns earned at the target rate and not used yet
+        self.credited_at = 0.0
+        self.last_request = 0.0
+        self.people_until = 0.0  # Boost people/violations until these times
+        self.violations_until = 0.0
+
+        self.inferences = 0
+        self.skipped = 0
+        self.requested = RateMeter()
+        self.achieved = RateMeter()
+
+
+class InferenceScheduler:
+    """
+    Decides which cameras' frames are analyzed under a budget of inferences
+    per second shared by all cameras. Each camera's pipeline offers the frames
+    it wants analyzed through detect(). The budget is split by effective
+    weight, a camera offering fewer frames than its share leaving the rest to
+    the others; each camera earns turns at its share and an offer is granted
+    while it has one. Budget that no camera claims goes to whoever offers
+    next, so it is never left unused. Skipped frames reuse the camera's
+    previous results.
+    """
+
+    def __init__(self, detector, budget_fps: float = 30.0, policy: str = POLICY_WEIGHTED,
+                 people_boost: float = 2.0, violation_boost: float = 3.0,
+                 boost_hold: float = 5.0, burst: Optional[float] = None,
+                 idle_timeout: float = 1.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            detector: Object with detect_safety_violations, e.g. the DynamicBatcher
+                      shared by all cameras, so granted frames are batched together
+            budget_fps: Total inferences per second across all cameras
+            policy: 'round_robin' or 'weighted'
+            people_boost: Weight multiplier while a camera sees people (weighted policy)
+            violation_boost: Weight multiplier while a camera shows violations (weighted policy)
+            boost_hold: Seconds a boost lasts after the last frame that triggered it
+            burst: Inferences the budget may run ahead or behind by over short
+                   periods, defaults to a tenth of a second of budget
+            idle_timeout: Seconds without offers after which a camera's share
+                          goes to the others
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        if budget_fps <= 0:
+            raise ValueError("budget_fps must be positive")
+
+        self.detector = detector
+        self.budget_fps = budget_fps
+        self.policy = policy
+        self.people_boost = people_boost
+        self.violation_boost = violation_boost
+        self.boost_hold = boost_hold
+        self.burst = max(1.0, burst if burst is not None else budget_fps / 10)
+        self.idle_timeout = idle_timeout
+
+        self._cameras: Dict[str, CameraSchedule] = {}
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._achieved = RateMeter()
+        self._targets_at = 0.0
+
+        self.inferences = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def add_camera(self, camera_id: str, weight: float = 1.0):
+        """Register a camera. It earns turns once its first frames are offered."""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._lock:
+            self._cameras[camera_id] = CameraSchedule(camera_id, weight)
+            self._targets_at = 0.0
+
+    def remove_camera(self, camera_id: str):
+        """Stop scheduling a camera."""
+        with self._lock:
+            self._cameras.pop(camera_id, None)
+            self._targets_at = 0.0
+
+    def set_weight(self, camera_id: str, weight: float):
+        """Change a camera's priority weight."""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._lock:
+            if camera_id in self._cameras:
+                self._cameras[camera_id].weight = weight
+                self._targets_at = 0.0
+
+    def detect(self, camera_id: str, frame: np.ndarray, required: bool = False) -> Optional[Dict]:
+        """
+        Analyze a camera's frame if the schedule grants it a turn.
+
+        Args:
+            camera_id: Camera the frame comes from
+            frame: The camera's latest frame
+            required: Analyze regardless of the budget (e.g. the camera has no
+                      results to reuse yet); the turn is still charged
+
+        Returns:
+            Detection results, or None if the frame was skipped
+        """
+        with self._lock:
+            schedule = self._cameras.get(camera_id)
+            granted = schedule is None or self._acquire(schedule, required)
+        if not granted:
+            return None
+
+        try:
+            results = self.detector.detect_safety_violations(frame)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        if schedule is not None:
+            self._record(schedule, results)
+        return results
+
+    def _effective_weight(self, schedule: CameraSchedule, now: float) -> float:
+        """Weight after applying the policy and any active boosts."""
+        if self.policy == POLICY_ROUND_ROBIN:
+            return 1.0
+        weight = schedule.weight
+        if now < schedule.violations_until:
+            weight *= self.violation_boost
+        elif now < schedule.people_until:
+            weight *= self.people_boost
+        return weight
+
+    def _acquire(self, schedule: CameraSchedule, required: bool) -> bool:
+        """Grant or refuse a camera's offer; must be called with the lock held."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.budget_fps)
+        self._refilled_at = now
+
+        if now - schedule.last_request > self.idle_timeout:
+            # Returning from idle: no turns were banked while it had no frames
+            schedule.credit = min(schedule.credit, 0.0)
+            schedule.credited_at = now
+        schedule.last_request = now
+        schedule.requested.tick(now)
+        if now - self._targets_at >= TARGET_REFRESH_SECONDS:
+            self._refresh_targets(now)
+        schedule.credit = min(MAX_CREDIT, schedule.credit + (now - schedule.credited_at) * schedule.target)
+        schedule.credited_at = now
+
+        # A camera's earned turns are granted even if others just emptied the
+        # bucket (the shares add up to the budget, so the debt is repaid); a
+        # full bucket means nobody is claiming their share, so it is spare
+        if required or (schedule.credit >= 1.0 and self._tokens > -self.burst):
+            schedule.credit -= 1.0
+        elif self._tokens < self.burst:
+            schedule.skipped += 1
+            self.skipped += 1
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def _refresh_targets(self, now: float):
+        """Recompute every camera's share of the budget; must be called with the lock held."""
+        schedules = list(self._cameras.values())
+        weights = {s.camera_id: self._effective_weight(s, now) for s in schedules}
+        for camera_id, target in self._targets(schedules, weights, now).items():
+            self._cameras[camera_id].target = target
+        self._targets_at = now
+
+    def _record(self, schedule: CameraSchedule, results: Dict):
+        """Update boosts and counters after an inference."""
+        now = time.monotonic()
+        with self._lock:
+            if results.get('violations'):
+                schedule.violations_until = now + self.boost_hold
+            if results.get('people_count'):
+                schedule.people_until = now + self.boost_hold
+            schedule.inferences += 1
+            schedule.achieved.tick(now)
+            self._achieved.tick(now)
+            self.inferences += 1
+
+    def _targets(self, schedules, weights: Dict[str, float], now: float) -> Dict[str, float]:
+        """
+        Split the budget by effective weight. A camera cannot be analyzed
+        faster than it offers frames; what it leaves unused goes to the others.
+        """
+        targets = {s.camera_id: 0.0 for s in schedules}
+        pending = [s for s in schedules if now - s.last_request <= self.idle_timeout]
+        remaining = self.budget_fps
+        while pending:
+            total_weight = sum(weights[s.camera_id] for s in pending)
+            capped = [s for s in pending
+                      if s.requested.rate(now) <= remaining * weights[s.camera_id] / total_weight]
+            if not capped:
+                for s in pending:
+                    targets[s.camera_id] = remaining * weights[s.camera_id] / total_weight
+                break
+            for s in capped:
+                targets[s.camera_id] = s.requested.rate(now)
+                remaining -= targets[s.camera_id]
+                pending.remove(s)
+        return targets
+
+    def get_stats(self) -> dict:
+        """Get per-camera target and achieved inference rates."""
+        now = time.monotonic()
+        with self._lock:
+            schedules = list(self._cameras.values())
+            weights = {s.camera_id: self._effective_weight(s, now) for s in schedules}
+            targets = self._targets(schedules, weights, now)
+
+            cameras = {}
+            for schedule in schedules:
+                cameras[schedule.camera_id] = {
+                    'weight': schedule.weight,
+                    'effective_weight': round(weights[schedule.camera_id], 2),
+                    'boosted': weights[schedule.camera_id] > schedule.weight,
+                    'requested_fps': round(schedule.requested.rate(now), 2),
+                    'target_fps': round(targets[schedule.camera_id], 2),
+                    'achieved_fps': round(schedule.achieved.rate(now), 2),
+                    'inferences': schedule.inferences,
+                    'skipped': schedule.skipped
+                }
+
+            return {
+                'policy': self.policy,
+                'budget_fps': self.budget_fps,
+                'achieved_fps': round(self._achieved.rate(now), 2),
+                'inferences': self.inferences,
+                'skipped': self.skipped,
+                'errors': self.errors,
+                'cameras': cameras
+            }
@@ -0,0 +1,248 @@
+"""
+Processing Pipeline for SafetyMaster Pro
+Runs video processing as explicit stages connected by bounded queues,
+with per-stage concurrency, drop policy, latency and queue-depth metrics
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# What a stage does when its input queue is full
+DROP_OLDEST = 'drop_oldest'  # Discard the oldest queued item to make room (keeps latency low)
+DROP_NEWEST = 'drop_newest'  # Discard the incoming item
+BLOCK = 'block'              # Wait for room (lossless, applies backpressure upstream)
+
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class Stage:
+    """
+    One step of a pipeline. The function receives an item and returns the
+    item for the next stage, or None to drop it. The first stage of a
+    pipeline is its source: its function is called with None and returns a
+    new item, or None when nothing is available yet.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Optional[Any]],
+                 concurrency: int = 1, queue_size: int = 2, drop_policy: str = DROP_OLDEST):
+        """
+        Initialize a stage.
+
+        Args:
+            name: Stage name used in metrics
+            func: Function processing one item
+            concurrency: Number of worker threads running the function
+            queue_size: Capacity of the stage's input queue
+            drop_policy: What to do when the input queue is full
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        if concurrency < 1 or queue_size < 1:
+            raise ValueError("concurrency and queue_size must be at least 1")
+
+        self.name = name
+        self.func = func
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.input_queue = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.filtered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_workers = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.latency = 0.0  # Smoothed processing time in seconds
+
+    def offer(self, item: Any, is_running: Callable[[], bool]) -> bool:
+        """
+        Put an item on the stage's input queue according to its drop policy.
+
+        Args:
+            item: Item to enqueue
+            is_running: Callable telling a blocked producer when to give up
+
+        Returns:
+            True if the item was queued, False if it was dropped
+        """
+        if self.drop_policy == BLOCK:
+            while is_running():
+                try:
+                    self.input_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        if self.drop_policy == DROP_NEWEST:
+            try:
+                self.input_queue.put_nowait(item)
+                return True
+            except queue.Full:
+                self._count_drop()
+                return False
+
+        # DROP_OLDEST: make room by discarding the stalest queued item
+        while True:
+            try:
+                self.input_queue.put_nowait(item)
+                return True
+            except queue.Full:
+                try:
+                    self.input_queue.get_nowait()
+                    self._count_drop()
+                except queue.Empty:
+                    pass
+
+    def _count_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def run(self, item: Any) -> Optional[Any]:
+        """Run the stage function on one item and record its timing."""
+        with self._lock:
+            self.busy_workers += 1
+        start_time = time.time()
+        try:
+            result = self.func(item)
+        except Exception as e:
+            print(f"Error in pipeline stage '{self.name}': {e}")
+            with self._lock:
+                self.errors += 1
+            result = None
+            failed = True
+        else:
+            failed = False
+        elapsed = time.time() - start_time
+
+        with self._lock:
+            self.busy_workers -= 1
+            if failed:
+                return None
+            if result is None:
+                self.filtered += 1
+            else:
+                self.processed += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+            self.latency = elapsed if self.latency == 0.0 else 0.9 * self.latency + 0.1 * elapsed
+        return result
+
+    def get_stats(self) -> dict:
+        """Get latency, throughput and queue-depth numbers for this stage."""
+        with self._lock:
+            calls = self.processed + self.filtered
+            return {
+                'concurrency': self.concurrency,
+                'drop_policy': self.drop_policy,
+                'queue_depth': self.input_queue.qsize(),
+                'queue_size': self.queue_size,
+                'busy_workers': self.busy_workers,
+                'processed': self.processed,
+                'filtered': self.filtered,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'latency_ms': round(self.latency * 1000, 2),
+                'avg_latency_ms': round(self.total_time / calls * 1000, 2) if calls else 0.0,
+                'max_latency_ms': round(self.max_time * 1000, 2)
+            }
+
+
+class Pipeline:
+    """
+    Chains stages with bounded queues and runs each stage on its own worker threads.
+    Stages with a concurrency above 1 may finish items out of order.
+    """
+
+    def __init__(self, name: str, stages: List[Stage]):
+        """
+        Initialize a pipeline.
+
+        Args:
+            name: Pipeline name used in thread names and logs
+            stages: Stages in processing order; the first one is the source
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+
+        self.name = name
+        self.stages = stages
+        self.is_running = False
+        self._threads: List[threading.Thread] = []
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        """Start worker threads for every stage."""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        self.started_at = time.time()
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            target = self._run_source if index == 0 else self._run_stage
+            for worker in range(stage.concurrency):
+                thread = threading.Thread(target=target, args=(stage, next_stage),
+                                          name=f"{self.name}-{stage.name}-{worker}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        """Stop all stages and wait for their threads to exit."""
+        self.is_running = False
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.time()))
+        self._threads = []
+
+        # Drop anything still queued
+        for stage in self.stages:
+            while True:
+                try:
+                    stage.input_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _running(self) -> bool:
+        return self.is_running
+
+    def _run_source(self, stage: Stage, next_stage: Optional[Stage]):
+        """Worker loop for the source stage."""
+        while self.is_running:
+            item = stage.run(None)
+            if item is not None and next_stage is not None:
+                next_stage.offer(item, self._running)
+
+    def _run_stage(self, stage: Stage, next_stage: Optional[Stage]):
+        """Worker loop for an intermediate or final stage."""
+        while self.is_running:
+            try:
+                item = stage.input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            result = stage.run(item)
+            if result is not None and next_stage is not None:
+                next_stage.offer(result, self._running)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        Get metrics for every stage, plus the name of the likely bottleneck
+        (the non-source stage with the highest smoothed latency per worker;
+        the source is excluded because it may sleep to pace its output).
+        """
+        stages = {stage.name: stage.get_stats() for stage in self.stages}
+        candidates = self.stages[1:] or self.stages
+        bottleneck = max(candidates, key=lambda s: s.latency / s.concurrency).name
+        return {
+            'running': self.is_running,
+            'uptime': round(time.time() - self.started_at, 1) if self.started_at else 0.0,
+            'bottleneck': bottleneck,
+            'stages': stages
+        }
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Preload Launcher for SafetyMaster Pro
+Loads and warms up the safety detector once in a parent process, then forks
+web workers that share the model's read-only memory pages copy-on-write.
+Each worker serves the web interface on its own port and monitors a subset
+of the cameras, so more cameras fit on a node within the same memory limit.
+With several workers, each also gets its own violation database, capture
+and clip directories and frame bus address, and an equal share of the
+retention limits, so workers never write to or evict each other's files.
+
+Fork-based sharing is only available on Linux/macOS and with the CPU device
+(a CUDA context cannot be used across fork).
+
+Example:
+    python preload_launcher.py --workers 2 --base-port 8080 \
+        --camera dock=rtsp://10.0.0.5/stream --camera bay3=rtsp://10.0.0.6/stream \
+        --camera bay4=rtsp://10.0.0.7/stream
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+import web_interface
+from config import SafetyConfig
+from safety_detector import SafetyDetector
+
+# Seconds to wait before restarting a worker that exited, doubled on each restart
+RESTART_BACKOFF = 1.0
+RESTART_MAX_BACKOFF = 30.0
+
+CameraSpec = Tuple[str, Union[int, str]]
+
+
+def parse_camera_spec(spec: str) -> CameraSpec:
+    """
+    Parse a camera given as 'id=source'; webcam indexes become ints.
+
+    Args:
+        spec: Camera specification, e.g. 'dock=rtsp://10.0.0.5/stream' or 'desk=0'
+
+    Returns:
+        Tuple of (camera_id, source)
+    """
+    camera_id, separator, source = spec.partition('=')
+    if not separator or not camera_id or not source:
+        raise argparse.ArgumentTypeError(f"Camera must be given as id=source: {spec}")
+    return camera_id, int(source) if source.isdigit() else source
+
+
+def assign_cameras(cameras: List[CameraSpec], workers: int) -> List[List[CameraSpec]]:
+    """Deal the cameras out to the workers round-robin."""
+    assignments = [[] for _ in range(workers)]
+    for index, camera in enumerate(cameras):
+        assignments[index % workers].append(camera)
+    return assignments
+
+
+def worker_bus_address(address: str, index: int) -> str:
+    """Give worker i its own frame bus address: TCP port + i, or a suffixed socket path."""
+    if address.startswith('tcp://'):
+        host, _, port = address.rpartition(':')
+        return f"{host}:{int(port) + index}"
+    return f"{address}-worker{index}"
+
+
+def isolate_worker(index: int, workers: int):
+    """
+    Point a worker's SafetyConfig at state of its own. Workers monitor
+    different cameras, so nothing has to be shared; without this they would
+    append to one captures.jsonl, keep diverging rollups of one database,
+    evict each other's files and fail to bind the same bus address.
+
+    Args:
+        index: Worker number
+        workers: Total number of workers; a single worker keeps the configured paths
+    """
+    if workers <= 1:
+        return
+    suffix = f'-worker{index}'
+    root, extension = os.path.splitext(SafetyConfig.VIOLATION_DB_PATH)
+    SafetyConfig.VIOLATION_DB_PATH = root + suffix + extension
+    for name in ('VIOLATION_IMAGES_DIR', 'MANUAL_CAPTURES_DIR', 'CLIP_DIR'):
+        setattr(SafetyConfig, name, getattr(SafetyConfig, name).rstrip('/\\') + suffix)
+    # The configured limits stay the limits of the whole node
+    for name in ('MAX_VIOLATION_IMAGES', 'MAX_VIOLATION_IMAGES_BYTES', 'CLIP_MAX_TOTAL_BYTES'):
+        limit = getattr(SafetyConfig, name)
+        if limit is not None:
+            setattr(SafetyConfig, name, max(1, limit // workers))
+    if SafetyConfig.FRAME_BUS_LISTEN:
+        SafetyConfig.FRAME_BUS_LISTEN = worker_bus_address(SafetyConfig.FRAME_BUS_LISTEN, index)
+
+
+def preload_detector(model_path: Optional[str], confidence: float,
+                     warmup_iterations: int = 3, warmup_size: int = 640) -> SafetyDetector:
+    """
+    Load the detector and run a few dummy inferences so lazily created
+    buffers and fused layers exist before the workers are forked.
+
+    Args:
+        model_path: Path to custom model, if None the default PPE model is used
+        confidence: Detection confidence threshold
+        warmup_iterations: Dummy frames analyzed after loading
+        warmup_size: Width and height of the dummy frames
+
+    Returns:
+        The loaded SafetyDetector
+    """
+    import torch
+    # Keep the parent single-threaded: OpenMP thread pools started before
+    # fork do not exist in the children and can hang their first inference
+    torch.set_num_threads(1)
+
+    detector = SafetyDetector(model_path, confidence)
+    if detector.device != 'cpu':
+        raise RuntimeError(f"Copy-on-write sharing needs the CPU device, detector is on {detector.device}")
+
+    frame = np.zeros((warmup_size, warmup_size, 3), dtype=np.uint8)
+    start_time = time.time()
+    for _ in range(warmup_iterations):
+        detector.detect_safety_violations(frame)
+    print(f"   Warm-up: {warmup_iterations} inference(s) in {time.time() - start_time:.2f}s")
+
+    # Move everything allocated so far out of the collector's reach; otherwise
+    # the first collection in each worker writes to (and so copies) every page
+    gc.collect()
+    gc.freeze()
+    return detector
+
+
+def run_worker(index: int, workers: int, detector: SafetyDetector, cameras: List[CameraSpec],
+               host: str, port: int, torch_threads: int):
+    """Worker process body: start this worker's cameras and serve the web interface."""
+    import torch
+    torch.set_num_threads(max(1, torch_threads))
+    # Restarted workers inherit the supervisor's SIGTERM handler
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    print(f"👷 Worker {index} (pid {os.getpid()}) on port {port}: "
+          f"{', '.join(camera_id for camera_id, _ in cameras) or 'no cameras'}")
+    isolate_worker(index, workers)
+    # Threads do not survive fork, so the batcher and camera threads start here
+    if not web_interface.initialize_components(detector):
+        print(f"❌ Worker {index}: initialization failed")
+        sys.exit(1)
+    for camera_id, source in cameras:
+        if web_interface.start_session(camera_id, source) is None:
+            print(f"❌ Worker {index}: failed to start camera {camera_id} ({source})")
+    web_interface.serve(host, port)
+
+
+def get_memory_usage(pid: int) -> Optional[Dict[str, float]]:
+    """
+    Read a process's resident, proportional and shared memory in MB (Linux only).
+    PSS divides shared pages between the processes sharing them, so the sum of
+    the workers' PSS is their real combined footprint.
+    """
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty'):
+                    usage[key] = int(value.split()[0]) / 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        'rss_mb': round(usage.get('Rss', 0.0), 1),
+        'pss_mb': round(usage.get('Pss', 0.0), 1),
+        'shared_mb': round(usage.get('Shared_Clean', 0.0) + usage.get('Shared_Dirty', 0.0), 1)
+    }
+
+
+def print_memory_report(processes: List[multiprocessing.Process]):
+    """Print each worker's memory use and the combined proportional footprint."""
+    total_pss = 0.0
+    for index, process in enumerate(processes):
+        usage = get_memory_usage(process.pid) if process.is_alive() else None
+        if usage is None:
+            continue
+        total_pss += usage['pss_mb']
+        print(f"   Worker {index}: RSS {usage['rss_mb']} MB, PSS {usage['pss_mb']} MB, "
+              f"shared {usage['shared_mb']} MB")
+    if total_pss:
+        print(f"   Combined worker PSS: {total_pss:.1f} MB")
+
+
+def launch(detector: SafetyDetector, assignments: List[List[CameraSpec]], host: str,
+           base_port: int, torch_threads: int, restart: bool = True,
+           memory_report_delay: float = 10.0):
+    """
+    Fork one worker per camera group and supervise them until interrupted.
+
+    Args:
+        detector: Preloaded detector shared copy-on-write with the workers
+        assignments: Cameras for each worker
+        host: Interface the workers listen on
+        base_port: Worker i listens on base_port + i
+        torch_threads: Intra-op threads per worker
+        restart: Re-fork workers that exit
+        memory_report_delay: Seconds after start to print memory use (0 disables)
+    """
+    context = multiprocessing.get_context('fork')
+
+    def start(index: int) -> multiprocessing.Process:
+        process = context.Process(target=run_worker, name=f'safety-worker-{index}',
+                                  args=(index, len(assignments), detector, assignments[index],
+                                        host, base_port + index, torch_threads))
+        process.start()
+        return process
+
+    processes = [start(index) for index in range(len(assignments))]
+    backoffs = [RESTART_BACKOFF] * len(processes)
+    report_at = time.time() + memory_report_delay if memory_report_delay else None
+
+    stopping = False
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    try:
+        while not stopping:
+            time.sleep(0.5)
+            if report_at and time.time() >= report_at:
+                print("📊 Memory usage:")
+                print_memory_report(processes)
+                report_at = None
+
+            for index, process in enumerate(processes):
+                if process.is_alive():
+                    continue
+                if not restart:
+                    stopping = True
+                    break
+                print(f"⚠️ Worker {index} exited with code {process.exitcode}, "
+                      f"restarting in {backoffs[index]:g}s")
+                time.sleep(backoffs[index])
+                backoffs[index] = min(backoffs[index] * 2, RESTART_MAX_BACKOFF)
+                processes[index] = start(index)
+    except KeyboardInterrupt:
+        pass
+
+    print("\n🛑 Stopping workers...")
+    for process in processes:
+        if process.is_alive():
+            # Workers shut down their cameras on SIGINT like an interactive stop
+            os.kill(process.pid, signal.SIGINT)
+    for process in processes:
+        process.join(timeout=10.0)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load the detector once and fork web workers that share it')
+    parser.add_argument('--camera', dest='cameras', action='append', default=[],
+                        type=parse_camera_spec, metavar='ID=SOURCE',
+                        help='Camera to monitor (repeatable); webcam index, file or URL')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: one per camera, at most the CPU count)')
+    parser.add_argument('--host', type=str, default='0.0.0.0',
+                        help='Interface the workers listen on')
+    parser.add_argument('--base-port', type=int, default=int(os.environ.get('PORT', 8080)),
+                        help='Port of the first worker; worker i uses base-port + i')
+    parser.add_argument('--model', type=str, default=None,
+                        help='Path to custom YOLO model (optional)')
+    parser.add_argument('--confidence', type=float, default=0.5,
+                        help='Detection confidence threshold (0.1-1.0)')
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help='Intra-op threads per worker (default: CPU count / workers)')
+    parser.add_argument('--warmup', type=int, default=3,
+                        help='Dummy inferences run before forking')
+    parser.add_argument('--no-restart', action='store_true',
+                        help='Stop everything when a worker exits instead of restarting it')
+
+    args = parser.parse_args()
+
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        print("❌ Preloading needs fork(); run web_interface.py directly on this platform")
+        return 1
+
+    cpu_count = os.cpu_count() or 1
+    workers = args.workers or max(1, min(len(args.cameras), cpu_count))
+    torch_threads = args.torch_threads or max(1, cpu_count // workers)
+
+    print("🤖 Preloading AI model in the parent process...")
+    try:
+        detector = preload_detector(args.model, args.confidence, args.warmup)
+    except Exception as e:
+        print(f"❌ Failed to preload detector: {e}")
+        return 1
+
+    assignments = assign_cameras(args.cameras, workers)
+    print(f"🚀 Forking {workers} worker(s), {torch_threads} torch thread(s) each, "
+          f"ports {args.base_port}-{args.base_port + workers - 1}")
+    launch(detector, assignments, args.host, args.base_port, torch_threads,
+           restart=not args.no_restart)
+    print("   All workers stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Retention Manager for SafetyMaster Pro
+Keeps capture directories within count, size and age limits. Files are
+indexed once at startup and then tracked as they are written, so enforcing
+the limits never rescans large directories; eviction runs in small batches on
+a background thread.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+OLDEST_FIRST = 'oldest'
+LOW_SEVERITY_FIRST = 'severity'
+EVICTION_POLICIES = (OLDEST_FIRST, LOW_SEVERITY_FIRST)
+
+# Lower ranks are evicted first with the severity policy
+SEVERITY_RANKS = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+DEFAULT_SEVERITY_RANK = SEVERITY_RANKS['medium']
+
+# Sidecar files removed together with the file they describe: '<name>.json'
+# (clips) and '<name>_metadata.json' (captures from before captures.jsonl)
+SIDECAR_SUFFIXES = ('.json', '_metadata.json')
+
+
+def severity_of(metadata: Optional[Dict]) -> Optional[str]:
+    """
+    Find the highest violation severity in capture metadata.
+
+    Args:
+        metadata: Capture metadata with a 'violation_data' dict or a 'violations' list
+
+    Returns:
+        Severity name, or None if the metadata has none
+    """
+    if not metadata:
+        return None
+    violations = list(metadata.get('violations') or [])
+    if isinstance(metadata.get('violation_data'), dict):
+        violations.append(metadata['violation_data'])
+    severities = [v.get('severity') for v in violations if isinstance(v, dict) and v.get('severity')]
+    if not severities:
+        return metadata.get('severity')
+    return max(severities, key=lambda s: SEVERITY_RANKS.get(s, DEFAULT_SEVERITY_RANK))
+
+
+class RetainedFile:
+    """Index entry of one stored file."""
+
+    __slots__ = ('path', 'size', 'mtime', 'rank')
+
+    def __init__(self, path: str, size: int, mtime: float, rank: int):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.rank = rank
+
+
+class RetentionManager:
+    """
+    Enforces retention limits on one or more directories that share a budget.
+    Eviction order is oldest-first, or lowest severity first (oldest first
+    within a severity) with the 'severity' policy. Files older than the age
+    limit are removed regardless of the policy.
+    """
+
+    def __init__(self, directories: Sequence[str], extensions: Iterable[str] = ('.jpg',),
+                 max_files: Optional[int] = None, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None, policy: str = OLDEST_FIRST,
+                 interval: float = 5.0, batch_size: int = 50,
+                 on_evicted: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the manager and start its thread.
+
+        Args:
+            directories: Directories whose files count against the limits
+            extensions: File extensions that are managed (others are left alone)
+            max_files: Most files kept, None for no limit
+            max_bytes: Most bytes kept, None for no limit
+            max_age_seconds: Oldest file age kept, None for no limit
+            policy: 'oldest' or 'severity'
+            interval: Seconds between enforcement passes when nothing is written
+            batch_size: Most files deleted per pass, so a large backlog is
+                        worked off gradually instead of in one burst
+            on_evicted: Called with the path of each file just before it is
+                        deleted, e.g. to drop it from the capture dedup index
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.policy = policy
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.on_evicted = on_evicted
+
+        self._entries: Dict[str, RetainedFile] = {}
+        # Both heaps hold (key..., sequence, entry); entries replaced or removed
+        # from the index are skipped when they reach the top
+        self._eviction_heap: List[tuple] = []
+        self._age_heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._total_bytes = 0
+        self._condition = threading.Condition()
+        self._scanned = False
+
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.errors = 0
+        self.passes = 0
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name='retention-manager', daemon=True)
+        self._thread.start()
+
+    def _manages(self, path: str) -> bool:
+        return path.lower().endswith(self.extensions)
+
+    def track(self, path: str, size: Optional[int] = None, severity: Optional[str] = None,
+              mtime: Optional[float] = None):
+        """
+        Add a newly written file to the index.
+
+        Args:
+            path: File path
+            size: Size in bytes, read from the file if None
+            severity: Violation severity used by the 'severity' policy
+            mtime: Modification time, defaults to now
+        """
+        path = os.path.abspath(path)
+        if not self._manages(path):
+            return
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return
+        entry = RetainedFile(path, size, time.time() if mtime is None else mtime,
+                             SEVERITY_RANKS.get(severity, DEFAULT_SEVERITY_RANK))
+        with self._condition:
+            self._add(entry)
+            if self._over_limit():
+                self._condition.notify_all()
+
+    def _add(self, entry: RetainedFile):
+        """Index an entry; must be called with the lock held."""
+        previous = self._entries.get(entry.path)
+        if previous is not None:
+            self._total_bytes -= previous.size
+        self._entries[entry.path] = entry
+        self._total_bytes += entry.size
+
+        sequence = next(self._sequence)
+        key = (entry.rank, entry.mtime) if self.policy == LOW_SEVERITY_FIRST else (entry.mtime,)
+        heapq.heappush(self._eviction_heap, key + (sequence, entry))
+        if self.max_age_seconds is not None:
+            heapq.heappush(self._age_heap, (entry.mtime, sequence, entry))
+
+    def _over_limit(self) -> bool:
+        return ((self.max_files is not None and len(self._entries) > self.max_files) or
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes))
+
+    def _pop(self, heap: List[tuple]) -> Optional[RetainedFile]:
+        """Pop the next live entry from a heap and remove it from the index."""
+        while heap:
+            entry = heapq.heappop(heap)[-1]
+            if self._entries.get(entry.path) is entry:
+                del self._entries[entry.path]
+                self._total_bytes -= entry.size
+                return entry
+        return None
+
+    def _peek_oldest(self) -> Optional[RetainedFile]:
+        while self._age_heap:
+            entry = self._age_heap[0][-1]
+            if self._entries.get(entry.path) is entry:
+                return entry
+            heapq.heappop(self._age_heap)
+        return None
+
+    def _compact(self):
+        """Drop stale heap items once they outnumber the live entries."""
+        for heap in (self._eviction_heap, self._age_heap):
+            if len(heap) > 2 * len(self._entries) + 1000:
+                heap[:] = [item for item in heap if self._entries.get(item[-1].path) is item[-1]]
+                heapq.heapify(heap)
+
+    def _select_evictions(self) -> List[RetainedFile]:
+        """Take up to batch_size entries that break a limit out of the index."""
+        selected = []
+        with self._condition:
+            self._compact()
+            if self.max_age_seconds is not None:
+                cutoff = time.time() - self.max_age_seconds
+                while len(selected) < self.batch_size:
+                    oldest = self._peek_oldest()
+                    if oldest is None or oldest.mtime >= cutoff:
+                        break
+                    selected.append(self._pop(self._age_heap))
+            while len(selected) < self.batch_size and self._over_limit():
+                entry = self._pop(self._eviction_heap)
+                if entry is None:
+                    break
+                selected.append(entry)
+        return selected
+
+    def _scan(self):
+        """Index the files already on disk; runs once on the manager's thread."""
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for dirpath, _, filenames in os.walk(directory):
+                batch = []
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    if not self._manages(path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    # Severity of files from an earlier run is unknown
+                    batch.append(RetainedFile(path, stat.st_size, stat.st_mtime, DEFAULT_SEVERITY_RANK))
+                with self._condition:
+                    for entry in batch:
+                        # Files tracked while the scan was running are already indexed
+                        if entry.path not in self._entries:
+                            self._add(entry)
+                if not self.is_running:
+                    return
+        with self._condition:
+            self._scanned = True
+        print(f"Retention: indexed {len(self._entries)} file(s) "
+              f"({self._total_bytes / 1024 / 1024:.1f} MB) in {', '.join(self.directories)}")
+
+    def _run(self):
+        """Manager loop: index existing files, then evict in batches when limits are exceeded."""
+        self._scan()
+        while self.is_running:
+            evictions = self._select_evictions()
+            for entry in evictions:
+                self._delete(entry)
+            with self._condition:
+                self.passes += 1
+                if len(evictions) >= self.batch_size:
+                    # More to do: yield briefly so the backlog does not monopolize the disk
+                    self._condition.wait(0.05)
+                else:
+                    self._condition.wait_for(lambda: not self.is_running or self._over_limit(),
+                                             self.interval)
+
+    def _delete(self, entry: RetainedFile):
+        """Remove an evicted file and its sidecars."""
+        if self.on_evicted:
+            # Before deleting, so nothing new starts referring to the file
+            self.on_evicted(entry.path)
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Retention: could not delete {entry.path}: {e}")
+            with self._condition:
+                self.errors += 1
+            return
+        base_path = os.path.splitext(entry.path)[0]
+        for suffix in SIDECAR_SUFFIXES:
+            try:
+                os.remove(base_path + suffix)
+            except OSError:
+                pass
+        with self._condition:
+            self.evicted += 1
+            self.evicted_bytes += entry.size
+
+    def close(self, timeout: float = 5.0):
+        """Stop the manager thread."""
+        with self._condition:
+            self.is_running = False
+            self._condition.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        """Get the indexed usage against the limits and eviction counters."""
+        with self._condition:
+            return {
+                'directories': self.directories,
+                'policy': self.policy,
+                'indexed': self._scanned,
+                'files': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_files': self.max_files,
+                'max_bytes': self.max_bytes,
+                'max_age_seconds': self.max_age_seconds,
+                'evicted': self.evicted,
+                'evicted_bytes': self.evicted_bytes,
+                'errors': self.errors,
+                'passes': self.passes
+            }
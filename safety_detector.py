@@ -5,25 +5,29 @@ import torch
 import time
 from datetime import datetime
 import os
-import json
 from threading import Thread
 import queue
 from typing import Dict, List, Tuple, Optional
 import requests
 
+from capture_writer import CaptureWriter, capture_filename
+
 class SafetyDetector:
     """
     Real-time safety compliance detection system using YOLO for object detection.
     Detects people and safety equipment like hard hats, safety vests, and safety glasses.
     """
     
-    def __init__(self, model_path: Optional[str] = None, confidence_threshold: float = 0.5):
+    def __init__(self, model_path: Optional[str] = None, confidence_threshold: float = 0.5,
+                 violation_store=None):
         """
         Initialize the safety detector with a specialized PPE detection model.
         
         Args:
             model_path: Path to custom model, if None will download PPE model
             confidence_threshold: Minimum confidence for detections
+            violation_store: Optional ViolationStore that captured violations are
+                             recorded in and summaries are read from
         """
         self.confidence_threshold = confidence_threshold
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -69,7 +73,8 @@ class SafetyDetector:
         }
         
         # Violation tracking
-        self.violations = []
+        self.violation_store = violation_store
+        self.capture_writer = None
         self.violation_images_dir = "violation_captures"
         os.makedirs(self.violation_images_dir, exist_ok=True)
         
@@ -158,6 +163,50 @@ class SafetyDetector:
         # Run detection with optimized settings for speed
         results = self.model(frame, conf=0.3, verbose=False, imgsz=640, half=False)
         
+        analysis = self._analyze_results(results)
+        
+        processing_time = time.time() - start_time
+        analysis['processing_time'] = processing_time
+        analysis['fps'] = 1.0 / processing_time if processing_time > 0 else 0
+        return analysis
+    
+    def detect_safety_violations_batch(self, frames: List[np.ndarray]) -> List[Dict]:
+        """
+        Detect safety violations in several frames with a single batched model call.
+        Batching amortizes per-call overhead and keeps the GPU busy for offline scans.
+        
+        Args:
+            frames: List of BGR frames
+            
+        Returns:
+            One detection result dictionary per frame, as from detect_safety_violations
+        """
+        if not frames:
+            return []
+        
+        start_time = time.time()
+        results = self.model(list(frames), conf=0.3, verbose=False, imgsz=640, half=False)
+        
+        # Per-frame time is the batch time shared across its frames
+        processing_time = (time.time() - start_time) / len(frames)
+        analyses = []
+        for result in results:
+            analysis = self._analyze_results([result])
+            analysis['processing_time'] = processing_time
+            analysis['fps'] = 1.0 / processing_time if processing_time > 0 else 0
+            analyses.append(analysis)
+        return analyses
+    
+    def _analyze_results(self, results) -> Dict:
+        """
+        Turn raw model results for one frame into detections, equipment counts and violations.
+        
+        Args:
+            results: Iterable of model results for a single frame
+            
+        Returns:
+            Dictionary with detections, people_count, safety_equipment and violations
+        """
         detections = []
         people_count = 0
         safety_equipment_detected = {
@@ -261,15 +310,11 @@ class SafetyDetector:
                 'count': people_count
             })
         
-        processing_time = time.time() - start_time
-        
         return {
             'detections': detections,
             'people_count': people_count,
             'safety_equipment': safety_equipment_detected,
-            'violations': violations,
-            'processing_time': processing_time,
-            'fps': 1.0 / processing_time if processing_time > 0 else 0
+            'violations': violations
         }
     
     def draw_detections(self, frame: np.ndarray, results: Dict) -> np.ndarray:
@@ -848,37 +893,39 @@ class SafetyDetector:
         
         return annotated_frame
     
-    def capture_violation(self, frame: np.ndarray, violation_data: Dict) -> str:
+    def capture_violation(self, frame: np.ndarray, violation_data: Dict) -> Optional[str]:
         """
-        Capture and save an image when a safety violation is detected.
+        Capture and save an image when a safety violation is detected. The image
+        and its metadata are written by the background capture writer.
         
         Args:
             frame: Current frame
             violation_data: Information about the violation
             
         Returns:
-            Path to saved image
+            Path the image is being saved to (an earlier capture's path if this one
+            is a near-duplicate of it), or None if the capture queue was full
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        filename = f"violation_{timestamp}.jpg"
-        filepath = os.path.join(self.violation_images_dir, filename)
-        
-        # Save the frame
-        cv2.imwrite(filepath, frame)
+        if self.capture_writer is None:
+            # Created on first use so the writer thread belongs to the process capturing
+            self.capture_writer = CaptureWriter(os.path.join(self.violation_images_dir, 'captures.jsonl'))
         
-        # Save violation metadata
+        filepath = os.path.join(self.violation_images_dir, capture_filename('violation'))
         metadata = {
             'timestamp': datetime.now().isoformat(),
-            'filename': filename,
+            'filename': os.path.basename(filepath),
             'violation_data': violation_data
         }
         
-        metadata_file = filepath.replace('.jpg', '_metadata.json')
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        camera_id = violation_data.get('camera_id', 'default')
+        stored_path = self.capture_writer.submit(frame, filepath, metadata, camera_id=camera_id)
+        if stored_path is None:
+            return None
         
-        self.violations.append(metadata)
-        return filepath
+        if self.violation_store is not None:
+            self.violation_store.record(camera_id, violation_data,
+                                        image_path=stored_path, metadata=violation_data)
+        return stored_path
     
     def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, Dict]:
         """
@@ -910,13 +957,14 @@ class SafetyDetector:
         }
     
     def get_violation_summary(self) -> Dict:
-        """Get a summary of recent violations."""
-        # This would typically connect to a database or log file
-        # For now, return a placeholder
+        """Get a summary of recorded violations from the violation store."""
+        if self.violation_store is not None:
+            return self.violation_store.get_summary()
         return {
+            'total_violations': 0,
             'total_violations_today': 0,
-            'most_common_violation': 'missing_hardhat',
-            'compliance_trend': []  # Could track compliance over time
+            'most_common_violation': None,
+            'compliance_trend': []
         }
 
 if __name__ == "__main__":
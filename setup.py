@@ -50,6 +50,8 @@ setup(
         "console_scripts": [
             "safetymaster=web_interface:main",
             "safetymaster-test=high_fps_test:test_high_fps",
+            "safetymaster-scan=archive_scan:main",
+            "safetymaster-preload=preload_launcher:main",
         ],
     },
     extras_require={
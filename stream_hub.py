@@ -0,0 +1,625 @@
+"""
+Stream Hub for SafetyMaster Pro
+Fans out encoded video frames to connected viewers, encoding each quality
+variant at most once per frame on a shared encoder pool no matter how many
+viewers are connected
+"""
+
+import base64
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Set
+
+import numpy as np
+
+from frame_encoder import JpegEncoderPool, get_shared_encoder
+
+MJPEG_BOUNDARY = 'frame'
+
+# (name, scale, JPEG quality) from best to most compact
+DEFAULT_QUALITY_LADDER = [
+    ('full', 1.0, 75),
+    ('half', 0.5, 65),
+    ('quarter', 0.25, 50)
+]
+
+ADAPTIVE_QUALITY = 'auto'
+
+
+class StreamVariant:
+    """One rung of the quality ladder: an output scale and JPEG quality."""
+
+    def __init__(self, name: str, scale: float, quality: int):
+        self.name = name
+        self.scale = scale
+        self.quality = quality
+
+
+class StreamFrame:
+    """
+    One encoded frame plus the detection data sent alongside it.
+    The base64 form for Socket.IO is produced at most once and shared by all clients.
+    """
+
+    def __init__(self, jpeg: bytes, metadata: Optional[dict] = None,
+                 timestamp: Optional[float] = None):
+        self.jpeg = jpeg
+        self.metadata = metadata or {}
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self._base64 = None
+        self._lock = threading.Lock()
+
+    @property
+    def base64(self) -> str:
+        """Base64 text of the JPEG, encoded on first use."""
+        if self._base64 is None:
+            with self._lock:
+                if self._base64 is None:
+                    self._base64 = base64.b64encode(self.jpeg).decode('utf-8')
+        return self._base64
+
+    def to_message(self) -> dict:
+        """Build the 'video_frame' payload for web clients."""
+        message = dict(self.metadata)
+        message['frame'] = self.base64
+        return message
+
+
+class LatestFrameMailbox:
+    """
+    Single-slot mailbox holding the most recent frame for one viewer.
+    Publishing overwrites an unread frame, so slow viewers skip frames
+    instead of building up a backlog.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._sequence = 0
+        self._read_sequence = 0
+        self._closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        """
+        Replace the frame in the mailbox without blocking.
+
+        Args:
+            frame: Encoded frame to hand to the viewer
+        """
+        with self._condition:
+            if self._sequence > self._read_sequence:
+                self.dropped += 1
+            self._frame = frame
+            self._sequence += 1
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Wait for a frame newer than the last one returned.
+
+        Args:
+            timeout: Maximum seconds to wait, None to wait forever
+
+        Returns:
+            The newest frame, or None on timeout or when the mailbox is closed
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._closed or self._sequence > self._read_sequence, timeout):
+                return None
+            if self._closed:
+                return None
+            self._read_sequence = self._sequence
+            self.delivered += 1
+            return self._frame
+
+    def close(self):
+        """Wake any waiting reader and refuse further frames."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class Viewer:
+    """
+    A mailbox subscribed to one rung of a camera's quality ladder.
+    Adaptive viewers move along the ladder based on measured delivery latency.
+    """
+
+    def __init__(self, camera_id: str, level: int, adaptive: bool):
+        self.camera_id = camera_id
+        self.level = level
+        self.adaptive = adaptive
+        self.mailbox = LatestFrameMailbox()
+        self.latency = 0.0  # Smoothed delivery latency in seconds
+        self.samples_since_change = 0
+        self.fast_samples = 0
+        self.level_changes = 0
+
+    def get_stats(self) -> dict:
+        """Get delivery counters for this viewer."""
+        return {
+            'camera_id': self.camera_id,
+            'level': self.level,
+            'adaptive': self.adaptive,
+            'delivered': self.mailbox.delivered,
+            'dropped': self.mailbox.dropped,
+            'latency_ms': round(self.latency * 1000, 1),
+            'level_changes': self.level_changes
+        }
+
+
+class FanoutClient:
+    """
+    Delivers frames from a viewer's mailbox to one push client (e.g. a Socket.IO session).
+    The next frame is only sent once the previous one has been acknowledged
+    or the ack timed out, so slow clients receive fewer frames.
+    """
+
+    def __init__(self, client_id: str, viewer: Viewer,
+                 send: Callable[[StreamFrame, Callable], None],
+                 on_latency: Callable[[Viewer, float], None], ack_timeout: float = 2.0):
+        """
+        Initialize a fan-out client.
+
+        Args:
+            client_id: Unique identifier of the client
+            viewer: Viewer the hub publishes into
+            send: Callable that pushes a frame and invokes the given callback on ack
+            on_latency: Callable receiving each send-to-ack latency sample
+            ack_timeout: Seconds to wait for an ack before sending the next frame
+        """
+        self.client_id = client_id
+        self.viewer = viewer
+        self.send = send
+        self.on_latency = on_latency
+        self.ack_timeout = ack_timeout
+        self.acked = 0
+        self.ack_timeouts = 0
+        self.send_errors = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def camera_id(self) -> str:
+        return self.viewer.camera_id
+
+    def start(self):
+        """Start the delivery thread."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop delivering frames."""
+        self.viewer.mailbox.close()
+
+    def _run(self):
+        """Send frames one at a time, pacing on client acks."""
+        mailbox = self.viewer.mailbox
+        while not mailbox.closed:
+            frame = mailbox.get(timeout=1.0)
+            if frame is None:
+                continue
+
+            acked = threading.Event()
+            sent_at = time.time()
+            try:
+                self.send(frame, lambda *args: acked.set())
+            except Exception as e:
+                self.send_errors += 1
+                print(f"Error sending frame to client {self.client_id}: {e}")
+                time.sleep(0.1)
+                continue
+
+            if acked.wait(self.ack_timeout):
+                self.acked += 1
+                self.on_latency(self.viewer, time.time() - sent_at)
+            else:
+                self.ack_timeouts += 1
+                self.on_latency(self.viewer, self.ack_timeout)
+
+    def get_stats(self) -> dict:
+        """Get delivery counters for this client."""
+        stats = self.viewer.get_stats()
+        stats.update({
+            'acked': self.acked,
+            'ack_timeouts': self.ack_timeouts,
+            'send_errors': self.send_errors
+        })
+        return stats
+
+
+class PendingFrame:
+    """A published frame whose variants are being encoded on the encoder pool."""
+
+    def __init__(self, viewers: List[Viewer], metadata: Optional[dict], timestamp: float):
+        self.viewers = viewers
+        self.metadata = metadata
+        self.timestamp = timestamp
+        self.futures = {}
+        self.remaining = 0
+
+    def wait(self):
+        """Block until every variant has been encoded."""
+        for future in list(self.futures.values()):
+            future.result()
+
+
+class StreamHub:
+    """
+    Distributes frames produced by the processing loop to every viewer of a
+    camera. Each viewer owns a LatestFrameMailbox, so publishing never blocks
+    on slow viewers, and each quality variant is encoded at most once per
+    frame and only while somebody is subscribed to it.
+    """
+
+    def __init__(self, ladder: Optional[Sequence[Sequence]] = None, ack_timeout: float = 2.0,
+                 downgrade_latency: float = 0.5, upgrade_latency: float = 0.15,
+                 upgrade_after: int = 30, encoder: Optional[JpegEncoderPool] = None,
+                 max_pending: int = 4):
+        """
+        Initialize the stream hub.
+
+        Args:
+            ladder: (name, scale, quality) variants from best to most compact
+            ack_timeout: Seconds a push client may take to acknowledge a frame
+            downgrade_latency: Smoothed latency (seconds) above which a viewer steps down
+            upgrade_latency: Smoothed latency (seconds) below which a viewer may step up
+            upgrade_after: Consecutive fast deliveries required before stepping up
+            encoder: Encoder pool to use, None for the process-wide shared pool
+            max_pending: Frames per camera allowed to be encoding at once before
+                         new frames are skipped
+        """
+        self.ladder: List[StreamVariant] = [
+            StreamVariant(name, scale, quality)
+            for name, scale, quality in (ladder or DEFAULT_QUALITY_LADDER)
+        ]
+        self.ack_timeout = ack_timeout
+        self.downgrade_latency = downgrade_latency
+        self.upgrade_latency = upgrade_latency
+        self.upgrade_after = upgrade_after
+        self.encoder = encoder or get_shared_encoder()
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Deque[PendingFrame]] = {}
+        self._delivery_locks: Dict[str, threading.Lock] = {}
+        self._skipped_counts: Dict[str, int] = {}
+        self._viewers: Dict[str, Set[Viewer]] = {}
+        self._last_frames: Dict[str, Dict[int, StreamFrame]] = {}
+        self._encoded_counts: Dict[str, Dict[str, int]] = {}
+        self._clients: Dict[str, FanoutClient] = {}
+
+    def _resolve_quality(self, quality: Optional[str]) -> tuple:
+        """
+        Map a quality name to a (ladder level, adaptive) pair.
+
+        Raises:
+            ValueError: If the quality name is not on the ladder
+        """
+        if quality is None or quality == ADAPTIVE_QUALITY:
+            return 0, True
+        for level, variant in enumerate(self.ladder):
+            if variant.name == quality:
+                return level, False
+        raise ValueError(f"Unknown stream quality: {quality}")
+
+    def get_quality_names(self) -> List[str]:
+        """Get the selectable quality names, best first."""
+        return [variant.name for variant in self.ladder] + [ADAPTIVE_QUALITY]
+
+    def submit(self, camera_id: str, frame: np.ndarray,
+               metadata: Optional[dict] = None) -> Optional[PendingFrame]:
+        """
+        Start encoding the variants that currently have viewers.
+        Callers that manage ordering themselves pair this with deliver().
+
+        Args:
+            camera_id: Camera the frame belongs to
+            frame: Annotated BGR frame, which must not be modified afterwards
+            metadata: Detection data sent to push clients with the frame
+
+        Returns:
+            PendingFrame tracking the encodes, or None if nobody is watching
+        """
+        with self._lock:
+            viewers = list(self._viewers.get(camera_id, ()))
+        if not viewers:
+            return None
+        return self._submit_encodes(camera_id, frame, PendingFrame(viewers, metadata, time.time()))
+
+    def _submit_encodes(self, camera_id: str, frame: np.ndarray, pending: PendingFrame,
+                        on_done: Optional[Callable] = None) -> PendingFrame:
+        """Submit one encode per subscribed ladder level."""
+        levels = sorted({viewer.level for viewer in pending.viewers})
+        pending.remaining = len(levels)
+        for level in levels:
+            variant = self.ladder[level]
+            future = self.encoder.submit(frame, variant.quality, variant.scale)
+            pending.futures[level] = future
+            if on_done is not None:
+                future.add_done_callback(on_done)
+        return pending
+
+    def publish(self, camera_id: str, frame: np.ndarray, metadata: Optional[dict] = None):
+        """
+        Queue the variants that have viewers for encoding and return immediately.
+        Encoding runs on the encoder pool while the caller moves on to the next
+        frame; frames are still delivered to viewers in publish order.
+
+        Args:
+            camera_id: Camera the frame belongs to
+            frame: Annotated BGR frame, which must not be modified afterwards
+            metadata: Detection data sent to push clients with the frame
+        """
+        with self._lock:
+            viewers = list(self._viewers.get(camera_id, ()))
+            if not viewers:
+                return
+
+            pending_frames = self._pending.setdefault(camera_id, deque())
+            if len(pending_frames) >= self.max_pending:
+                # Encoders are behind; skip rather than queue up stale frames
+                self._skipped_counts[camera_id] = self._skipped_counts.get(camera_id, 0) + 1
+                return
+
+            pending = PendingFrame(viewers, metadata, time.time())
+            pending_frames.append(pending)
+
+        try:
+            self._submit_encodes(camera_id, frame, pending,
+                                 lambda _, cid=camera_id, p=pending: self._on_encoded(cid, p))
+        except Exception:
+            # E.g. the encoder pool has shut down: free the slot so later frames are not blocked
+            with self._lock:
+                try:
+                    pending_frames.remove(pending)
+                except ValueError:
+                    pass
+            raise
+
+    def _on_encoded(self, camera_id: str, pending: PendingFrame):
+        """Count a finished encode and deliver every completed frame in order."""
+        with self._lock:
+            pending.remaining -= 1
+            delivery_lock = self._delivery_locks.setdefault(camera_id, threading.Lock())
+
+        # The delivery lock keeps two encoder threads from interleaving deliveries
+        with delivery_lock:
+            while True:
+                with self._lock:
+                    pending_frames = self._pending.get(camera_id)
+                    if not pending_frames or pending_frames[0].remaining > 0:
+                        return
+                    ready = pending_frames.popleft()
+                self.deliver(camera_id, ready)
+
+    def deliver(self, camera_id: str, pending: PendingFrame):
+        """
+        Wait for a submitted frame's encodes and hand the results to its viewers.
+
+        Args:
+            camera_id: Camera the frame belongs to
+            pending: Frame returned by submit()
+        """
+        encoded = {}
+        for level, future in pending.futures.items():
+            jpeg = future.result()
+            if jpeg is None:
+                continue
+            variant = self.ladder[level]
+            frame_metadata = dict(pending.metadata or {})
+            frame_metadata['quality'] = variant.name
+            encoded[level] = StreamFrame(jpeg, frame_metadata, pending.timestamp)
+
+        with self._lock:
+            self._last_frames.setdefault(camera_id, {}).update(encoded)
+            counts = self._encoded_counts.setdefault(camera_id, {})
+            for level in encoded:
+                name = self.ladder[level].name
+                counts[name] = counts.get(name, 0) + 1
+
+        for viewer in pending.viewers:
+            stream_frame = encoded.get(viewer.level)
+            if stream_frame is not None:
+                viewer.mailbox.put(stream_frame)
+
+    def subscribe(self, camera_id: str, quality: Optional[str] = None) -> Viewer:
+        """
+        Register a new viewer for a camera.
+
+        Args:
+            camera_id: Camera to receive frames from
+            quality: Ladder variant name, or None/'auto' to adapt to the viewer's link
+
+        Returns:
+            Viewer whose mailbox receives the camera's latest frames
+
+        Raises:
+            ValueError: If the quality name is not on the ladder
+        """
+        level, adaptive = self._resolve_quality(quality)
+        viewer = Viewer(camera_id, level, adaptive)
+        with self._lock:
+            self._viewers.setdefault(camera_id, set()).add(viewer)
+            last_frame = self._last_frames.get(camera_id, {}).get(level)
+
+        # Give new viewers something to show straight away
+        if last_frame is not None:
+            viewer.mailbox.put(last_frame)
+        return viewer
+
+    def unsubscribe(self, viewer: Viewer):
+        """Remove a viewer and wake it if it is waiting."""
+        with self._lock:
+            viewers = self._viewers.get(viewer.camera_id)
+            if viewers is not None:
+                viewers.discard(viewer)
+                if not viewers:
+                    del self._viewers[viewer.camera_id]
+        viewer.mailbox.close()
+
+    def record_latency(self, viewer: Viewer, sample: float):
+        """
+        Feed a delivery latency sample and move adaptive viewers along the ladder.
+
+        Args:
+            viewer: Viewer the frame was delivered to
+            sample: Seconds the delivery took
+        """
+        # The level decides which variants publish() encodes, so change it under the lock
+        with self._lock:
+            if viewer.latency == 0.0:
+                viewer.latency = sample
+            else:
+                viewer.latency = 0.8 * viewer.latency + 0.2 * sample
+            viewer.samples_since_change += 1
+
+            if not viewer.adaptive:
+                return
+
+            # Require a few samples at the new level before judging it
+            if (viewer.latency > self.downgrade_latency and viewer.samples_since_change >= 5
+                    and viewer.level < len(self.ladder) - 1):
+                self._set_level(viewer, viewer.level + 1)
+            elif viewer.latency < self.upgrade_latency and viewer.level > 0:
+                viewer.fast_samples += 1
+                if viewer.fast_samples >= self.upgrade_after:
+                    self._set_level(viewer, viewer.level - 1)
+            else:
+                viewer.fast_samples = 0
+
+    def _set_level(self, viewer: Viewer, level: int):
+        """Move a viewer to another rung of the ladder; must be called with the lock held."""
+        viewer.level = level
+        viewer.latency = 0.0
+        viewer.samples_since_change = 0
+        viewer.fast_samples = 0
+        viewer.level_changes += 1
+
+    def add_client(self, client_id: str, camera_id: str,
+                   send: Callable[[StreamFrame, Callable], None],
+                   quality: Optional[str] = None) -> FanoutClient:
+        """
+        Start pushing a camera's frames to a client, replacing any previous subscription.
+
+        Args:
+            client_id: Unique identifier of the client (e.g. Socket.IO sid)
+            camera_id: Camera the client wants to watch
+            send: Callable that pushes a frame and invokes the given callback on ack
+            quality: Ladder variant name, or None/'auto' to adapt to the client's link
+
+        Returns:
+            The running FanoutClient
+
+        Raises:
+            ValueError: If the quality name is not on the ladder
+        """
+        viewer = self.subscribe(camera_id, quality)
+        self.remove_client(client_id)
+
+        client = FanoutClient(client_id, viewer, send, self.record_latency, self.ack_timeout)
+        with self._lock:
+            self._clients[client_id] = client
+        client.start()
+        return client
+
+    def remove_client(self, client_id: str):
+        """Stop pushing frames to a client."""
+        with self._lock:
+            client = self._clients.pop(client_id, None)
+        if client is not None:
+            self.unsubscribe(client.viewer)
+
+    def has_subscribers(self, camera_id: str) -> bool:
+        """Check whether anyone is watching a camera."""
+        with self._lock:
+            return bool(self._viewers.get(camera_id))
+
+    def clear(self, camera_id: str):
+        """Forget the cached frames for a camera that stopped streaming."""
+        with self._lock:
+            self._last_frames.pop(camera_id, None)
+
+    def mjpeg_stream(self, camera_id: str, quality: Optional[str] = None,
+                     keepalive: float = 5.0) -> Iterator[bytes]:
+        """
+        Generate a multipart/x-mixed-replace body for one HTTP viewer.
+
+        Args:
+            camera_id: Camera to stream
+            quality: Ladder variant name, or None/'auto' to adapt to write latency
+            keepalive: Seconds without a new frame before the last frame is resent,
+                       which also lets the server notice disconnected viewers
+
+        Returns:
+            Iterator of multipart chunks each containing one JPEG frame
+
+        Raises:
+            ValueError: If the quality name is not on the ladder
+        """
+        # Validate eagerly so an invalid quality fails before the response starts
+        self._resolve_quality(quality)
+        return self._mjpeg_chunks(camera_id, quality, keepalive)
+
+    def _mjpeg_chunks(self, camera_id: str, quality: Optional[str],
+                      keepalive: float) -> Iterator[bytes]:
+        """Yield multipart chunks until the viewer disconnects."""
+        viewer = self.subscribe(camera_id, quality)
+        mailbox = viewer.mailbox
+        last_frame = None
+        try:
+            while not mailbox.closed:
+                frame = mailbox.get(timeout=keepalive)
+                if frame is None:
+                    if last_frame is None:
+                        continue
+                    frame = last_frame
+                last_frame = frame
+
+                # The server resumes the generator once the chunk is written,
+                # so the time spent here reflects the viewer's link speed
+                written_at = time.time()
+                yield (b'--' + MJPEG_BOUNDARY.encode() + b'\r\n'
+                       b'Content-Type: image/jpeg\r\n'
+                       b'Content-Length: ' + str(len(frame.jpeg)).encode() + b'\r\n\r\n'
+                       + frame.jpeg + b'\r\n')
+                self.record_latency(viewer, time.time() - written_at)
+        finally:
+            self.unsubscribe(viewer)
+
+    def get_stats(self) -> dict:
+        """Get viewer counts and encode counts per camera and counters per push client."""
+        with self._lock:
+            snapshot = {camera_id: list(viewers)
+                        for camera_id, viewers in self._viewers.items()}
+            encoded_counts = {camera_id: dict(counts)
+                              for camera_id, counts in self._encoded_counts.items()}
+            skipped_counts = dict(self._skipped_counts)
+            clients = list(self._clients.values())
+
+        cameras = {}
+        for camera_id in set(snapshot) | set(encoded_counts):
+            viewers = snapshot.get(camera_id, [])
+            cameras[camera_id] = {
+                'viewers': len(viewers),
+                'viewers_by_quality': {
+                    variant.name: sum(1 for v in viewers if v.level == level)
+                    for level, variant in enumerate(self.ladder)
+                },
+                'frames_encoded': encoded_counts.get(camera_id, {}),
+                'frames_skipped': skipped_counts.get(camera_id, 0),
+                'delivered': sum(v.mailbox.delivered for v in viewers),
+                'dropped': sum(v.mailbox.dropped for v in viewers)
+            }
+
+        return {
+            'cameras': cameras,
+            'clients': {client.client_id: client.get_stats() for client in clients},
+            'encoder': self.encoder.get_stats()
+        }
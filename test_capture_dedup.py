@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate detection of violation captures
+"""
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from capture_dedup import CaptureDeduplicator, dhash, hamming_distance
+
+
+def _scene(seed: int) -> np.ndarray:
+    """A smooth random 480x640 scene, different for every seed."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (640, 480), interpolation=cv2.INTER_CUBIC)
+
+
+def test_hash_tolerates_noise_but_not_a_new_scene():
+    """Sensor noise and recompression barely move the hash; another scene does."""
+    frame = _scene(1)
+    noisy = np.clip(frame.astype(np.int16) + np.random.default_rng(2).integers(-6, 7, frame.shape),
+                    0, 255).astype(np.uint8)
+    _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    recompressed = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+    assert hamming_distance(dhash(frame), dhash(noisy)) <= 6
+    assert hamming_distance(dhash(frame), dhash(recompressed)) <= 6
+    assert hamming_distance(dhash(frame), dhash(_scene(3))) > 12
+    assert dhash(frame) == dhash(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+
+def test_hamming_distance():
+    """Distance is the number of differing bits."""
+    assert hamming_distance(0b1011, 0b1011) == 0
+    assert hamming_distance(0b1011, 0b0010) == 2
+    assert hamming_distance(0, (1 << 64) - 1) == 64
+
+
+def test_duplicates_point_at_the_stored_capture():
+    """A near-identical capture of the same camera refers to the stored one."""
+    dedup = CaptureDeduplicator(threshold=6)
+    frame = _scene(1)
+
+    duplicate_of, hash_value = dedup.find('dock', frame)
+    assert duplicate_of is None
+    dedup.add('dock', hash_value, 'captures/dock_1.jpg')
+
+    duplicate_of, _ = dedup.find('dock', frame)
+    assert duplicate_of == 'captures/dock_1.jpg'
+    assert dedup.find('dock', _scene(3))[0] is None
+    assert dedup.find('gate', frame)[0] is None  # Other cameras never match
+
+    stats = dedup.get_stats()
+    assert stats['checked'] == 4
+    assert stats['duplicates'] == 1
+    assert stats['indexed'] == {'dock': 1}
+
+
+def test_window_expires_old_captures():
+    """A capture older than the window no longer absorbs duplicates."""
+    dedup = CaptureDeduplicator(window_seconds=0.2)
+    frame = _scene(1)
+    dedup.add('dock', dedup.find('dock', frame)[1], 'dock_1.jpg')
+    time.sleep(0.3)
+    assert dedup.find('dock', frame)[0] is None
+
+
+def test_index_size_is_bounded():
+    """Each camera remembers at most index_size captures."""
+    dedup = CaptureDeduplicator(index_size=3)
+    for index in range(5):
+        dedup.add('dock', dhash(_scene(index)), f'dock_{index}.jpg')
+    assert dedup.get_stats()['indexed'] == {'dock': 3}
+    assert dedup.find('dock', _scene(0))[0] is None
+    assert dedup.find('dock', _scene(4))[0] == 'dock_4.jpg'
+
+
+def test_forget_drops_deleted_captures():
+    """Captures removed by retention stop matching, whatever the path spelling."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'dock_1.jpg')
+        dedup = CaptureDeduplicator()
+        frame = _scene(1)
+        dedup.add('dock', dedup.find('dock', frame)[1], path)
+        dedup.forget(os.path.join(directory, '.', 'dock_1.jpg'))
+        assert dedup.find('dock', frame)[0] is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
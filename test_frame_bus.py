@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test the frame bus wire format, subscriptions and socket transport
+"""
+
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from frame_bus import (ENCODING_JPEG, ENCODING_RAW, MAX_HEADER_BYTES, BusMessage, InProcessBus,
+                       SocketBusClient, SocketBusServer, Subscription, _recv_message, parse_address)
+
+
+def _frame() -> np.ndarray:
+    frame = np.zeros((48, 64, 3), np.uint8)
+    frame[:, :32] = (40, 120, 200)
+    frame[10:30, 40:60] = 255
+    return frame
+
+
+def _send_and_receive(data: bytes, close_after: bool = True):
+    """Write bytes into one end of a socket pair in chunks and read a message from the other."""
+    reader, writer = socket.socketpair()
+
+    def write():
+        # Small chunks exercise reads that return partial messages
+        for start in range(0, len(data), 1000):
+            writer.sendall(data[start:start + 1000])
+        if close_after:
+            writer.close()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        return _recv_message(reader)
+    finally:
+        thread.join()
+        reader.close()
+        writer.close()
+
+
+def test_raw_frame_round_trip():
+    """A raw frame arrives bit-exact with its header fields, and stays writable."""
+    message = BusMessage('frames/dock', 7, 123.5, {'camera_id': 'dock'}, _frame())
+    header, payload = _send_and_receive(message.encode(ENCODING_RAW))
+    decoded = BusMessage.decode(header, payload)
+
+    assert (decoded.topic, decoded.sequence, decoded.timestamp) == ('frames/dock', 7, 123.5)
+    assert decoded.metadata == {'camera_id': 'dock'}
+    assert np.array_equal(decoded.frame, _frame())
+    decoded.frame[0, 0] = 1
+
+
+def test_jpeg_frame_round_trip():
+    """A JPEG frame is smaller on the wire and decodes close to the original."""
+    message = BusMessage('frames/dock', 1, 0.0, frame=_frame())
+    data = message.encode(ENCODING_JPEG, jpeg_quality=95)
+    assert len(data) < _frame().nbytes
+
+    decoded = BusMessage.decode(*_send_and_receive(data))
+    assert decoded.frame.shape == (48, 64, 3)
+    assert np.abs(decoded.frame.astype(int) - _frame().astype(int)).mean() < 3
+
+
+def test_metadata_only_message():
+    """Results travel without a payload."""
+    data = BusMessage('results/dock', 2, 1.0, {'violations': []}).encode()
+    header_size, payload_size = struct.unpack('!II', data[:8])
+    assert payload_size == 0 and len(data) == 8 + header_size
+
+    decoded = BusMessage.decode(*_send_and_receive(data))
+    assert decoded.frame is None and decoded.metadata == {'violations': []}
+
+
+def test_truncated_and_oversized_messages():
+    """A connection closed mid-message yields None; absurd lengths are rejected."""
+    data = BusMessage('frames/dock', 1, 0.0, frame=_frame()).encode(ENCODING_RAW)
+    assert _send_and_receive(data[:len(data) // 2]) is None
+    assert _send_and_receive(b'') is None
+
+    try:
+        _send_and_receive(struct.pack('!II', MAX_HEADER_BYTES + 1, 0))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("oversized header accepted")
+
+
+def test_parse_address():
+    """TCP and Unix addresses parse; anything else is rejected."""
+    assert parse_address('tcp://0.0.0.0:7700') == (socket.AF_INET, ('0.0.0.0', 7700))
+    assert parse_address('unix:///tmp/bus.sock') == (socket.AF_UNIX, '/tmp/bus.sock')
+    for address in ('tcp://7700', 'udp://host:1', 'host:7700'):
+        try:
+            parse_address(address)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {address}")
+
+
+def test_subscription_drops_oldest_and_counts_gaps():
+    """A full queue keeps the newest messages; sequence gaps count as missed."""
+    subscription = Subscription('frames/', max_queue=2)
+    assert subscription.matches('frames/dock') and not subscription.matches('results/dock')
+    for sequence in (1, 2, 3, 6):
+        subscription.deliver(BusMessage('frames/dock', sequence, 0.0))
+
+    assert [subscription.get(0).sequence, subscription.get(0).sequence] == [3, 6]
+    assert subscription.get(timeout=0.01) is None
+    assert subscription.get_stats() == {'topic': 'frames/', 'queued': 0, 'received': 4,
+                                        'dropped': 2, 'missed': 2}
+
+
+def test_in_process_bus_sequences_and_topics():
+    """Sequence numbers are per topic, and only matching subscriptions receive."""
+    bus = InProcessBus()
+    frames = bus.subscribe('frames/', max_queue=10)
+    dock_results = bus.subscribe('results/dock')
+    assert bus.publish('frames/dock', _frame()) == 1
+    assert bus.publish('frames/gate', _frame()) == 1
+    assert bus.publish('frames/dock', _frame()) == 2
+    assert bus.publish('results/gate', metadata={}) == 1
+
+    assert [(m.topic, m.sequence) for m in (frames.get(0), frames.get(0), frames.get(0))] == [
+        ('frames/dock', 1), ('frames/gate', 1), ('frames/dock', 2)]
+    assert dock_results.get(timeout=0.01) is None
+    assert frames.get_latest(0) is None
+
+    bus.unsubscribe(frames)
+    bus.publish('frames/dock', _frame())
+    assert frames.closed and frames.get(0) is None
+    assert bus.get_stats()['published'] == 5
+
+
+def test_socket_transport_end_to_end():
+    """Frames published on a server reach a client subscribed over a Unix socket."""
+    with tempfile.TemporaryDirectory() as directory:
+        address = 'unix://' + os.path.join(directory, 'bus.sock')
+        server = SocketBusServer(address, encoding=ENCODING_RAW)
+        client = SocketBusClient(address)
+        try:
+            subscription = client.subscribe('frames/dock')
+            received = None
+            deadline = time.time() + 5.0
+            while received is None and time.time() < deadline:
+                # The client's subscribe request reaches the server asynchronously
+                server.publish('frames/dock', _frame(), {'camera_id': 'dock'})
+                server.publish('frames/gate', _frame())
+                received = subscription.get(timeout=0.1)
+
+            assert received is not None
+            assert received.topic == 'frames/dock'
+            assert received.metadata == {'camera_id': 'dock'}
+            assert np.array_equal(received.frame, _frame())
+            assert client.get_stats()['connected']
+            assert not hasattr(client, 'publish')
+        finally:
+            client.close()
+            server.close()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the capture ring buffer's slot reference counting
+"""
+
+from camera_manager import FrameRingBuffer
+
+
+def _write(ring, sequence):
+    slot = ring.acquire_write_slot()
+    assert slot is not None
+    ring.buffers[slot][:] = sequence
+    ring.commit(slot, float(sequence), sequence)
+    return slot
+
+
+def test_lease_returns_latest_frame_once():
+    """Only frames newer than the caller's sequence are leased."""
+    ring = FrameRingBuffer(3, (2, 2, 3))
+    assert ring.lease_latest() is None
+    _write(ring, 1)
+    _write(ring, 2)
+
+    lease = ring.lease_latest()
+    assert lease.sequence == 2
+    assert (lease.frame == 2).all()
+    assert ring.lease_latest(after_sequence=2) is None
+    lease.release()
+
+
+def test_writer_skips_leased_and_latest_slots():
+    """A leased slot and the latest frame's slot are never overwritten."""
+    ring = FrameRingBuffer(3, (2, 2, 3))
+    leased_slot = _write(ring, 1)
+    lease = ring.lease_latest()
+    latest_slot = _write(ring, 2)
+
+    free_slot = ring.acquire_write_slot()
+    assert free_slot not in (leased_slot, latest_slot)
+    assert ring.acquire_write_slot() is None
+    assert ring.get_stats()['overruns'] == 1
+    assert (lease.frame == 1).all()
+
+    ring.abandon(free_slot)
+    lease.release()
+    assert ring.acquire_write_slot() is not None
+
+
+def test_slot_is_reused_only_after_every_lease_is_released():
+    """Two readers of one frame both have to release it before it is reused."""
+    ring = FrameRingBuffer(2, (1, 1, 3))
+    slot = _write(ring, 1)
+    first = ring.lease_latest()
+    second = ring.lease_latest()
+    _write(ring, 2)  # Takes the other slot; the first one is no longer the latest
+    assert ring.get_stats()['leased'] == 1
+
+    first.release()
+    assert ring.acquire_write_slot() is None
+    second.release()
+    assert ring.acquire_write_slot() == slot
+
+
+def test_release_is_idempotent():
+    """Releasing a lease twice, or via the context manager and again, drops one reference."""
+    ring = FrameRingBuffer(2, (1, 1, 3))
+    _write(ring, 1)
+    other = ring.lease_latest()
+    with ring.lease_latest() as lease:
+        assert lease.sequence == 1
+    lease.release()
+    assert ring.get_stats()['leased'] == 1
+    other.release()
+    assert ring.get_stats()['leased'] == 0
+
+
+def test_dropped_lease_frees_its_slot():
+    """A lease garbage-collected without release() returns its slot."""
+    ring = FrameRingBuffer(2, (1, 1, 3))
+    _write(ring, 1)
+    ring.lease_latest()  # Discarded immediately
+    assert ring.get_stats()['leased'] == 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test the inference scheduler's budget, weighted shares and boosts
+"""
+
+import inference_scheduler
+from inference_scheduler import POLICY_ROUND_ROBIN, InferenceScheduler
+
+# Offers arrive on ticks of 1/32 s, which floats represent exactly
+TICKS_PER_SECOND = 32
+
+
+class FakeClock:
+    """Stands in for the time module so tests control time.monotonic()."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeDetector:
+    def __init__(self, results=None):
+        self.calls = 0
+        self.results = results or {'people_count': 0, 'violations': []}
+
+    def detect_safety_violations(self, frame):
+        self.calls += 1
+        return self.results
+
+
+def _with_clock(test):
+    """Run a test with a fake clock in place of the scheduler's time module."""
+    def run():
+        real_time = inference_scheduler.time
+        inference_scheduler.time = FakeClock()
+        try:
+            test(inference_scheduler.time)
+        finally:
+            inference_scheduler.time = real_time
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+
+def _offer_for(scheduler, clock, offer_fps, seconds):
+    """
+    Cameras offer frames at the given rates (which divide TICKS_PER_SECOND)
+    for a number of seconds.
+
+    Returns:
+        Granted inferences per camera
+    """
+    granted = {camera_id: 0 for camera_id in offer_fps}
+    for tick in range(int(seconds * TICKS_PER_SECOND)):
+        clock.now += 1.0 / TICKS_PER_SECOND
+        for camera_id, fps in offer_fps.items():
+            if tick % (TICKS_PER_SECOND // fps) == 0 and scheduler.detect(camera_id, None) is not None:
+                granted[camera_id] += 1
+    return granted
+
+
+def _scheduler(budget_fps, weights, **options):
+    scheduler = InferenceScheduler(FakeDetector(), budget_fps=budget_fps, **options)
+    for camera_id, weight in weights.items():
+        scheduler.add_camera(camera_id, weight=weight)
+    return scheduler
+
+
+@_with_clock
+def test_single_camera_held_to_budget(clock):
+    """A camera offering more frames than the budget is analyzed at budget_fps."""
+    scheduler = _scheduler(10, {'dock': 1.0})
+    granted = _offer_for(scheduler, clock, {'dock': 32}, seconds=20)
+    assert 198 <= granted['dock'] <= 202
+
+    stats = scheduler.get_stats()
+    assert stats['inferences'] == granted['dock']
+    assert stats['skipped'] == 640 - granted['dock']
+    assert stats['cameras']['dock']['target_fps'] == 10.0
+
+
+@_with_clock
+def test_required_frames_are_charged(clock):
+    """Required frames run whatever the budget, but count against it."""
+    scheduler = _scheduler(10, {'dock': 1.0})
+    _offer_for(scheduler, clock, {'dock': 32}, seconds=5)
+    for _ in range(10):
+        assert scheduler.detect('dock', None, required=True) is not None
+    assert scheduler.detect('dock', None) is None
+
+    granted = _offer_for(scheduler, clock, {'dock': 32}, seconds=10)
+    assert granted['dock'] <= 100 - 10 + 2
+
+
+@_with_clock
+def test_weighted_split_under_load(clock):
+    """Under contention cameras get inference in proportion to their weight."""
+    scheduler = _scheduler(20, {'dock': 3.0, 'gate': 1.0})
+    granted = _offer_for(scheduler, clock, {'dock': 32, 'gate': 32}, seconds=20)
+    assert 395 <= granted['dock'] + granted['gate'] <= 405
+    assert 2.8 <= granted['dock'] / granted['gate'] <= 3.2
+
+    cameras = scheduler.get_stats()['cameras']
+    assert cameras['dock']['target_fps'] == 15.0
+    assert cameras['gate']['target_fps'] == 5.0
+
+
+@_with_clock
+def test_round_robin_ignores_weights(clock):
+    """Round-robin gives every camera equal turns whatever its weight."""
+    scheduler = _scheduler(20, {'dock': 3.0, 'gate': 1.0}, policy=POLICY_ROUND_ROBIN)
+    granted = _offer_for(scheduler, clock, {'dock': 32, 'gate': 32}, seconds=20)
+    assert abs(granted['dock'] - granted['gate']) <= 10
+
+
+@_with_clock
+def test_slow_cameras_get_their_frames_and_leave_the_rest(clock):
+    """
+    Cameras offering fewer frames than their share get nearly all of them
+    analyzed, and the budget they leave goes to the busy camera.
+    """
+    scheduler = _scheduler(20, {'dock': 1.0, 'gate': 1.0, 'yard': 1.0})
+    granted = _offer_for(scheduler, clock, {'dock': 32, 'gate': 2, 'yard': 4}, seconds=20)
+    assert granted['gate'] >= 36
+    assert granted['yard'] >= 72
+    assert 395 <= sum(granted.values()) <= 405
+
+
+@_with_clock
+def test_budget_is_fully_used_with_mixed_rates(clock):
+    """Shares follow weights among busy cameras while slow cameras are served."""
+    scheduler = _scheduler(30, {'a': 1.0, 'b': 2.0, 'c': 1.0, 'd': 1.0})
+    granted = _offer_for(scheduler, clock, {'a': 32, 'b': 32, 'c': 8, 'd': 4}, seconds=20)
+    assert 590 <= sum(granted.values()) <= 605
+    assert 1.6 <= granted['b'] / granted['a'] <= 2.2
+    assert granted['d'] >= 72
+
+
+@_with_clock
+def test_people_boost_raises_weight(clock):
+    """A camera seeing people is boosted for boost_hold seconds."""
+    scheduler = InferenceScheduler(FakeDetector({'people_count': 2, 'violations': []}),
+                                   budget_fps=10, people_boost=2.0, boost_hold=5.0)
+    scheduler.add_camera('dock')
+    scheduler.detect('dock', None)
+    camera = scheduler.get_stats()['cameras']['dock']
+    assert camera['boosted'] and camera['effective_weight'] == 2.0
+
+    clock.now += 6.0
+    assert not scheduler.get_stats()['cameras']['dock']['boosted']
+
+
+def test_unscheduled_camera_and_errors():
+    """Unknown cameras bypass the schedule; detector errors are counted and raised."""
+    class FailingDetector:
+        def detect_safety_violations(self, frame):
+            raise RuntimeError("model crashed")
+
+    assert InferenceScheduler(FakeDetector(), budget_fps=1).detect('unknown', None) is not None
+
+    scheduler = InferenceScheduler(FailingDetector(), budget_fps=10)
+    scheduler.add_camera('dock')
+    try:
+        scheduler.detect('dock', None)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("detector error was swallowed")
+    assert scheduler.get_stats()['errors'] == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
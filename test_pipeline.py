@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the processing pipeline's drop policies and stage chaining
+"""
+
+import threading
+import time
+
+from pipeline import BLOCK, DROP_NEWEST, DROP_OLDEST, Pipeline, Stage
+
+
+def _queued(stage):
+    items = []
+    while not stage.input_queue.empty():
+        items.append(stage.input_queue.get_nowait())
+    return items
+
+
+def test_drop_oldest_keeps_newest_items():
+    """A full DROP_OLDEST queue discards its stalest item for each new one."""
+    stage = Stage('sink', lambda item: item, queue_size=2, drop_policy=DROP_OLDEST)
+    for item in range(5):
+        assert stage.offer(item, lambda: True)
+    assert _queued(stage) == [3, 4]
+    assert stage.get_stats()['dropped'] == 3
+
+
+def test_drop_newest_keeps_oldest_items():
+    """A full DROP_NEWEST queue refuses incoming items."""
+    stage = Stage('sink', lambda item: item, queue_size=2, drop_policy=DROP_NEWEST)
+    accepted = [stage.offer(item, lambda: True) for item in range(5)]
+    assert accepted == [True, True, False, False, False]
+    assert _queued(stage) == [0, 1]
+    assert stage.get_stats()['dropped'] == 3
+
+
+def test_block_waits_for_room_and_gives_up_when_stopped():
+    """BLOCK applies backpressure until a consumer makes room or the pipeline stops."""
+    stage = Stage('sink', lambda item: item, queue_size=1, drop_policy=BLOCK)
+    assert stage.offer(0, lambda: True)
+
+    def consume():
+        time.sleep(0.2)
+        stage.input_queue.get()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    start_time = time.time()
+    assert stage.offer(1, lambda: True)
+    assert time.time() - start_time >= 0.15
+    consumer.join()
+
+    running = [True]
+    threading.Timer(0.2, lambda: running.__setitem__(0, False)).start()
+    assert not stage.offer(2, lambda: running[0])
+    assert _queued(stage) == [1]
+    assert stage.get_stats()['dropped'] == 0
+
+
+def test_invalid_stage_configuration():
+    """Unknown drop policies and empty queues are rejected."""
+    for kwargs in ({'drop_policy': 'drop_random'}, {'queue_size': 0}, {'concurrency': 0}):
+        try:
+            Stage('bad', lambda item: item, **kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f"Stage accepted {kwargs}")
+
+
+def test_pipeline_runs_items_through_stages():
+    """Items flow from the source through every stage; None filters an item out."""
+    source_items = iter(range(10))
+    results = []
+    done = threading.Event()
+
+    def source(_):
+        item = next(source_items, None)
+        if item is None:
+            time.sleep(0.01)
+        return item
+
+    def sink(item):
+        results.append(item)
+        if len(results) == 5:
+            done.set()
+        return item
+
+    pipeline = Pipeline('test', [
+        Stage('source', source),
+        Stage('odd', lambda item: item if item % 2 else None, drop_policy=BLOCK),
+        Stage('sink', sink, drop_policy=BLOCK)
+    ])
+    pipeline.start()
+    try:
+        assert done.wait(5.0)
+    finally:
+        pipeline.stop()
+
+    assert results == [1, 3, 5, 7, 9]
+    stats = pipeline.get_stats()
+    assert stats['stages']['odd']['processed'] == 5
+    assert stats['stages']['odd']['filtered'] == 5
+    assert not stats['running']
+
+
+def test_stage_errors_are_counted_not_raised():
+    """An exception in a stage function drops the item and counts an error."""
+    def fail(item):
+        raise RuntimeError("boom")
+
+    stage = Stage('failing', fail)
+    assert stage.run(1) is None
+    stats = stage.get_stats()
+    assert stats['errors'] == 1
+    assert stats['processed'] == 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test capture retention: limits, eviction order and sidecar cleanup
+"""
+
+import os
+import tempfile
+import time
+
+from retention_manager import LOW_SEVERITY_FIRST, RetentionManager, severity_of
+
+
+def _write(directory: str, name: str, size: int = 100, age: float = 0.0) -> str:
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def _remaining(directory: str):
+    return sorted(os.listdir(directory))
+
+
+def test_existing_files_are_indexed_and_oldest_evicted():
+    """Files already on disk count against the limit; the oldest go first."""
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(5):
+            _write(directory, f'capture_{index}.jpg', age=100 - index)
+        _write(directory, 'notes.txt', age=1000)  # Not a managed extension
+
+        manager = RetentionManager([directory], max_files=3, interval=0.05)
+        try:
+            assert _wait_for(lambda: manager.get_stats()['evicted'] == 2)
+            stats = manager.get_stats()
+            assert stats['indexed'] and stats['files'] == 3 and stats['bytes'] == 300
+        finally:
+            manager.close()
+        assert _remaining(directory) == ['capture_2.jpg', 'capture_3.jpg', 'capture_4.jpg', 'notes.txt']
+
+
+def test_tracked_files_trigger_eviction_with_sidecars():
+    """Writing past the limit evicts at once, together with both sidecar names."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = RetentionManager([directory], max_files=2, interval=60.0)
+        try:
+            assert _wait_for(lambda: manager.get_stats()['indexed'])
+            oldest = _write(directory, 'clip_0.jpg')
+            _write(directory, 'clip_0.json')
+            _write(directory, 'clip_0_metadata.json')
+            manager.track(oldest, mtime=1.0)
+            manager.track(_write(directory, 'clip_1.jpg'), mtime=2.0)
+            manager.track(_write(directory, 'clip_2.jpg'), mtime=3.0)
+            assert _wait_for(lambda: manager.get_stats()['evicted'] == 1)
+        finally:
+            manager.close()
+        assert _remaining(directory) == ['clip_1.jpg', 'clip_2.jpg']
+
+
+def test_severity_policy_evicts_low_severity_first():
+    """With the severity policy, low-severity captures go before older critical ones."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = RetentionManager([directory], max_files=2, policy=LOW_SEVERITY_FIRST, interval=60.0)
+        try:
+            assert _wait_for(lambda: manager.get_stats()['indexed'])
+            manager.track(_write(directory, 'critical.jpg'), severity='critical', mtime=1.0)
+            manager.track(_write(directory, 'low.jpg'), severity='low', mtime=2.0)
+            manager.track(_write(directory, 'high.jpg'), severity='high', mtime=3.0)
+            assert _wait_for(lambda: manager.get_stats()['evicted'] == 1)
+        finally:
+            manager.close()
+        assert _remaining(directory) == ['critical.jpg', 'high.jpg']
+
+
+def test_byte_and_age_limits():
+    """Files are evicted to fit max_bytes, and any file past max_age_seconds is removed."""
+    with tempfile.TemporaryDirectory() as directory:
+        _write(directory, 'expired.jpg', size=10, age=3600)
+        for index in range(4):
+            _write(directory, f'big_{index}.jpg', size=1000, age=10 - index)
+
+        manager = RetentionManager([directory], max_bytes=2500, max_age_seconds=600, interval=0.05)
+        try:
+            assert _wait_for(lambda: manager.get_stats()['evicted'] == 3)
+            assert manager.get_stats()['bytes'] == 2000
+        finally:
+            manager.close()
+        assert _remaining(directory) == ['big_2.jpg', 'big_3.jpg']
+
+
+def test_backlog_is_worked_off_in_batches():
+    """A large backlog is deleted batch_size files per pass, and on_evicted sees each file first."""
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(20):
+            _write(directory, f'capture_{index:02d}.jpg', age=100 - index)
+        notified = []
+
+        def on_evicted(path):
+            assert os.path.exists(path)
+            notified.append(os.path.basename(path))
+
+        manager = RetentionManager([directory], max_files=4, batch_size=5, interval=0.05,
+                                   on_evicted=on_evicted)
+        try:
+            assert _wait_for(lambda: manager.get_stats()['evicted'] == 16)
+            assert manager.get_stats()['passes'] >= 4
+        finally:
+            manager.close()
+        assert notified == [f'capture_{index:02d}.jpg' for index in range(16)]
+        assert len(_remaining(directory)) == 4
+
+
+def test_severity_of_metadata():
+    """The highest severity in the capture metadata wins."""
+    assert severity_of(None) is None
+    assert severity_of({'severity': 'low'}) == 'low'
+    assert severity_of({'violations': [{'severity': 'low'}, {'severity': 'critical'}],
+                        'violation_data': {'severity': 'high'}}) == 'critical'
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
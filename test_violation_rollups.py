@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the per-minute, per-hour and per-day violation rollups
+"""
+
+import random
+from collections import Counter
+from datetime import datetime
+
+from violation_rollups import DAY, HOUR, MINUTE, ViolationRollups, bucket_start
+
+NOW = datetime(2026, 3, 10, 14, 30, 15).timestamp()
+
+
+def _brute_series(events, granularity, since=None, until=None, camera_id=None):
+    """Series computed straight from the events, to compare the rollups against."""
+    counts = Counter(bucket_start(timestamp, granularity) for timestamp, camera, _ in events
+                     if camera_id is None or camera == camera_id)
+    since = bucket_start(since, granularity) if since is not None else None
+    return sorted((bucket, count) for bucket, count in counts.items()
+                  if (since is None or bucket >= since) and (until is None or bucket < until))
+
+
+def test_bucket_start():
+    """Buckets start on the minute, the hour and local midnight."""
+    assert bucket_start(NOW, MINUTE) == datetime(2026, 3, 10, 14, 30).timestamp()
+    assert bucket_start(NOW, HOUR) == datetime(2026, 3, 10, 14).timestamp()
+    assert bucket_start(NOW, DAY) == datetime(2026, 3, 10).timestamp()
+    try:
+        bucket_start(NOW, 'week')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown granularity accepted")
+
+
+def test_counts_per_bucket_camera_and_type():
+    """Each event counts once per granularity and towards the all-time totals."""
+    rollups = ViolationRollups()
+    rollups.add(NOW, 'dock', 'no_hardhat')
+    rollups.add(NOW + 10, 'dock', 'no_hardhat')
+    rollups.add(NOW + 20, 'gate', 'no_vest')
+    rollups.add(NOW - 3600, 'dock', 'no_vest')
+
+    assert rollups.total() == 4
+    assert rollups.total(camera_id='dock') == 3
+    assert rollups.total(violation_type='no_vest') == 2
+    assert rollups.get_bucket(MINUTE, NOW) == {('dock', 'no_hardhat'): 2, ('gate', 'no_vest'): 1}
+    assert rollups.get_bucket(HOUR, NOW, camera_id='gate') == {('gate', 'no_vest'): 1}
+    assert rollups.get_series(HOUR) == [(bucket_start(NOW - 3600, HOUR), 1), (bucket_start(NOW, HOUR), 3)]
+    assert rollups.get_series(DAY, violation_type='no_hardhat') == [(bucket_start(NOW, DAY), 2)]
+
+
+def test_series_ranges_match_the_events():
+    """Range reads return exactly the buckets a scan of the events would."""
+    rng = random.Random(7)
+    events = [(NOW - rng.uniform(0, 30 * 86400), rng.choice(['dock', 'gate']), rng.choice(['a', 'b']))
+              for _ in range(2000)]
+    rollups = ViolationRollups()
+    rollups.apply(rollups.aggregate(events))
+
+    ranges = [(None, None), (NOW - 86400, None), (None, NOW - 7 * 86400),
+              (NOW - 20 * 86400, NOW - 10 * 86400), (NOW, NOW)]
+    for granularity in (MINUTE, HOUR, DAY):
+        for since, until in ranges:
+            for camera_id in (None, 'dock'):
+                assert (rollups.get_series(granularity, since, until, camera_id=camera_id) ==
+                        _brute_series(events, granularity, since, until, camera_id))
+
+
+def test_negative_counts_remove_events():
+    """Applying negative counts (events deleted from history) empties the buckets."""
+    rollups = ViolationRollups()
+    counts = rollups.aggregate([(NOW, 'dock', 'no_hardhat'), (NOW + 5, 'dock', 'no_hardhat')])
+    rollups.apply(counts)
+    rollups.apply({key: -count for key, count in counts.items()})
+    assert rollups.total() == 0
+    assert rollups.get_series(MINUTE) == []
+    assert rollups.get_bucket(HOUR, NOW) == {}
+
+
+def test_prune_keeps_days_and_recent_buckets():
+    """Minute and hour buckets expire; day buckets and totals are kept."""
+    rollups = ViolationRollups(retention={MINUTE: 3600, HOUR: 2 * 86400})
+    for age in (10, 2 * 3600, 3 * 86400):
+        rollups.add(NOW - age, 'dock', 'no_hardhat')
+
+    cutoffs = rollups.prune(NOW)
+    assert cutoffs == {MINUTE: NOW - 3600, HOUR: NOW - 2 * 86400}
+    assert [bucket for bucket, _ in rollups.get_series(MINUTE)] == [bucket_start(NOW - 10, MINUTE)]
+    assert len(rollups.get_series(HOUR)) == 2
+    assert len(rollups.get_series(DAY)) == 2
+    assert rollups.total() == 3
+
+    # Buckets created after a prune are still found
+    rollups.add(NOW + 60, 'dock', 'no_hardhat')
+    assert rollups.get_series(MINUTE, since=NOW + 60) == [(bucket_start(NOW + 60, MINUTE), 1)]
+
+
+def test_load_restores_persisted_rows():
+    """Rows saved by the store rebuild the same counters."""
+    rollups = ViolationRollups()
+    rollups.load([(MINUTE, bucket_start(NOW, MINUTE), 'dock', 'no_hardhat', 3),
+                  (HOUR, bucket_start(NOW, HOUR), 'dock', 'no_hardhat', 3),
+                  (DAY, bucket_start(NOW, DAY), 'dock', 'no_hardhat', 3)])
+    assert rollups.total(camera_id='dock') == 3
+    assert rollups.get_series(MINUTE, since=NOW - 60) == [(bucket_start(NOW, MINUTE), 3)]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
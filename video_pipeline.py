@@ -0,0 +1,253 @@
+"""
+Video Pipeline for SafetyMaster Pro
+Per-camera processing pipeline:
+capture → preprocess → infer → postprocess → render → encode → publish
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+from camera_manager import CameraManager
+from frame_bus import RESULTS_TOPIC, InProcessBus
+from frame_pacer import FramePacer
+from pipeline import BLOCK, DROP_OLDEST, Pipeline, Stage
+from safety_detector import SafetyDetector
+from stream_hub import StreamHub
+
+# Stage settings tuned for live monitoring: small queues that drop the oldest
+# frame keep latency low; the encode stage overlaps work on the encoder pool
+DEFAULT_STAGE_SETTINGS = {
+    'capture': {'concurrency': 1, 'queue_size': 1, 'drop_policy': DROP_OLDEST},
+    'preprocess': {'concurrency': 1, 'queue_size': 1, 'drop_policy': DROP_OLDEST},
+    'infer': {'concurrency': 1, 'queue_size': 1, 'drop_policy': DROP_OLDEST},
+    'postprocess': {'concurrency': 1, 'queue_size': 2, 'drop_policy': BLOCK},
+    'render': {'concurrency': 1, 'queue_size': 2, 'drop_policy': DROP_OLDEST},
+    'encode': {'concurrency': 2, 'queue_size': 2, 'drop_policy': DROP_OLDEST},
+    'publish': {'concurrency': 1, 'queue_size': 4, 'drop_policy': DROP_OLDEST}
+}
+
+STAGE_NAMES = list(DEFAULT_STAGE_SETTINGS.keys())
+
+
+class VideoPipeline:
+    """
+    Runs the live monitoring loop for one camera as a staged pipeline, so each
+    stage's latency and queue depth can be inspected to find the bottleneck.
+    """
+
+    def __init__(self, camera_id: str, camera_manager: CameraManager,
+                 detector: SafetyDetector, stream_hub: StreamHub,
+                 target_fps: float = 30, inference_interval: int = 3,
+                 on_violations: Optional[Callable[[str, List[Dict]], None]] = None,
+                 stage_settings: Optional[Dict[str, dict]] = None,
+                 inference=None, result_bus=None, scheduler=None,
+                 on_results: Optional[Callable[[str, Dict], None]] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            camera_id: Camera identifier used for streaming and logging
+            camera_manager: Started camera to read frames from
+            detector: Safety detector used for inference and drawing
+            stream_hub: Hub that encodes and distributes annotated frames
+            target_fps: Output frame rate the capture stage is paced to (ignored for
+                        sequential file sources, which run as fast as the stages allow)
+            inference_interval: Run detection on every Nth frame (at most, with a scheduler),
+                                reusing results in between
+            on_violations: Callback receiving (camera_id, violations) for frames with violations
+            stage_settings: Per-stage overrides of concurrency, queue_size and drop_policy.
+                            With a sequential file source every stage defaults to
+                            blocking, so no frame is dropped and results are repeatable.
+            inference: Optional object with detect_safety_violations (e.g. a
+                       DynamicBatcher shared by all cameras); defaults to the detector
+            result_bus: Optional publishing bus (InProcessBus or SocketBusServer, not a
+                        SocketBusClient) that detection results are published to on
+                        'results/<camera_id>' (see frame_bus.py)
+            scheduler: Optional InferenceScheduler shared by all cameras that decides
+                       which frames due for inference are analyzed under the global
+                       budget; skipped frames reuse the previous results. Not used for
+                       sequential file sources, so their results stay repeatable.
+            on_results: Callback receiving (camera_id, results) for every analyzed frame
+        """
+        if result_bus is not None and not isinstance(result_bus, InProcessBus):
+            raise TypeError("Results can only be published on an InProcessBus or SocketBusServer")
+
+        self.camera_id = camera_id
+        self.camera_manager = camera_manager
+        self.detector = detector
+        self.inference = inference or detector
+        self.result_bus = result_bus
+        self.stream_hub = stream_hub
+        self.inference_interval = max(1, inference_interval)
+        self.on_violations = on_violations
+        self.on_results = on_results
+        self.pacer = FramePacer(target_fps)
+        self.lossless = camera_manager.sequential
+        self.scheduler = scheduler if not self.lossless else None
+
+        self._sequence = 0
+        self._capture_sequence = 0
+        self._paced = False
+        self._last_results = None
+        self._last_published = -1
+
+        funcs = {
+            'capture': self._capture,
+            'preprocess': self._preprocess,
+            'infer': self._infer,
+            'postprocess': self._postprocess,
+            'render': self._render,
+            'encode': self._encode,
+            'publish': self._publish
+        }
+        stages = []
+        for name in STAGE_NAMES:
+            settings = dict(DEFAULT_STAGE_SETTINGS[name])
+            if self.lossless:
+                settings['drop_policy'] = BLOCK
+            settings.update((stage_settings or {}).get(name, {}))
+            stages.append(Stage(name, funcs[name], **settings))
+        self.pipeline = Pipeline(f"camera-{camera_id}", stages)
+
+    def start(self):
+        """Start processing frames."""
+        self.pipeline.start()
+
+    def stop(self):
+        """Stop processing frames."""
+        self.pipeline.stop()
+        self.stream_hub.clear(self.camera_id)
+
+    @property
+    def is_running(self) -> bool:
+        return self.pipeline.is_running
+
+    def _capture(self, _) -> Optional[dict]:
+        """Source stage: take the newest camera frame, paced to the target rate."""
+        if self.lossless:
+            return self._capture_next()
+
+        if not self.camera_manager.is_connected():
+            time.sleep(0.5)  # Wait if camera is not active
+            self.pacer.reset()
+            self._paced = False
+            return None
+
+        # Wait for this frame's time slot once, then block until a new frame arrives
+        if not self._paced:
+            self.pacer.wait()
+            self._paced = True
+
+        # Lease the frame so ring-mode capture hands it over without copying
+        lease = self.camera_manager.acquire_latest_frame(self._capture_sequence, timeout=0.5)
+        if lease is None:
+            return None
+
+        self._paced = False
+        self._capture_sequence = lease.sequence
+        self._sequence += 1
+        return {'sequence': self._sequence, 'frame': lease.frame,
+                'timestamp': lease.timestamp, 'lease': lease}
+
+    def _capture_next(self) -> Optional[dict]:
+        """Source stage for sequential files: take every frame in order, unpaced."""
+        if self.camera_manager.end_of_stream:
+            time.sleep(0.5)
+            return None
+
+        frame_data = self.camera_manager.get_next_frame(timeout=0.5)
+        if frame_data is None:
+            return None
+
+        frame, media_timestamp, position = frame_data
+        self._sequence += 1
+        return {'sequence': self._sequence, 'frame': frame,
+                'timestamp': media_timestamp, 'position': position}
+
+    def _preprocess(self, item: dict) -> dict:
+        """Normalize the frame to 3-channel BGR and decide whether to run inference."""
+        frame = item['frame']
+        if frame.ndim == 2:
+            item['frame'] = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        elif frame.shape[2] == 4:
+            item['frame'] = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+        # Run AI detection every Nth frame for higher FPS, reusing results in between
+        item['run_inference'] = item['sequence'] % self.inference_interval == 0
+        return item
+
+    def _infer(self, item: dict) -> dict:
+        """Run safety detection, or reuse the previous results for intermediate and skipped frames."""
+        if self.scheduler is not None:
+            if item['run_inference'] or self._last_results is None:
+                results = self.scheduler.detect(self.camera_id, item['frame'],
+                                                required=self._last_results is None)
+                item['run_inference'] = results is not None
+                if results is not None:
+                    self._last_results = results
+        elif item['run_inference'] or self._last_results is None:
+            self._last_results = self.inference.detect_safety_violations(item['frame'])
+            item['run_inference'] = True
+        item['results'] = self._last_results
+        return item
+
+    def _postprocess(self, item: dict) -> dict:
+        """Report violations and build the data sent to web clients."""
+        results = item['results']
+        if item['run_inference'] and self.on_results:
+            self.on_results(self.camera_id, results)
+        if results['violations'] and item['run_inference'] and self.on_violations:
+            self.on_violations(self.camera_id, results['violations'])
+
+        item['metadata'] = {
+            'camera_id': self.camera_id,
+            'people_count': results['people_count'],
+            'safety_equipment': results['safety_equipment'],
+            'violations': results['violations'],
+            'fps': results['fps'],
+            'output_fps': self.pacer.achieved_fps,
+            'target_fps': self.pacer.target_fps,
+            'timestamp': datetime.now().isoformat()
+        }
+        if 'position' in item:
+            item['metadata']['frame_position'] = item['position']
+            item['metadata']['media_timestamp'] = item['timestamp']
+        if self.result_bus is not None and item['run_inference']:
+            self.result_bus.publish(RESULTS_TOPIC + self.camera_id, None, item['metadata'], item['timestamp'])
+        return item
+
+    def _render(self, item: dict) -> dict:
+        """Draw detections on a copy of the frame and release the captured frame."""
+        item['annotated_frame'] = self.detector.draw_detections(item['frame'], item['results'])
+        del item['frame']
+        lease = item.pop('lease', None)
+        if lease is not None:
+            lease.release()
+        return item
+
+    def _encode(self, item: dict) -> Optional[dict]:
+        """Encode each subscribed quality variant on the shared encoder pool."""
+        pending = self.stream_hub.submit(self.camera_id, item['annotated_frame'], item['metadata'])
+        if pending is None:
+            return None  # Nobody is watching
+        pending.wait()
+        item['pending'] = pending
+        return item
+
+    def _publish(self, item: dict) -> Optional[dict]:
+        """Hand encoded frames to viewers, dropping frames overtaken by newer ones."""
+        if item['sequence'] < self._last_published:
+            return None
+        self._last_published = item['sequence']
+        self.stream_hub.deliver(self.camera_id, item['pending'])
+        return item
+
+    def get_stats(self) -> dict:
+        """Get per-stage metrics and target versus achieved output rate."""
+        stats = self.pipeline.get_stats()
+        stats['camera_id'] = self.camera_id
+        stats['pacing'] = self.pacer.get_stats()
+        return stats
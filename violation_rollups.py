@@ -0,0 +1,180 @@
+"""
+Violation Rollups for SafetyMaster Pro
+Per-minute, per-hour and per-day violation counts by camera and type,
+updated as events arrive. Summaries and trends read these counters instead
+of scanning the violation history; the ViolationStore persists them next to
+the events so they survive restarts.
+"""
+
+import bisect
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MINUTE = 'minute'
+HOUR = 'hour'
+DAY = 'day'
+GRANULARITIES = (MINUTE, HOUR, DAY)
+
+# Seconds each granularity is kept, None keeps it forever. All-time totals
+# are derived from the day buckets, so those are never pruned.
+ROLLUP_RETENTION = {
+    MINUTE: 24 * 3600,
+    HOUR: 90 * 24 * 3600,
+    DAY: None
+}
+
+RollupKey = Tuple[str, float, str, str]  # (granularity, bucket start, camera_id, type)
+
+
+def bucket_start(timestamp: float, granularity: str) -> float:
+    """
+    Start of the bucket containing a timestamp, in local time so that day
+    buckets begin at midnight.
+
+    Args:
+        timestamp: Epoch seconds
+        granularity: 'minute', 'hour' or 'day'
+
+    Returns:
+        Epoch seconds of the bucket start
+    """
+    if granularity == MINUTE:
+        return float(int(timestamp // 60) * 60)
+    moment = datetime.fromtimestamp(timestamp).replace(minute=0, second=0, microsecond=0)
+    if granularity == HOUR:
+        return moment.timestamp()
+    if granularity == DAY:
+        return moment.replace(hour=0).timestamp()
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+class ViolationRollups:
+    """
+    In-memory rollup counters. Every event increments one counter per
+    granularity plus the all-time total of its camera and type.
+    """
+
+    def __init__(self, retention: Optional[Dict[str, Optional[float]]] = None):
+        """
+        Initialize empty rollups.
+
+        Args:
+            retention: Seconds each granularity is kept (see ROLLUP_RETENTION)
+        """
+        self.retention = dict(ROLLUP_RETENTION, **(retention or {}))
+        # granularity -> bucket start -> (camera_id, type) -> count
+        self._buckets: Dict[str, Dict[float, Counter]] = {granularity: {} for granularity in GRANULARITIES}
+        # granularity -> sorted bucket starts, so range reads only touch the buckets in range
+        self._order: Dict[str, List[float]] = {granularity: [] for granularity in GRANULARITIES}
+        self._totals = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def keys_for(timestamp: float, camera_id: str, violation_type: str) -> List[RollupKey]:
+        """Rollup keys an event counts towards."""
+        return [(granularity, bucket_start(timestamp, granularity), camera_id, violation_type)
+                for granularity in GRANULARITIES]
+
+    def aggregate(self, events: Iterable[Tuple[float, str, str]]) -> Counter:
+        """Count (timestamp, camera_id, type) events per rollup key."""
+        counts = Counter()
+        for timestamp, camera_id, violation_type in events:
+            for key in self.keys_for(timestamp, camera_id, violation_type):
+                counts[key] += 1
+        return counts
+
+    def apply(self, counts: Dict[RollupKey, int]):
+        """Add (or, with negative counts, subtract) aggregated counts."""
+        with self._lock:
+            for (granularity, bucket, camera_id, violation_type), count in counts.items():
+                cells = self._buckets[granularity].get(bucket)
+                if cells is None:
+                    cells = self._buckets[granularity][bucket] = Counter()
+                    # New buckets are almost always the latest, so this is an append
+                    bisect.insort(self._order[granularity], bucket)
+                cells[(camera_id, violation_type)] += count
+                if granularity == DAY:
+                    self._totals[(camera_id, violation_type)] += count
+
+    def add(self, timestamp: float, camera_id: str, violation_type: str):
+        """Count one event."""
+        self.apply({key: 1 for key in self.keys_for(timestamp, camera_id, violation_type)})
+
+    def prune(self, now: float) -> Dict[str, float]:
+        """
+        Drop buckets older than their granularity's retention.
+
+        Returns:
+            Cutoff per pruned granularity, for deleting the persisted rows too
+        """
+        cutoffs = {}
+        with self._lock:
+            for granularity, seconds in self.retention.items():
+                if seconds is None or granularity == DAY:
+                    continue
+                cutoff = now - seconds
+                buckets, order = self._buckets[granularity], self._order[granularity]
+                expired = bisect.bisect_left(order, cutoff)
+                for bucket in order[:expired]:
+                    del buckets[bucket]
+                del order[:expired]
+                cutoffs[granularity] = cutoff
+        return cutoffs
+
+    @staticmethod
+    def _matches(cell: Tuple[str, str], camera_id: Optional[str], violation_type: Optional[str]) -> bool:
+        return ((camera_id is None or cell[0] == camera_id) and
+                (violation_type is None or cell[1] == violation_type))
+
+    def total(self, camera_id: Optional[str] = None, violation_type: Optional[str] = None) -> int:
+        """All-time event count."""
+        with self._lock:
+            return sum(count for cell, count in self._totals.items()
+                       if self._matches(cell, camera_id, violation_type))
+
+    def get_bucket(self, granularity: str, timestamp: float,
+                   camera_id: Optional[str] = None) -> Dict[Tuple[str, str], int]:
+        """Counts by (camera_id, type) in the bucket containing a timestamp."""
+        bucket = bucket_start(timestamp, granularity)
+        with self._lock:
+            cells = self._buckets[granularity].get(bucket, {})
+            return {cell: count for cell, count in cells.items()
+                    if count and self._matches(cell, camera_id, None)}
+
+    def get_series(self, granularity: str, since: Optional[float] = None, until: Optional[float] = None,
+                   camera_id: Optional[str] = None,
+                   violation_type: Optional[str] = None) -> List[Tuple[float, int]]:
+        """
+        Event counts per bucket, oldest first; buckets without events are omitted.
+        Only the buckets in the requested range are read.
+
+        Args:
+            granularity: 'minute', 'hour' or 'day'
+            since: Only buckets starting at or after this epoch time
+            until: Only buckets starting before this epoch time
+            camera_id: Only this camera
+            violation_type: Only this violation type
+
+        Returns:
+            List of (bucket start, count)
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        with self._lock:
+            buckets, order = self._buckets[granularity], self._order[granularity]
+            first = bisect.bisect_left(order, bucket_start(since, granularity)) if since is not None else 0
+            last = bisect.bisect_left(order, until) if until is not None else len(order)
+            series = []
+            for bucket in order[first:last]:
+                count = sum(count for cell, count in buckets[bucket].items()
+                            if self._matches(cell, camera_id, violation_type))
+                if count:
+                    series.append((bucket, count))
+        return series
+
+    def load(self, rows: Iterable[Tuple[str, float, str, str, int]]):
+        """Add persisted (granularity, bucket, camera_id, type, count) rows."""
+        self.apply({(granularity, bucket, camera_id, violation_type): count
+                    for granularity, bucket, camera_id, violation_type, count in rows})
@@ -0,0 +1,359 @@
+"""
+Violation Store for SafetyMaster Pro
+Durable SQLite (WAL mode) history of safety violations. Events are queued by
+the detection threads and written in batched transactions by a background
+writer, so recording never waits on the disk; indexed queries serve the API.
+Summaries and trends come from rollup counters kept in memory and persisted
+in the same transactions as the events.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from violation_rollups import DAY, HOUR, ViolationRollups
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS violations (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT,
+    severity TEXT,
+    count INTEGER NOT NULL DEFAULT 1,
+    image_path TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_violations_time ON violations (timestamp);
+CREATE INDEX IF NOT EXISTS idx_violations_camera_time ON violations (camera_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_violations_type_time ON violations (type, timestamp);
+CREATE TABLE IF NOT EXISTS violation_rollups (
+    granularity TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, camera_id, type)
+);
+"""
+
+INSERT_SQL = """
+INSERT INTO violations (timestamp, camera_id, type, description, severity, count, image_path, metadata)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_ROLLUP_SQL = """
+INSERT INTO violation_rollups (granularity, bucket, camera_id, type, count) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (granularity, bucket, camera_id, type) DO UPDATE SET count = count + excluded.count
+"""
+
+# Seconds between deletions of rollup buckets past their retention
+ROLLUP_PRUNE_INTERVAL = 300.0
+
+
+def _to_epoch(value) -> Optional[float]:
+    """Accept epoch seconds, a datetime or an ISO string."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ViolationStore:
+    """
+    Violation history in SQLite. record() only queues the event; a writer
+    thread inserts queued events in one transaction per batch.
+    """
+
+    def __init__(self, db_path: str = 'violations.db', batch_size: int = 100,
+                 flush_interval: float = 0.5, max_queue: int = 10000):
+        """
+        Open (or create) the database and start the writer thread.
+
+        Args:
+            db_path: SQLite database file
+            batch_size: Most events written per transaction
+            flush_interval: Longest time in seconds an event waits to be written
+            max_queue: Events held in memory while the disk falls behind; newer
+                       events are dropped (and counted) when it is full
+        """
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._write_conn = self._connect()
+        self._write_conn.executescript(SCHEMA)
+        self._write_conn.commit()
+        self.rollups = ViolationRollups()
+        self._load_rollups()
+        self._last_prune = 0.0
+        # Reads run on request threads; WAL lets them proceed while the writer commits
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.total_write_time = 0.0
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name='violation-writer', daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL with NORMAL sync survives process crashes; only an OS crash can lose the last commits
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _load_rollups(self):
+        """Load the persisted rollups, building them once for a history that predates them."""
+        conn = self._write_conn
+        if (conn.execute('SELECT 1 FROM violation_rollups LIMIT 1').fetchone() is None and
+                conn.execute('SELECT 1 FROM violations LIMIT 1').fetchone() is not None):
+            print("Building violation rollups from the existing history...")
+            counts = self.rollups.aggregate(
+                (row[0], row[1], row[2]) for row in conn.execute('SELECT timestamp, camera_id, type FROM violations'))
+            with conn:
+                conn.executemany(UPSERT_ROLLUP_SQL, [key + (count,) for key, count in counts.items()])
+        self.rollups.load(conn.execute(
+            'SELECT granularity, bucket, camera_id, type, count FROM violation_rollups'))
+        self._prune_rollups()
+
+    def _prune_rollups(self):
+        """Drop rollup buckets past their retention from memory and disk (writer thread only)."""
+        self._last_prune = time.monotonic()
+        cutoffs = self.rollups.prune(time.time())
+        try:
+            with self._write_conn:
+                self._write_conn.executemany(
+                    'DELETE FROM violation_rollups WHERE granularity = ? AND bucket < ?',
+                    list(cutoffs.items()))
+        except sqlite3.Error as e:
+            print(f"Error pruning violation rollups: {e}")
+
+    def record(self, camera_id: str, violation: Dict, timestamp: Optional[float] = None,
+               image_path: Optional[str] = None, metadata: Optional[Dict] = None) -> bool:
+        """
+        Queue one violation for writing.
+
+        Args:
+            camera_id: Camera the violation was seen on
+            violation: Violation dict with type, description, severity and optional count
+            timestamp: Epoch seconds, defaults to now
+            image_path: Saved image of the violation, if any
+            metadata: Extra JSON-serializable details
+
+        Returns:
+            False if the queue was full and the event was dropped
+        """
+        row = (time.time() if timestamp is None else timestamp, camera_id,
+               violation.get('type', 'unknown'), violation.get('description'),
+               violation.get('severity'), violation.get('count', 1), image_path,
+               json.dumps(metadata, default=str) if metadata else None)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        # Counted now so summaries include events still waiting for the writer
+        self.rollups.add(row[0], row[1], row[2])
+        return True
+
+    def record_many(self, camera_id: str, violations: List[Dict],
+                    timestamp: Optional[float] = None) -> int:
+        """Queue several violations seen at the same time; returns how many were queued."""
+        timestamp = time.time() if timestamp is None else timestamp
+        return sum(self.record(camera_id, violation, timestamp) for violation in violations)
+
+    def _run(self):
+        """Writer loop: gather a batch, insert it in one transaction."""
+        while self.is_running or not self._queue.empty():
+            if time.monotonic() - self._last_prune >= ROLLUP_PRUNE_INTERVAL:
+                self._prune_rollups()
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_running:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: List[tuple]):
+        start_time = time.monotonic()
+        counts = self.rollups.aggregate((row[0], row[1], row[2]) for row in batch)
+        try:
+            # Events and their rollup increments commit together
+            with self._write_conn:
+                self._write_conn.executemany(INSERT_SQL, batch)
+                self._write_conn.executemany(UPSERT_ROLLUP_SQL,
+                                             [key + (count,) for key, count in counts.items()])
+        except sqlite3.Error as e:
+            print(f"Error writing violations: {e}")
+            # The events are lost, so take them back out of the in-memory rollups
+            self.rollups.apply({key: -count for key, count in counts.items()})
+            with self._stats_lock:
+                self.errors += 1
+        else:
+            with self._stats_lock:
+                self.written += len(batch)
+                self.batches += 1
+                self.total_write_time += time.monotonic() - start_time
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued event has been written."""
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued, then stop the writer and close the database."""
+        self.is_running = False
+        self._thread.join(timeout=timeout)
+        self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+    @staticmethod
+    def _filters(camera_id: Optional[str], violation_type: Optional[str],
+                 since, until) -> tuple:
+        """Build a WHERE clause that the (camera|type, timestamp) indexes can serve."""
+        clauses, params = [], []
+        if camera_id is not None:
+            clauses.append('camera_id = ?')
+            params.append(camera_id)
+        if violation_type is not None:
+            clauses.append('type = ?')
+            params.append(violation_type)
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(_to_epoch(until))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _query(self, sql: str, params: list) -> List[sqlite3.Row]:
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def get_recent(self, limit: int = 20, camera_id: Optional[str] = None,
+                   violation_type: Optional[str] = None, since=None, until=None) -> List[Dict]:
+        """
+        Get the newest violations, newest first.
+
+        Args:
+            limit: Maximum number of violations
+            camera_id: Only this camera
+            violation_type: Only this violation type
+            since: Only violations at or after this time (epoch, datetime or ISO string)
+            until: Only violations before this time
+
+        Returns:
+            List of violation dicts with ISO timestamps
+        """
+        where, params = self._filters(camera_id, violation_type, since, until)
+        rows = self._query(f'SELECT * FROM violations{where} ORDER BY timestamp DESC LIMIT ?',
+                           params + [limit])
+        return [{
+            'id': row['id'],
+            'timestamp': datetime.fromtimestamp(row['timestamp']).isoformat(),
+            'camera_id': row['camera_id'],
+            'type': row['type'],
+            'description': row['description'],
+            'severity': row['severity'],
+            'count': row['count'],
+            'image_path': row['image_path'],
+            'metadata': json.loads(row['metadata']) if row['metadata'] else None
+        } for row in rows]
+
+    def count(self, camera_id: Optional[str] = None, violation_type: Optional[str] = None,
+              since=None, until=None) -> int:
+        """Count violations matching the filters."""
+        where, params = self._filters(camera_id, violation_type, since, until)
+        return self._query(f'SELECT COUNT(*) FROM violations{where}', params)[0][0]
+
+    def get_summary(self, camera_id: Optional[str] = None) -> Dict:
+        """
+        Summarize violations: totals, today's count, per-type and per-camera
+        counts for today, and hourly counts for today. Read from the rollups,
+        so the cost does not grow with the history.
+        """
+        now = time.time()
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        by_type, by_camera = {}, {}
+        for (camera, violation_type), count in self.rollups.get_bucket(DAY, now, camera_id).items():
+            by_type[violation_type] = by_type.get(violation_type, 0) + count
+            by_camera[camera] = by_camera.get(camera, 0) + count
+        by_type = dict(sorted(by_type.items(), key=lambda item: item[1], reverse=True))
+        hourly = self.rollups.get_series(HOUR, today, None, camera_id)
+
+        return {
+            'total_violations': self.rollups.total(camera_id),
+            'total_violations_today': sum(by_type.values()),
+            'most_common_violation': next(iter(by_type), None),
+            'by_type_today': by_type,
+            'by_camera_today': by_camera,
+            'compliance_trend': [{'hour': int((bucket - today) // 3600), 'violations': count}
+                                 for bucket, count in hourly]
+        }
+
+    def get_trend(self, granularity: str = HOUR, since=None, until=None,
+                  camera_id: Optional[str] = None, violation_type: Optional[str] = None) -> List[Dict]:
+        """
+        Get violation counts per minute, hour or day from the rollups.
+
+        Args:
+            granularity: 'minute' (last day), 'hour' (last 90 days) or 'day'
+            since: Only buckets at or after this time (epoch, datetime or ISO string)
+            until: Only buckets before this time
+            camera_id: Only this camera
+            violation_type: Only this violation type
+
+        Returns:
+            List of {'bucket': ISO start time, 'violations': count}, oldest first;
+            buckets without violations are omitted
+        """
+        series = self.rollups.get_series(granularity, _to_epoch(since), _to_epoch(until),
+                                         camera_id, violation_type)
+        return [{'bucket': datetime.fromtimestamp(bucket).isoformat(), 'violations': count}
+                for bucket, count in series]
+
+    def get_stats(self) -> dict:
+        """Get writer queue depth, throughput and drop counters."""
+        with self._stats_lock:
+            return {
+                'db_path': self.db_path,
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'batches': self.batches,
+                'avg_batch_size': round(self.written / self.batches, 2) if self.batches else 0.0,
+                'avg_batch_ms': round(self.total_write_time / self.batches * 1000, 2) if self.batches else 0.0
+            }
@@ -5,18 +5,27 @@ Real-time safety equipment detection with web dashboard
 Optimized for Railway cloud deployment
 """
 
-import cv2
-import base64
-import json
 import time
 import os
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, Response, render_template, jsonify, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import threading
 from datetime import datetime
 
 from safety_detector import SafetyDetector
-from camera_manager import CameraManager
+from camera_manager import CAPTURE_DEMAND, CameraManager
+from batch_inference import DynamicBatcher
+from inference_scheduler import InferenceScheduler
+from violation_store import ViolationStore
+from capture_dedup import CaptureDeduplicator
+from capture_writer import CaptureWriter, capture_filename
+from clip_recorder import ClipRecorder
+from retention_manager import RetentionManager, severity_of
+from frame_bus import FRAMES_TOPIC, BusCamera, SocketBusClient, create_bus
+from config import SafetyConfig
+from frame_encoder import get_shared_encoder
+from stream_hub import StreamHub, MJPEG_BOUNDARY
+from video_pipeline import VideoPipeline
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'safety_monitor_secret_key')
@@ -24,91 +33,282 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
 # Global variables
 detector = None
-camera_manager = None
+inference_batcher = None
+inference_scheduler = None
+frame_bus = None
+violation_store = None
+capture_writer = None
+clip_recorder = None
+image_retention = None
+clip_retention = None
 monitoring_active = False
-violation_log = []
+stream_hub = StreamHub(ladder=SafetyConfig.STREAM_QUALITY_LADDER,
+                       ack_timeout=SafetyConfig.STREAM_ACK_TIMEOUT,
+                       downgrade_latency=SafetyConfig.STREAM_DOWNGRADE_LATENCY,
+                       upgrade_latency=SafetyConfig.STREAM_UPGRADE_LATENCY,
+                       encoder=get_shared_encoder(SafetyConfig.ENCODER_THREADS or None,
+                                                  SafetyConfig.ENCODER_USE_TURBOJPEG))
 
-def initialize_components():
-    """Initialize the safety detector and camera manager."""
-    global detector
+# Camera ID used when a request does not name one
+DEFAULT_CAMERA_ID = 'default'
+
+class CameraSession:
+    """A monitored camera and the pipeline processing its frames."""
+    
+    def __init__(self, camera_id, camera, pipeline):
+        self.camera_id = camera_id
+        self.camera = camera
+        self.pipeline = pipeline
+        self.started_at = datetime.now().isoformat()
+    
+    def stop(self):
+        """Stop the pipeline, then release the camera."""
+        self.pipeline.stop()
+        self.camera.stop_capture()
+    
+    def get_info(self):
+        """Summarize the session for the camera list."""
+        return {
+            'camera_id': self.camera_id,
+            'source': self.camera.source,
+            'started_at': self.started_at,
+            'state': self.camera.state,
+            'viewers': stream_hub.has_subscribers(self.camera_id),
+            # The clip recorder is one of the viewers while it buffers the camera
+            'clip_buffering': bool(clip_recorder and clip_recorder.is_buffering(self.camera_id))
+        }
+
+# Monitored cameras by ID; each has its own pipeline, all share the detector
+camera_sessions = {}
+sessions_lock = threading.Lock()
+
+# Cameras each Socket.IO client is subscribed to, by sid
+client_subscriptions = {}
+
+def initialize_components(preloaded_detector=None):
+    """
+    Initialize the safety detector and the inference batcher shared by all cameras.
+    
+    Args:
+        preloaded_detector: Detector already loaded by a parent process (see
+                            preload_launcher.py); a new one is loaded if None
+    """
+    global detector, inference_batcher, inference_scheduler, frame_bus, violation_store, capture_writer, clip_recorder
+    global image_retention, clip_retention
     try:
-        detector = SafetyDetector()
+        if SafetyConfig.FRAME_BUS_LISTEN and SafetyConfig.CAMERA_CAPTURE_MODE == CAPTURE_DEMAND:
+            # Demand mode decodes only the frames that get analyzed, so there is nothing to publish
+            raise ValueError("FRAME_BUS_LISTEN publishes every captured frame; set CAMERA_CAPTURE_MODE "
+                             "to 'copy' or 'ring' instead of 'demand'")
+        violation_store = ViolationStore(SafetyConfig.VIOLATION_DB_PATH,
+                                         batch_size=SafetyConfig.VIOLATION_DB_BATCH_SIZE,
+                                         flush_interval=SafetyConfig.VIOLATION_DB_FLUSH_INTERVAL)
+        detector = preloaded_detector or SafetyDetector()
+        detector.violation_store = violation_store
+        detector.violation_images_dir = SafetyConfig.VIOLATION_IMAGES_DIR
+        os.makedirs(detector.violation_images_dir, exist_ok=True)
+        deduplicator = None
+        if SafetyConfig.CAPTURE_DEDUP_ENABLED:
+            deduplicator = CaptureDeduplicator(SafetyConfig.CAPTURE_DEDUP_THRESHOLD,
+                                               SafetyConfig.CAPTURE_DEDUP_WINDOW,
+                                               SafetyConfig.CAPTURE_DEDUP_INDEX_SIZE)
+        # Automatic and manual captures share one image budget; evicted images
+        # must no longer be offered as originals of new duplicates
+        image_retention = RetentionManager([SafetyConfig.VIOLATION_IMAGES_DIR, SafetyConfig.MANUAL_CAPTURES_DIR],
+                                           max_files=SafetyConfig.MAX_VIOLATION_IMAGES,
+                                           max_bytes=SafetyConfig.MAX_VIOLATION_IMAGES_BYTES,
+                                           max_age_seconds=days_to_seconds(SafetyConfig.MAX_VIOLATION_IMAGE_AGE_DAYS),
+                                           policy=SafetyConfig.RETENTION_POLICY,
+                                           interval=SafetyConfig.RETENTION_INTERVAL,
+                                           on_evicted=deduplicator.forget if deduplicator else None)
+        capture_writer = CaptureWriter(os.path.join(SafetyConfig.VIOLATION_IMAGES_DIR, 'captures.jsonl'),
+                                       max_queue=SafetyConfig.CAPTURE_QUEUE_SIZE,
+                                       drop_policy=SafetyConfig.CAPTURE_DROP_POLICY,
+                                       jpeg_quality=SafetyConfig.VIOLATION_IMAGE_QUALITY,
+                                       metadata_batch=SafetyConfig.CAPTURE_METADATA_BATCH,
+                                       metadata_flush_interval=SafetyConfig.CAPTURE_METADATA_FLUSH_INTERVAL,
+                                       on_written=track_capture,
+                                       deduplicator=deduplicator)
+        detector.capture_writer = capture_writer
+        if SafetyConfig.CLIP_RECORDING_ENABLED:
+            clip_retention = RetentionManager([SafetyConfig.CLIP_DIR], extensions=CLIP_EXTENSIONS,
+                                              max_bytes=SafetyConfig.CLIP_MAX_TOTAL_BYTES,
+                                              max_age_seconds=days_to_seconds(SafetyConfig.CLIP_MAX_AGE_DAYS),
+                                              policy=SafetyConfig.RETENTION_POLICY,
+                                              interval=SafetyConfig.RETENTION_INTERVAL)
+            clip_recorder = ClipRecorder(stream_hub, SafetyConfig.CLIP_DIR,
+                                         pre_seconds=SafetyConfig.CLIP_PRE_SECONDS,
+                                         post_seconds=SafetyConfig.CLIP_POST_SECONDS,
+                                         max_buffer_bytes=SafetyConfig.CLIP_BUFFER_MAX_BYTES,
+                                         max_clip_seconds=SafetyConfig.CLIP_MAX_SECONDS,
+                                         remux_format=SafetyConfig.CLIP_REMUX_FORMAT,
+                                         arm_seconds=SafetyConfig.CLIP_ARM_SECONDS,
+                                         on_written=track_clip)
+        inference_batcher = DynamicBatcher(detector,
+                                           max_batch=SafetyConfig.INFERENCE_MAX_BATCH,
+                                           max_wait_ms=SafetyConfig.INFERENCE_MAX_WAIT_MS)
+        if SafetyConfig.INFERENCE_BUDGET_FPS:
+            # Picks which cameras' frames go to the batcher under the global budget
+            inference_scheduler = InferenceScheduler(inference_batcher,
+                                                     budget_fps=SafetyConfig.INFERENCE_BUDGET_FPS,
+                                                     policy=SafetyConfig.INFERENCE_SCHEDULING_POLICY,
+                                                     people_boost=SafetyConfig.INFERENCE_PEOPLE_BOOST,
+                                                     violation_boost=SafetyConfig.INFERENCE_VIOLATION_BOOST,
+                                                     boost_hold=SafetyConfig.INFERENCE_BOOST_HOLD)
+        if SafetyConfig.FRAME_BUS_LISTEN:
+            frame_bus = create_bus(SafetyConfig.FRAME_BUS_LISTEN,
+                                   encoding=SafetyConfig.FRAME_BUS_ENCODING)
         print("Safety detector initialized successfully")
         return True
     except Exception as e:
         print(f"Error initializing components: {e}")
         return False
 
-def process_video_stream():
-    """Process video stream and emit results to connected clients."""
-    global monitoring_active, violation_log
+# Clip files the clip retention manages; sidecars are deleted with them
+CLIP_EXTENSIONS = ('.mjpg', '.mkv', '.avi', '.mp4')
+
+def days_to_seconds(days):
+    """Convert an age limit in days from the config; None means no limit."""
+    return days * 24 * 3600 if days is not None else None
+
+def track_capture(filepath, size, metadata):
+    """Add a written capture to the image retention index."""
+    image_retention.track(filepath, size, severity_of(metadata))
+
+def track_clip(filepath, size, info):
+    """Add a written clip to the clip retention index."""
+    violations = [violation for event in info['events'] for violation in event.get('violations', [])]
+    clip_retention.track(filepath, size, severity_of({'violations': violations}))
+
+def observe_results(camera_id, results):
+    """Keep buffering clip frames while a camera shows people, so clips include the lead-up."""
+    if clip_recorder and results['people_count']:
+        clip_recorder.arm(camera_id)
+
+def log_violations(camera_id, violations):
+    """Record violations reported by a camera pipeline."""
+    now = time.time()
+    current_time = datetime.fromtimestamp(now).isoformat()
+    # Queued for the background writer; never waits on the disk
+    violation_store.record_many(camera_id, violations, now)
+    if clip_recorder:
+        # Extends the clip already being recorded for an ongoing violation
+        clip_recorder.trigger(camera_id, {'timestamp': current_time, 'violations': violations}, now)
+    for violation in violations:
+        violation_entry = {
+            'timestamp': current_time,
+            'camera_id': camera_id,
+            'type': violation['type'],
+            'description': violation['description'],
+            'severity': violation['severity'],
+            'count': violation.get('count', 1)
+        }
+        
+        # Only clients viewing this camera get the alert
+        socketio.emit('violation_alert', violation_entry, to=camera_room(camera_id))
+
+def camera_room(camera_id):
+    """Socket.IO room of the clients viewing a camera."""
+    return f"camera:{camera_id}"
+
+def create_video_pipeline(camera_id, camera):
+    """Build the processing pipeline for a started camera."""
+    return VideoPipeline(camera_id, camera, detector, stream_hub,
+                         target_fps=SafetyConfig.MAX_PROCESSING_FPS,
+                         inference_interval=SafetyConfig.INFERENCE_INTERVAL,
+                         on_violations=log_violations,
+                         on_results=observe_results,
+                         stage_settings=SafetyConfig.PIPELINE_STAGE_SETTINGS,
+                         inference=inference_batcher,
+                         result_bus=frame_bus,
+                         scheduler=inference_scheduler)
+
+def get_session(camera_id):
+    """Look up a monitored camera, or None."""
+    with sessions_lock:
+        return camera_sessions.get(camera_id)
+
+def start_session(camera_id, camera_source, sequential=False):
+    """
+    Start monitoring a camera, replacing any session with the same ID.
     
-    frame_count = 0
-    last_detection_results = None
+    Args:
+        camera_id: Camera identifier used for streaming, rooms and logging
+        camera_source: Webcam index, video file path, stream URL, or
+                       'bus+<bus address>/<camera_id>' for a camera published on a frame bus
+        sequential: Process every frame of a video file in order
     
-    while monitoring_active:
-        try:
-            if camera_manager and camera_manager.is_connected():
-                frame_data = camera_manager.get_latest_frame()
-                if frame_data is not None:
-                    frame, timestamp = frame_data
-                    frame_count += 1
-                    
-                    # Run AI detection every 3rd frame for higher FPS (20 FPS AI, 60 FPS video)
-                    if frame_count % 3 == 0 or last_detection_results is None:
-                        # Get safety detection results
-                        results = detector.detect_safety_violations(frame)
-                        last_detection_results = results
-                    else:
-                        # Use previous detection results for intermediate frames
-                        results = last_detection_results
-                    
-                    # Draw detections on frame
-                    annotated_frame = detector.draw_detections(frame, results)
-                    
-                    # Convert frame to base64 for web transmission (optimized for speed)
-                    _, buffer = cv2.imencode('.jpg', annotated_frame, 
-                                           [cv2.IMWRITE_JPEG_QUALITY, 75])  # Reduced quality for speed
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                    
-                    # Log violations (optimized - only log new violations)
-                    if results['violations']:
-                        current_time = datetime.now().isoformat()
-                        for violation in results['violations']:
-                            violation_entry = {
-                                'timestamp': current_time,
-                                'type': violation['type'],
-                                'description': violation['description'],
-                                'severity': violation['severity'],
-                                'count': violation.get('count', 1)
-                            }
-                            violation_log.append(violation_entry)
-                            
-                            # Keep only last 50 violations (reduced for performance)
-                            if len(violation_log) > 50:
-                                violation_log.pop(0)
-                    
-                    # Prepare data for web client
-                    stream_data = {
-                        'frame': frame_base64,
-                        'people_count': results['people_count'],
-                        'safety_equipment': results['safety_equipment'],
-                        'violations': results['violations'],
-                        'fps': results['fps'],
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    
-                    # Emit to all connected clients
-                    socketio.emit('video_frame', stream_data)
-                    
-                    # Reduced delay for higher FPS
-                    time.sleep(0.033)  # ~30 FPS target
-            else:
-                time.sleep(0.5)  # Wait if camera is not active
-                
-        except Exception as e:
-            print(f"Error in video processing: {e}")
-            time.sleep(1)
+    Returns:
+        The running CameraSession, or None if the camera could not be started
+    """
+    global monitoring_active
+    # Webcam indexes always use OpenCV; files and URLs may use the ffmpeg backend
+    backend = SafetyConfig.CAMERA_BACKEND if isinstance(camera_source, str) else 'opencv'
+    
+    # Only one pipeline may feed a camera's viewers; release the old camera too
+    stop_session(camera_id)
+    
+    if isinstance(camera_source, str) and camera_source.startswith('bus+'):
+        # Frames captured by another process, e.g. bus+tcp://10.0.0.2:7700/dock
+        address, _, remote_id = camera_source[len('bus+'):].rpartition('/')
+        camera = BusCamera(SocketBusClient(address, SafetyConfig.CAMERA_RECONNECT_MAX_BACKOFF),
+                           remote_id, stall_timeout=SafetyConfig.CAMERA_STALL_TIMEOUT,
+                           close_bus=True)
+    else:
+        camera = CameraManager(source=camera_source,
+                               capture_mode=SafetyConfig.CAMERA_CAPTURE_MODE,
+                               ring_size=SafetyConfig.CAMERA_RING_SIZE,
+                               open_timeout=SafetyConfig.CAMERA_OPEN_TIMEOUT,
+                               read_timeout=SafetyConfig.CAMERA_READ_TIMEOUT,
+                               stall_timeout=SafetyConfig.CAMERA_STALL_TIMEOUT,
+                               reconnect_max_backoff=SafetyConfig.CAMERA_RECONNECT_MAX_BACKOFF,
+                               sequential=sequential,
+                               backend=backend,
+                               ffmpeg_options=SafetyConfig.CAMERA_FFMPEG_OPTIONS,
+                               bus=frame_bus,
+                               bus_topic=FRAMES_TOPIC + camera_id if frame_bus else None)
+    if not camera.start_capture():
+        return None
+    
+    if inference_scheduler and not camera.sequential:
+        # Sequential files analyze every Nth frame outside the budget (see VideoPipeline)
+        inference_scheduler.add_camera(camera_id, SafetyConfig.INFERENCE_CAMERA_WEIGHTS.get(camera_id, 1.0))
+    pipeline = create_video_pipeline(camera_id, camera)
+    pipeline.start()
+    if clip_recorder:
+        clip_recorder.add_camera(camera_id)
+    session = CameraSession(camera_id, camera, pipeline)
+    
+    with sessions_lock:
+        # A concurrent start for the same ID may have finished first
+        replaced = camera_sessions.get(camera_id)
+        camera_sessions[camera_id] = session
+        monitoring_active = True
+    if replaced:
+        replaced.stop()
+    return session
+
+def stop_session(camera_id):
+    """Stop and forget a monitored camera; returns False if it was not running."""
+    global monitoring_active
+    with sessions_lock:
+        session = camera_sessions.pop(camera_id, None)
+        monitoring_active = bool(camera_sessions)
+    if session is None:
+        return False
+    session.stop()
+    if inference_scheduler:
+        inference_scheduler.remove_camera(camera_id)
+    if clip_recorder:
+        clip_recorder.remove_camera(camera_id)
+    return True
+
+def stop_all_sessions():
+    """Stop every monitored camera."""
+    with sessions_lock:
+        camera_ids = list(camera_sessions)
+    for camera_id in camera_ids:
+        stop_session(camera_id)
 
 @app.route('/')
 def dashboard():
@@ -130,29 +330,44 @@ def test_page():
     """Serve the WebSocket test page."""
     return open('test_websocket.html').read()
 
+@app.route('/stream/<camera_id>.mjpg')
+def mjpeg_stream(camera_id):
+    """Serve the annotated feed as multipart MJPEG for NVRs and <img> embeds."""
+    if camera_id != DEFAULT_CAMERA_ID and get_session(camera_id) is None:
+        return jsonify({
+            'success': False,
+            'message': f'Unknown camera: {camera_id}'
+        }), 404
+    
+    try:
+        chunks = stream_hub.mjpeg_stream(camera_id, request.args.get('quality', 'full'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'qualities': stream_hub.get_quality_names()
+        }), 400
+    
+    return Response(chunks,
+                    mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}',
+                    headers={'Cache-Control': 'no-cache, private', 'Pragma': 'no-cache'})
+
 @app.route('/api/start_monitoring', methods=['POST'])
 def start_monitoring():
-    """Start the safety monitoring."""
-    global monitoring_active, camera_manager
-    
+    """Start monitoring a camera; restarting a camera ID replaces its previous source."""
     try:
         data = request.get_json() or {}
+        camera_id = str(data.get('camera_id', DEFAULT_CAMERA_ID))
         camera_source = data.get('camera_source', 0)  # Default to webcam
+        sequential = bool(data.get('sequential', False))  # Process every frame of a video file
         
-        # Initialize camera
-        camera_manager = CameraManager(source=camera_source)
-        
-        if camera_manager.start_capture():
-            monitoring_active = True
-            
-            # Start video processing thread
-            video_thread = threading.Thread(target=process_video_stream, daemon=True)
-            video_thread.start()
-            
+        session = start_session(camera_id, camera_source, sequential)
+        if session:
             return jsonify({
                 'success': True,
                 'message': 'Monitoring started successfully',
-                'camera_info': camera_manager.get_properties()
+                'camera_id': camera_id,
+                'camera_info': session.camera.get_properties()
             })
         else:
             return jsonify({
@@ -168,14 +383,18 @@ def start_monitoring():
 
 @app.route('/api/stop_monitoring', methods=['POST'])
 def stop_monitoring():
-    """Stop the safety monitoring."""
-    global monitoring_active, camera_manager
-    
+    """Stop monitoring one camera, or every camera when no camera_id is given."""
     try:
-        monitoring_active = False
+        data = request.get_json(silent=True) or {}
+        camera_id = data.get('camera_id')
         
-        if camera_manager:
-            camera_manager.stop_capture()
+        if camera_id is None:
+            stop_all_sessions()
+        elif not stop_session(str(camera_id)):
+            return jsonify({
+                'success': False,
+                'message': f'Unknown camera: {camera_id}'
+            }), 404
         
         return jsonify({
             'success': True,
@@ -188,22 +407,153 @@ def stop_monitoring():
             'message': f'Error stopping monitoring: {str(e)}'
         }), 500
 
+@app.route('/api/cameras')
+def list_cameras():
+    """List the monitored cameras."""
+    try:
+        with sessions_lock:
+            sessions = list(camera_sessions.values())
+        return jsonify({
+            'success': True,
+            'cameras': [session.get_info() for session in sessions]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error listing cameras: {str(e)}'
+        }), 500
+
 @app.route('/api/violations')
 def get_violations():
-    """Get recent violations."""
+    """Get recent violations, newest first, filtered by camera_id, type, since and until."""
     try:
+        filters = {
+            'camera_id': request.args.get('camera_id'),
+            'violation_type': request.args.get('type'),
+            'since': request.args.get('since'),
+            'until': request.args.get('until')
+        }
+        limit = min(request.args.get('limit', 20, type=int), 500)
         return jsonify({
             'success': True,
-            'violations': violation_log[-20:],  # Last 20 violations
-            'total_count': len(violation_log)
+            'violations': violation_store.get_recent(limit, **filters),
+            'total_count': violation_store.count(**filters)
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid filter: {str(e)}'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'message': f'Error getting violations: {str(e)}'
         }), 500
 
+@app.route('/api/violation_trend')
+def get_violation_trend():
+    """Get violation counts per minute, hour or day, filtered by camera_id, type, since and until."""
+    try:
+        granularity = request.args.get('granularity', 'hour')
+        return jsonify({
+            'success': True,
+            'granularity': granularity,
+            'trend': violation_store.get_trend(granularity,
+                                               since=request.args.get('since'),
+                                               until=request.args.get('until'),
+                                               camera_id=request.args.get('camera_id'),
+                                               violation_type=request.args.get('type'))
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid filter: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error getting violation trend: {str(e)}'
+        }), 500
+
+@app.route('/api/violation_summary')
+def get_violation_summary():
+    """Get violation totals, today's counts by type and camera, and the hourly trend."""
+    try:
+        return jsonify({
+            'success': True,
+            'summary': violation_store.get_summary(request.args.get('camera_id')),
+            'store': violation_store.get_stats(),
+            'capture': capture_writer.get_stats(),
+            'clips': clip_recorder.get_stats() if clip_recorder else None,
+            'retention': {
+                'images': image_retention.get_stats(),
+                'clips': clip_retention.get_stats() if clip_retention else None
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error getting violation summary: {str(e)}'
+        }), 500
+
+@app.route('/api/stream_stats')
+def get_stream_stats():
+    """Get per-client delivery counters and each camera's target versus achieved output rate."""
+    try:
+        with sessions_lock:
+            sessions = list(camera_sessions.values())
+        return jsonify({
+            'success': True,
+            'stream': stream_hub.get_stats(),
+            'pacing': {s.camera_id: s.pipeline.pacer.get_stats() for s in sessions},
+            'bus': frame_bus.get_stats() if frame_bus else None
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error getting stream stats: {str(e)}'
+        }), 500
+
+@app.route('/api/pipeline_stats')
+def get_pipeline_stats():
+    """Get per-stage metrics for each camera's pipeline, shared inference batching and scheduling stats."""
+    try:
+        with sessions_lock:
+            sessions = list(camera_sessions.values())
+        return jsonify({
+            'success': True,
+            'pipelines': {s.camera_id: s.pipeline.get_stats() for s in sessions},
+            'inference': inference_batcher.get_stats() if inference_batcher else None,
+            'scheduler': inference_scheduler.get_stats() if inference_scheduler else None
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error getting pipeline stats: {str(e)}'
+        }), 500
+
+@app.route('/api/camera_status')
+def get_camera_status():
+    """Get camera connection state, reconnects, dropped frames and uptime."""
+    try:
+        session = get_session(request.args.get('camera_id', DEFAULT_CAMERA_ID))
+        return jsonify({
+            'success': True,
+            'camera': session.camera.get_properties() if session else None
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error getting camera status: {str(e)}'
+        }), 500
+
 @app.route('/api/model_info')
 def get_model_info():
     """Get information about the loaded model."""
@@ -230,29 +580,46 @@ def get_model_info():
 def capture_violation():
     """Manually capture and save a violation image."""
     try:
-        if camera_manager and camera_manager.is_connected():
-            frame_data = camera_manager.get_latest_frame()
+        data = request.get_json(silent=True) or {}
+        session = get_session(str(data.get('camera_id', DEFAULT_CAMERA_ID)))
+        if session and session.camera.is_connected():
+            frame_data = session.camera.get_latest_frame()
             if frame_data is not None:
                 frame, timestamp = frame_data
                 
                 # Get detection results
-                results = detector.detect_safety_violations(frame)
+                results = inference_batcher.detect_safety_violations(frame)
                 annotated_frame = detector.draw_detections(frame, results)
                 
-                # Save image with timestamp
-                timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"violation_capture_{timestamp_str}.jpg"
-                filepath = os.path.join("captures", filename)
-                
-                # Create captures directory if it doesn't exist
-                os.makedirs("captures", exist_ok=True)
+                # Save image with timestamp on the background writer
+                filename = capture_filename('violation_capture', session.camera_id)
+                filepath = os.path.join(SafetyConfig.MANUAL_CAPTURES_DIR, filename)
+                metadata = {
+                    'timestamp': datetime.now().isoformat(),
+                    'camera_id': session.camera_id,
+                    'filename': filename,
+                    'violations': results['violations']
+                }
                 
-                cv2.imwrite(filepath, annotated_frame)
+                # draw_detections returns a new frame, so it needs no copy
+                stored_path = capture_writer.submit(annotated_frame, filepath, metadata, copy=False,
+                                                    camera_id=session.camera_id)
+                if stored_path is None:
+                    return jsonify({
+                        'success': False,
+                        'message': 'Capture queue is full, try again shortly',
+                        'capture': capture_writer.get_stats()
+                    }), 503
                 
+                if stored_path != filepath:
+                    message = f'Scene unchanged, matches {os.path.basename(stored_path)}'
+                else:
+                    message = f'Violation captured, saving as {filename}'
                 return jsonify({
                     'success': True,
-                    'message': f'Violation captured and saved as {filename}',
-                    'filepath': filepath,
+                    'message': message,
+                    'filepath': stored_path,
+                    'duplicate': stored_path != filepath,
                     'detections': results['detections'],
                     'violations': results['violations']
                 })
@@ -273,17 +640,62 @@ def capture_violation():
             'message': f'Error capturing violation: {str(e)}'
         }), 500
 
+def _frame_sender(sid):
+    """Create a sender that pushes frames to one Socket.IO client with an ack callback."""
+    def send(frame, on_ack):
+        socketio.emit('video_frame', frame.to_message(), to=sid, callback=on_ack)
+    return send
+
+def subscribe_client(sid, camera_id, quality=None):
+    """Stream a camera to a client and add it to the camera's room."""
+    stream_hub.add_client(f"{sid}:{camera_id}", camera_id, _frame_sender(sid), quality)
+    join_room(camera_room(camera_id), sid=sid)
+    client_subscriptions.setdefault(sid, set()).add(camera_id)
+
+def unsubscribe_client(sid, camera_id):
+    """Stop streaming a camera to a client."""
+    stream_hub.remove_client(f"{sid}:{camera_id}")
+    leave_room(camera_room(camera_id), sid=sid)
+    client_subscriptions.get(sid, set()).discard(camera_id)
+
 @socketio.on('connect')
 def handle_connect():
-    """Handle client connection."""
+    """Handle client connection, subscribing it to the camera named in the query string."""
     print('Client connected')
+    try:
+        subscribe_client(request.sid, request.args.get('camera_id', DEFAULT_CAMERA_ID),
+                         request.args.get('quality'))
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+        return
     emit('status', {'message': 'Connected to Safety Monitor'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
+    for camera_id in list(client_subscriptions.pop(request.sid, ())):
+        stream_hub.remove_client(f"{request.sid}:{camera_id}")
     print('Client disconnected')
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Start receiving a camera's frames and alerts."""
+    data = data or {}
+    camera_id = str(data.get('camera_id', DEFAULT_CAMERA_ID))
+    try:
+        subscribe_client(request.sid, camera_id, data.get('quality'))
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+        return
+    emit('status', {'message': f'Subscribed to camera {camera_id}', 'camera_id': camera_id})
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    """Stop receiving a camera's frames and alerts."""
+    camera_id = str((data or {}).get('camera_id', DEFAULT_CAMERA_ID))
+    unsubscribe_client(request.sid, camera_id)
+    emit('status', {'message': f'Unsubscribed from camera {camera_id}', 'camera_id': camera_id})
+
 @socketio.on('request_model_info')
 def handle_model_info_request():
     """Send model information to client."""
@@ -311,7 +723,10 @@ def main():
     # Get port from environment variable (Railway sets this)
     port = int(os.environ.get('PORT', 8080))
     host = '0.0.0.0'  # Required for Railway
-    
+    serve(host, port)
+
+def serve(host, port):
+    """Run the web server until interrupted, then stop every camera."""
     print("🚀 Starting Safety Monitor Web Application...")
     print(f"   Running on: http://{host}:{port}")
     print("   Press Ctrl+C to stop")
@@ -325,10 +740,21 @@ def main():
                     allow_unsafe_werkzeug=True)
     except KeyboardInterrupt:
         print("\n🛑 Shutting down Safety Monitor...")
-        global monitoring_active
-        monitoring_active = False
-        if camera_manager:
-            camera_manager.stop_capture()
+    finally:
+        stop_all_sessions()
+        if inference_batcher:
+            inference_batcher.stop()
+        if frame_bus:
+            frame_bus.close()
+        if clip_recorder:
+            clip_recorder.close()
+        if capture_writer:
+            capture_writer.close()
+        for retention in (image_retention, clip_retention):
+            if retention:
+                retention.close()
+        if violation_store:
+            violation_store.close()
         print("   Safety Monitor stopped")
 
 if __name__ == '__main__':